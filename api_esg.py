@@ -0,0 +1,299 @@
+"""
+API ESG - Institut d'Économie Durable
+Service HTTP JSON (sans Streamlit) exposant les tags, les correspondances et les fiches métier
+
+Usage:
+    python api_esg.py --port 8080
+
+Routes:
+    GET /api/tags                                 Tags disponibles
+    GET /api/correspondances?tags=ESG,Reporting   Métiers correspondants, triés par pertinence
+                                                  (limite=N, classement=bm25|tfidf|comptage)
+    GET /api/metiers/<nom du métier>              Fiche complète (salaires, compétences, formations, tendances)
+    GET /api/sante                                Version du catalogue et compteurs du cache
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import catalogue_esg
+import instrumentation_esg
+import recherche_esg
+
+logger = logging.getLogger("calculateur_esg.api")
+
+PORT = 8080
+TAILLE_CACHE = 4096      # Nombre de réponses conservées
+MAX_AGE = 300            # Durée (secondes) pendant laquelle un client peut réutiliser une réponse
+LIMITE_CORRESPONDANCES = 50
+PREFIXE = '/api'
+ROUTES = ('tags', 'correspondances', 'metiers', 'sante')
+
+class ApiError(Exception):
+    """Erreur renvoyée au client avec son code HTTP."""
+
+    def __init__(self, statut, message):
+        super().__init__(message)
+        self.statut = statut
+
+# ----- CACHE DES RÉPONSES -----
+class ResponseCache:
+    """
+    Cache LRU des réponses sérialisées, indexé par (version du catalogue, requête canonique).
+
+    Une réponse ne dépend que de la requête et de la version du catalogue:
+    son ETag est donc connu avant de la calculer, et un client qui la possède
+    déjà reçoit un 304 sans aucun calcul ni sérialisation.
+    """
+
+    def __init__(self, taille_max=TAILLE_CACHE):
+        self.taille_max = taille_max
+        self._reponses = OrderedDict()
+        self._verrou = threading.Lock()
+        self.succes = 0
+        self.echecs = 0
+
+    def get(self, cle):
+        with self._verrou:
+            reponse = self._reponses.get(cle)
+            if reponse is None:
+                self.echecs += 1
+                return None
+            self._reponses.move_to_end(cle)
+            self.succes += 1
+            return reponse
+
+    def put(self, cle, reponse):
+        with self._verrou:
+            self._reponses[cle] = reponse
+            self._reponses.move_to_end(cle)
+            while len(self._reponses) > self.taille_max:
+                self._reponses.popitem(last=False)
+
+    def stats(self):
+        with self._verrou:
+            return {'taille': len(self._reponses), 'succes': self.succes, 'echecs': self.echecs}
+
+def make_etag(empreinte, cle):
+    """ETag d'une réponse: empreinte du catalogue et de la requête canonique."""
+    return '"' + hashlib.sha1(f"{empreinte}|{cle}".encode('utf-8')).hexdigest()[:20] + '"'
+
+def _to_json_ready(valeur):
+    """Convertit les fiches figées (MappingProxyType, tuples) et les NaN en valeurs JSON."""
+    if isinstance(valeur, Mapping):
+        return {str(cle): _to_json_ready(val) for cle, val in valeur.items()}
+    if isinstance(valeur, (list, tuple)):
+        return [_to_json_ready(val) for val in valeur]
+    if isinstance(valeur, float) and math.isnan(valeur):
+        return None
+    return catalogue_esg.to_native(valeur)
+
+# ----- ROUTES -----
+def parse_tags(requete):
+    """Lit les tags d'une requête (`tags=a,b` ou `tags=a&tags=b`), sans doublons, ordre conservé."""
+    tags = []
+    for valeur in requete.get('tags', []):
+        tags.extend(tag for tag in recherche_esg.split_tags(valeur) if tag)
+    return list(dict.fromkeys(tags))
+
+def parse_correspondances(requete):
+    """Valide les paramètres de `/correspondances` et renvoie (tags, limite, classement) normalisés."""
+    try:
+        limite = int(requete.get('limite', [LIMITE_CORRESPONDANCES])[0])
+    except ValueError:
+        raise ApiError(400, "Paramètre 'limite' invalide")
+    if limite < 1:
+        raise ApiError(400, "Paramètre 'limite' invalide")
+    mode = requete.get('classement', [recherche_esg.CLASSEMENT_PAR_DEFAUT])[0]
+    if mode not in recherche_esg.MODES_CLASSEMENT:
+        raise ApiError(400, f"Paramètre 'classement' invalide (attendu: {', '.join(recherche_esg.MODES_CLASSEMENT)})")
+    return tuple(parse_tags(requete)), limite, mode
+
+def parse_request(catalogue, chemin, requete):
+    """
+    Valide une requête et la ramène à sa forme normalisée, sans rien calculer.
+
+    Returns:
+        tuple: (route, paramètres normalisés)
+
+    Raises:
+        ApiError: Route inconnue, paramètre invalide ou métier absent du catalogue
+    """
+    if chemin == f"{PREFIXE}/tags":
+        return 'tags', ()
+    if chemin == f"{PREFIXE}/correspondances":
+        return 'correspondances', parse_correspondances(requete)
+    if chemin.startswith(f"{PREFIXE}/metiers/"):
+        nom = unquote(chemin[len(PREFIXE) + len('/metiers/'):])
+        if nom not in catalogue.bundles:
+            raise ApiError(404, f"Métier inconnu: {nom}")
+        return 'metiers', (nom,)
+    raise ApiError(404, "Route inconnue")
+
+def canonical_request(route, parametres):
+    """Forme canonique d'une requête validée (clé du cache et de l'ETag)."""
+    if route == 'correspondances':
+        tags, limite, mode = parametres
+        return f"{PREFIXE}/correspondances?tags={','.join(tags)}&limite={limite}&classement={mode}"
+    if route == 'metiers':
+        return f"{PREFIXE}/metiers/{parametres[0]}"
+    return f"{PREFIXE}/{route}"
+
+def route_tags(catalogue):
+    return {'tags': catalogue.index['tags']}
+
+def route_correspondances(catalogue, tags, limite, mode):
+    metiers = recherche_esg.match_metiers(catalogue.index, tags, mode=mode, limite=limite)
+    return {'tags': list(tags), 'classement': mode, 'metiers': metiers}
+
+def route_metier(catalogue, nom):
+    return catalogue.bundles[nom]
+
+def resolve(catalogue, route, parametres):
+    """Calcule le contenu de la réponse d'une requête déjà validée par `parse_request`."""
+    if route == 'tags':
+        return route_tags(catalogue)
+    if route == 'correspondances':
+        return route_correspondances(catalogue, *parametres)
+    return route_metier(catalogue, *parametres)
+
+# ----- SERVEUR -----
+class ApiServer(ThreadingHTTPServer):
+    """Serveur multi-thread (un thread par connexion, connexions persistantes HTTP/1.1)."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, adresse, watcher, cache, max_age=MAX_AGE):
+        super().__init__(adresse, ApiHandler)
+        self.watcher = watcher
+        self.cache = cache
+        self.max_age = max_age
+        self.demarre_le = time.time()
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # En-têtes et corps partent en deux écritures: sans TCP_NODELAY, l'algorithme
+    # de Nagle et l'accusé de réception différé ajoutent ~40 ms par réponse
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(format % args)
+
+    def _send(self, statut, corps=b'', etag=None):
+        self.send_response(statut)
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', f"public, max-age={self.server.max_age}")
+        if statut != 304:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(corps)))
+        self.end_headers()
+        if corps:
+            self.wfile.write(corps)
+
+    def _send_error_json(self, statut, message):
+        self._send(statut, json.dumps({'erreur': message}, ensure_ascii=False).encode('utf-8'))
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        chemin = url.path.rstrip('/') or '/'
+        route = chemin[len(PREFIXE) + 1:].split('/')[0] if chemin.startswith(PREFIXE + '/') else ''
+        with instrumentation_esg.span('api', route if route in ROUTES else 'inconnue'):
+            if chemin == f"{PREFIXE}/sante":
+                self._send_health()
+                return
+
+            # Une seule version du catalogue pour toute la requête, même si un rechargement a lieu
+            catalogue = self.server.watcher.courant
+            # Validation d'abord: une requête invalide ne reçoit jamais de 304,
+            # et deux écritures équivalentes (limite=3, limite=03) partagent clé et ETag
+            try:
+                route, parametres = parse_request(catalogue, chemin, parse_qs(url.query))
+            except ApiError as e:
+                self._send_error_json(e.statut, str(e))
+                return
+            cle = canonical_request(route, parametres)
+            etag = make_etag(catalogue.empreinte, cle)
+            if etag in [valeur.strip() for valeur in self.headers.get('If-None-Match', '').split(',')]:
+                self._send(304, etag=etag)
+                return
+
+            corps = self.server.cache.get((catalogue.empreinte, cle))
+            if corps is None:
+                try:
+                    contenu = resolve(catalogue, route, parametres)
+                except Exception as e:
+                    logger.error(f"Erreur lors du traitement de {self.path}: {str(e)}", exc_info=True)
+                    self._send_error_json(500, "Erreur interne")
+                    return
+                corps = json.dumps(_to_json_ready(contenu), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                self.server.cache.put((catalogue.empreinte, cle), corps)
+            self._send(200, corps, etag=etag)
+
+    def _send_health(self):
+        contenu = {
+            'catalogue': self.server.watcher.stats(),
+            'cache': self.server.cache.stats(),
+            'demarre_le': self.server.demarre_le
+        }
+        self._send(200, json.dumps(contenu, ensure_ascii=False).encode('utf-8'))
+
+def start_server(hote='127.0.0.1', port=PORT, watcher=None, taille_cache=TAILLE_CACHE, max_age=MAX_AGE):
+    """
+    Démarre l'API dans un thread de fond.
+
+    Args:
+        watcher: Surveillance du catalogue à utiliser (une nouvelle est démarrée si None)
+
+    Returns:
+        ApiServer: Le serveur, à l'écoute sur `serveur.server_port`
+    """
+    if watcher is None:
+        watcher = catalogue_esg.CatalogueWatcher()
+        watcher.start()
+    serveur = ApiServer((hote, port), watcher, ResponseCache(taille_cache), max_age=max_age)
+    threading.Thread(target=serveur.serve_forever, name="api-esg", daemon=True).start()
+    return serveur
+
+def main():
+    parser = argparse.ArgumentParser(description="API JSON du calculateur ESG (tags, correspondances, fiches métier)")
+    parser.add_argument('--hote', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--classeur', default=catalogue_esg.FICHIER_CLASSEUR, help="Classeur Excel du catalogue")
+    parser.add_argument('--instantanes', default=catalogue_esg.DOSSIER_INSTANTANES,
+                        help="Dossier des instantanés compilés")
+    parser.add_argument('--intervalle-surveillance', type=float, default=catalogue_esg.INTERVALLE_SURVEILLANCE,
+                        help="Délai (secondes) entre deux vérifications du classeur")
+    parser.add_argument('--compact', action='store_true',
+                        help="Catalogue en mode compact (catégories, entiers 32 bits, fiches à slots)")
+    parser.add_argument('--taille-cache', type=int, default=TAILLE_CACHE, help="Nombre de réponses en cache")
+    parser.add_argument('--max-age', type=int, default=MAX_AGE, help="Durée de validité côté client (secondes)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    watcher = catalogue_esg.CatalogueWatcher(args.classeur, args.instantanes, intervalle=args.intervalle_surveillance,
+                                             compact=args.compact)
+    watcher.start()
+    serveur = ApiServer((args.hote, args.port), watcher, ResponseCache(args.taille_cache), max_age=args.max_age)
+    logger.info(f"API ESG à l'écoute sur http://{args.hote}:{serveur.server_port}{PREFIXE}")
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        serveur.server_close()
+        watcher.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+// Désactiver le mode sombre et forcer le mode clair
+window.parent.localStorage.setItem('theme', 'light');
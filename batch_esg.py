@@ -0,0 +1,208 @@
+"""
+Correspondances en lot ESG - Institut d'Économie Durable
+Calcul des meilleurs métiers pour des milliers de profils (campagnes des conseillers)
+
+Usage:
+    python batch_esg.py profils.csv --sortie resultats.csv --top 5
+    python batch_esg.py profils.jsonl --sortie resultats.jsonl --processus 4
+
+Entrée: CSV avec une colonne d'identifiant et une colonne de tags séparés par
+des virgules (voir --colonne-id, --colonne-tags), ou JSONL avec un objet par
+ligne ({"id": ..., "tags": [...] ou "tag1, tag2"}).
+Sortie: CSV (une ligne par profil et par métier proposé) ou JSONL (un objet
+par profil), selon l'extension du fichier de sortie.
+
+Le fichier est lu et écrit en flux, par lots: la mémoire reste bornée quelle
+que soit sa taille.
+"""
+
+import argparse
+import csv
+import json
+import logging
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import catalogue_esg
+import recherche_esg
+
+logger = logging.getLogger("calculateur_esg.batch")
+
+TOP_K = 5
+TAILLE_LOT = 2000          # Profils lus et envoyés ensemble à un processus
+MEMOIRE_SCORES = 64 * 1024 * 1024  # Octets maximum de la matrice des scores d'un paquet
+COLONNES_SORTIE = ['profil', 'rang', 'metier', 'score', 'secteur']
+
+# ----- LECTURE DES PROFILS -----
+def split_profile_tags(valeur, separateur=','):
+    """Normalise les tags d'un profil (liste ou chaîne séparée) en liste sans doublons."""
+    if valeur is None:
+        return []
+    if isinstance(valeur, str):
+        valeur = valeur.split(separateur)
+    return list(dict.fromkeys(str(tag).strip() for tag in valeur if str(tag).strip()))
+
+def read_profiles(path, colonne_id='id', colonne_tags='tags', separateur=','):
+    """
+    Lit les profils en flux depuis un fichier CSV ou JSONL ('-' pour l'entrée standard, en JSONL).
+
+    Yields:
+        tuple: (identifiant du profil, liste de tags)
+    """
+    jsonl = path == '-' or path.endswith(('.jsonl', '.ndjson', '.json'))
+    f = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+    try:
+        if jsonl:
+            for numero, ligne in enumerate(f, 1):
+                if not ligne.strip():
+                    continue
+                profil = json.loads(ligne)
+                yield profil.get(colonne_id, numero), split_profile_tags(profil.get(colonne_tags), separateur)
+        else:
+            lecteur = csv.DictReader(f)
+            if colonne_tags not in (lecteur.fieldnames or []):
+                raise ValueError(f"Colonne '{colonne_tags}' absente du fichier {path} "
+                                 f"(colonnes: {lecteur.fieldnames})")
+            for numero, ligne in enumerate(lecteur, 1):
+                yield ligne.get(colonne_id) or numero, split_profile_tags(ligne[colonne_tags], separateur)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def batched(iterable, taille):
+    lot = []
+    for element in iterable:
+        lot.append(element)
+        if len(lot) >= taille:
+            yield lot
+            lot = []
+    if lot:
+        yield lot
+
+# ----- CALCUL -----
+# Matrice des tags et métadonnées des métiers, chargées une fois par processus de calcul
+_contexte = {}
+
+def _init_worker(matrice_tags, metiers, secteurs, k, memoire_scores, mode):
+    _contexte.update(matrice_tags=matrice_tags, metiers=metiers, secteurs=secteurs, k=k,
+                     memoire_scores=memoire_scores, mode=mode)
+
+def score_batch(lot):
+    """
+    Calcule les meilleurs métiers d'un lot de profils.
+
+    Returns:
+        tuple: (liste de (identifiant, [(métier, score, secteur), ...]), nombre de tags inconnus)
+    """
+    vecteurs, inconnus = recherche_esg.encode_profiles(_contexte['matrice_tags'], [tags for _, tags in lot])
+    scores = recherche_esg.score_profiles(_contexte['matrice_tags'], vecteurs, _contexte['k'],
+                                          memoire_max=_contexte['memoire_scores'])
+    metiers, secteurs = _contexte['metiers'], _contexte['secteurs']
+    # Nombre de tags en commun en mode 'comptage', poids cumulés sinon
+    arrondi = int if _contexte['mode'] == 'comptage' else (lambda score: round(score, 4))
+    resultats = [(identifiant, [(metiers[position], arrondi(score), secteurs[position])
+                                for position, score in zip(positions.tolist(), valeurs.tolist())])
+                 for (identifiant, _), (positions, valeurs) in zip(lot, scores)]
+    return resultats, inconnus
+
+def run_batches(lots, processus, initargs):
+    """
+    Calcule les lots, dans l'ordre de lecture, en parallèle si `processus` > 1.
+
+    Au plus deux lots par processus sont en attente: la lecture du fichier
+    avance au rythme du calcul.
+    """
+    if processus <= 1:
+        _init_worker(*initargs)
+        for lot in lots:
+            yield score_batch(lot)
+        return
+
+    with ProcessPoolExecutor(max_workers=processus, initializer=_init_worker, initargs=initargs) as pool:
+        en_cours = deque()
+        for lot in lots:
+            en_cours.append(pool.submit(score_batch, lot))
+            if len(en_cours) >= 2 * processus:
+                yield en_cours.popleft().result()
+        while en_cours:
+            yield en_cours.popleft().result()
+
+# ----- ÉCRITURE -----
+class ResultWriter:
+    """Écrit les résultats en flux, en CSV (une ligne par métier proposé) ou en JSONL (une ligne par profil)."""
+
+    def __init__(self, f, format_sortie):
+        self.f = f
+        self.jsonl = format_sortie == 'jsonl'
+        if not self.jsonl:
+            self.csv = csv.writer(f)
+            self.csv.writerow(COLONNES_SORTIE)
+
+    def write(self, identifiant, metiers):
+        if self.jsonl:
+            self.f.write(json.dumps({
+                'profil': identifiant,
+                'metiers': [{'metier': nom, 'score': score, 'secteur': secteur} for nom, score, secteur in metiers]
+            }, ensure_ascii=False) + '\n')
+        else:
+            self.csv.writerows([identifiant, rang, nom, score, secteur]
+                               for rang, (nom, score, secteur) in enumerate(metiers, 1))
+
+def main():
+    parser = argparse.ArgumentParser(description="Calcule les meilleurs métiers ESG pour un fichier de profils")
+    parser.add_argument('entree', help="Fichier CSV ou JSONL des profils ('-' pour du JSONL sur l'entrée standard)")
+    parser.add_argument('--sortie', default='-', help="Fichier de sortie .csv ou .jsonl ('-' pour la sortie standard)")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help="Format de sortie (déduit de l'extension sinon)")
+    parser.add_argument('--top', type=int, default=TOP_K, help="Nombre de métiers proposés par profil")
+    parser.add_argument('--classement', choices=recherche_esg.MODES_CLASSEMENT,
+                        default=recherche_esg.CLASSEMENT_PAR_DEFAUT,
+                        help="'comptage' (tags en commun) ou pondération des tags par rareté")
+    parser.add_argument('--colonne-id', default='id')
+    parser.add_argument('--colonne-tags', default='tags')
+    parser.add_argument('--separateur-tags', default=',', help="Séparateur des tags dans une même cellule")
+    parser.add_argument('--processus', type=int, default=1, help="Nombre de processus de calcul")
+    parser.add_argument('--taille-lot', type=int, default=TAILLE_LOT, help="Profils par lot")
+    parser.add_argument('--memoire-scores', type=int, default=MEMOIRE_SCORES,
+                        help="Octets maximum de la matrice des scores calculée d'un coup")
+    parser.add_argument('--classeur', default=catalogue_esg.FICHIER_CLASSEUR)
+    parser.add_argument('--instantanes', default=catalogue_esg.DOSSIER_INSTANTANES)
+    args = parser.parse_args()
+    if args.top < 1 or args.taille_lot < 1:
+        parser.error("--top et --taille-lot doivent être positifs")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                        stream=sys.stderr)
+    debut = time.perf_counter()
+    data = catalogue_esg.load_catalogue(args.classeur, args.instantanes)
+    index = recherche_esg.build_tag_index(data['metiers'], data['salaire'])
+    matrice_tags = recherche_esg.build_tag_matrix(index, args.classement)
+    logger.info(f"Matrice des tags prête ({args.classement}): {len(index['tags'])} tags x "
+                f"{len(index['metiers'])} métiers en {time.perf_counter() - debut:.1f} s")
+
+    format_sortie = args.format or ('jsonl' if args.sortie.endswith(('.jsonl', '.ndjson')) else 'csv')
+    sortie = sys.stdout if args.sortie == '-' else open(args.sortie, 'w', encoding='utf-8', newline='')
+    nb_profils = inconnus = 0
+    debut = time.perf_counter()
+    try:
+        ecrivain = ResultWriter(sortie, format_sortie)
+        lots = batched(read_profiles(args.entree, args.colonne_id, args.colonne_tags, args.separateur_tags),
+                       args.taille_lot)
+        initargs = (matrice_tags, index['metiers'], index['secteurs'], args.top, args.memoire_scores,
+                    args.classement)
+        for resultats, inconnus_lot in run_batches(lots, args.processus, initargs):
+            for identifiant, metiers in resultats:
+                ecrivain.write(identifiant, metiers)
+            nb_profils += len(resultats)
+            inconnus += inconnus_lot
+    finally:
+        if sortie is not sys.stdout:
+            sortie.close()
+
+    duree = time.perf_counter() - debut
+    logger.info(f"{nb_profils} profils traités en {duree:.1f} s ({nb_profils / max(duree, 1e-9):.0f} profils/s, "
+                f"{args.processus} processus), {inconnus} tags inconnus du catalogue ignorés")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Benchmarks ESG - Institut d'Économie Durable
+Mesure hors Streamlit des fonctions critiques (chargement, tags, correspondances, fiches, graphiques)
+
+Usage:
+    python benchmarks/bench_esg.py                               # 100, 1k, 10k et 100k métiers
+    python benchmarks/bench_esg.py --tailles 100 1000 10000 --seuil 0.2   # comparé à benchmarks/reference.json
+    python benchmarks/bench_esg.py --tailles 100 1000 10000 --sortie benchmarks/reference.json  # nouvelle référence
+
+Les caches Streamlit sont contournés: les fonctions de l'application lisent un
+catalogue synthétique injecté à la place de `load_data`, `load_tag_index` et
+`load_metier_bundles`.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+os.chdir(RACINE)  # l'application écrit son journal dans logs/
+
+import numpy as np
+import pandas as pd
+
+import calculateur_esg as app
+import catalogue_esg
+import generateur_esg
+import graphiques_esg
+import recherche_esg
+import schema_esg
+import similarite_esg
+
+logger = logging.getLogger("calculateur_esg.benchmarks")
+
+TAILLES_PAR_DEFAUT = (100, 1000, 10000, 100000)
+# Au-delà, l'aller-retour par un classeur Excel de test prend plusieurs minutes
+TAILLE_MAX_CLASSEUR = 10000
+# Au-delà, la mesure mémoire (tracemalloc) des constructions complètes prend des dizaines de minutes
+TAILLE_MAX_MEMOIRE_CONSTRUCTION = 10000
+# Exécution de référence versionnée (100, 1 000 et 10 000 métiers), comparée par défaut
+REFERENCE_PAR_DEFAUT = os.path.join('benchmarks', 'reference.json')
+COULEURS = {'primary': "#0356A5", 'secondary': "#FFE548", 'green': "#00916E", 'background': "#f7f7f5"}
+
+# ----- CATALOGUE SYNTHÉTIQUE -----
+def install_catalogue(data, index, bundles):
+    """Remplace les chargements mis en cache de l'application par le catalogue synthétique."""
+    app.load_data = lambda: data
+    app.load_tag_index = lambda: index
+    app.load_metier_bundles = lambda: bundles
+
+# ----- MESURES -----
+def measure(fonction, repetitions, echauffement=2, memoire=True):
+    """
+    Mesure la latence (ms) et le pic mémoire (octets) d'une fonction sans argument.
+
+    Le pic mémoire est mesuré sur un appel séparé, tracemalloc ralentissant l'exécution
+    (jusqu'à 3 à 4 fois pour les constructions du catalogue, d'où `memoire=False`).
+    """
+    for _ in range(echauffement):
+        fonction()
+    durees = []
+    gc.collect()
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append((time.perf_counter() - debut) * 1000)
+
+    pic = None
+    if memoire:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        fonction()
+        _, pic = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    durees = np.asarray(durees)
+    return {
+        'repetitions': repetitions,
+        'moyenne_ms': float(durees.mean()),
+        'p50_ms': float(np.percentile(durees, 50)),
+        'p90_ms': float(np.percentile(durees, 90)),
+        'p99_ms': float(np.percentile(durees, 99)),
+        'max_ms': float(durees.max()),
+        'pic_memoire_octets': pic
+    }
+
+def cycle(valeurs):
+    """Retourne une fonction qui parcourt les valeurs en boucle (une par appel)."""
+    position = [0]
+
+    def suivant():
+        valeur = valeurs[position[0] % len(valeurs)]
+        position[0] += 1
+        return valeur
+    return suivant
+
+def bench_size(nb_metiers, repetitions, seed, taille_max_classeur=TAILLE_MAX_CLASSEUR):
+    """Exécute tous les benchmarks pour un catalogue de `nb_metiers` métiers."""
+    resultats = {}
+    data = schema_esg.apply_schema(generateur_esg.generate_catalogue(nb_metiers, seed=seed))
+    rng = random.Random(seed)
+    # Répétitions réduites pour les opérations proportionnelles à la taille du catalogue
+    repetitions_lourdes = max(3, repetitions // max(1, nb_metiers // 1000))
+    # Constructions complètes du catalogue: sans échauffement, une seule mesure sur les grandes tailles
+    repetitions_construction = 3 if nb_metiers <= 1000 else 1
+    memoire_construction = nb_metiers <= TAILLE_MAX_MEMOIRE_CONSTRUCTION
+
+    def run(nom, fonction, nb=repetitions, echauffement=2, memoire=True):
+        resultats[nom] = mesure = measure(fonction, nb, echauffement=echauffement, memoire=memoire)
+        pic = '-' if mesure['pic_memoire_octets'] is None else f"{mesure['pic_memoire_octets'] / 1024:.0f} Ko"
+        logger.info(f"{nom} @ {nb_metiers}: p50 {mesure['p50_ms']:.3f} ms, pic {pic}")
+
+    # Les structures construites pendant les mesures sont réutilisées pour la suite
+    construits = {}
+
+    def build_index():
+        construits['index'] = recherche_esg.build_tag_index(data['metiers'], data['salaire'])
+
+    def build_competences():
+        construits['competences'] = catalogue_esg.normalize_competences(data['competences'])
+
+    def build_text():
+        construits['texte'] = recherche_esg.build_text_index(data, construits['competences'].table)
+
+    def build_similarity():
+        construits['similarite'] = similarite_esg.build_similarity_index(data, data['metiers']['Métier'].tolist(),
+                                                                         construits['competences'].table)
+
+    def build_bundles():
+        construits['bundles'] = catalogue_esg.build_metier_bundles(data, construits['competences'])
+
+    if nb_metiers <= taille_max_classeur:
+        with tempfile.TemporaryDirectory() as dossier:
+            classeur = os.path.join(dossier, 'classeur.xlsx')
+            generateur_esg.write_workbook(data, classeur)
+            instantanes = os.path.join(dossier, 'instantanes')
+            run('load_data[compilation]',
+                lambda: catalogue_esg.compile_catalogue(classeur, instantanes),
+                nb=repetitions_construction, echauffement=0, memoire=memoire_construction)
+            run('load_data[instantane]',
+                lambda: catalogue_esg.load_catalogue(classeur, instantanes), nb=repetitions_lourdes)
+
+    run('build_tag_index', build_index, nb=repetitions_lourdes)
+    run('normalize_competences', build_competences, nb=repetitions_lourdes)
+    run('build_text_index', build_text, nb=repetitions_construction, echauffement=0, memoire=memoire_construction)
+    run('build_similarity_index', build_similarity, nb=repetitions_construction, echauffement=0,
+        memoire=memoire_construction)
+    run('build_metier_bundles', build_bundles, nb=repetitions_construction, echauffement=0,
+        memoire=memoire_construction)
+    install_catalogue(data, construits['index'], construits['bundles'])
+
+    run('get_all_tags', app.get_all_tags)
+    tags = construits['index']['tags']
+    selections = cycle([rng.sample(tags, rng.randint(1, 5)) for _ in range(100)])
+    run('filter_metiers_by_tags', lambda: app.filter_metiers_by_tags(selections()))
+    # Classements comparés: liste complète triée, puis sélection partielle des 3 premiers
+    for mode in recherche_esg.MODES_CLASSEMENT:
+        run(f'match_metiers[{mode}]',
+            lambda mode=mode: recherche_esg.match_metiers(construits['index'], selections(), mode=mode))
+        run(f'match_metiers[{mode},top3]',
+            lambda mode=mode: recherche_esg.match_metiers(construits['index'], selections(), mode=mode, limite=3))
+    # Requêtes d'un ou deux mots du vocabulaire, complets ou tronqués (saisie en cours)
+    vocabulaire = construits['texte']['vocabulaire']
+    requetes = cycle([' '.join(mot[:rng.randint(3, len(mot))] for mot in rng.sample(vocabulaire, rng.randint(1, 2)))
+                      for _ in range(100)])
+    run('search_text', lambda: recherche_esg.search_text(construits['texte'], requetes()))
+    noms = data['metiers']['Métier'].tolist()
+    metiers = cycle([rng.choice(noms) for _ in range(100)])
+    run('get_metier_details', lambda: app.get_metier_details(metiers()))
+    run('get_similar_metiers', lambda: similarite_esg.get_similar_metiers(construits['similarite'], metiers(), 3))
+    run('get_competences_par_metier',
+        lambda: catalogue_esg.get_competences_par_metier(construits['competences'], metiers()))
+    df_salaire = data['salaire']
+    salaires = cycle([df_salaire[df_salaire['Métier'] == nom] for nom in rng.sample(noms, min(10, len(noms)))])
+    run('create_salary_chart', lambda: graphiques_esg.create_salary_chart(salaires(), COULEURS).clear(),
+        nb=min(repetitions, 20))
+    return resultats
+
+# ----- COMPARAISON -----
+def compare(resultats, reference, seuil):
+    """
+    Compare les latences médianes à une exécution de référence.
+
+    Returns:
+        list: Mesures ayant régressé de plus de `seuil` (proportion)
+    """
+    regressions = []
+    print(f"{'mesure':<45} {'référence':>12} {'actuel':>12} {'écart':>8}")
+    for cle, mesure in sorted(resultats['resultats'].items()):
+        ancienne = reference.get('resultats', {}).get(cle)
+        if ancienne is None:
+            print(f"{cle:<45} {'-':>12} {mesure['p50_ms']:>10.3f}ms {'nouveau':>8}")
+            continue
+        ecart = mesure['p50_ms'] / ancienne['p50_ms'] - 1 if ancienne['p50_ms'] else 0.0
+        alerte = ' <-- régression' if ecart > seuil else ''
+        print(f"{cle:<45} {ancienne['p50_ms']:>10.3f}ms {mesure['p50_ms']:>10.3f}ms {ecart:>+7.0%}{alerte}")
+        if ecart > seuil:
+            regressions.append(cle)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks des fonctions critiques du calculateur ESG")
+    parser.add_argument('--tailles', type=int, nargs='+', default=list(TAILLES_PAR_DEFAUT),
+                        help="Nombres de métiers des catalogues synthétiques")
+    parser.add_argument('--repetitions', type=int, default=200, help="Nombre d'appels mesurés par fonction")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--taille-max-classeur', type=int, default=TAILLE_MAX_CLASSEUR,
+                        help="Taille maximale mesurée avec un aller-retour par un classeur Excel (0 pour aucune)")
+    parser.add_argument('--sortie', default='benchmarks/resultats.json', help="Fichier JSON des résultats")
+    parser.add_argument('--reference', default=REFERENCE_PAR_DEFAUT,
+                        help="Fichier JSON d'une exécution de référence à comparer ('' pour aucune)")
+    parser.add_argument('--seuil', type=float, default=0.2,
+                        help="Écart de latence médiane considéré comme une régression (0.2 = +20 %%)")
+    args = parser.parse_args()
+
+    logging.getLogger("calculateur_esg").setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    resultats = {
+        'meta': {
+            'date': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'plateforme': platform.platform(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'seed': args.seed,
+            'generateur': 'generateur_esg',
+            'repetitions': args.repetitions
+        },
+        'resultats': {}
+    }
+    # Lire la référence avant d'écrire les résultats: --sortie peut la remplacer
+    reference = None
+    if args.reference and os.path.abspath(args.reference) != os.path.abspath(args.sortie):
+        try:
+            with open(args.reference, encoding='utf-8') as f:
+                reference = json.load(f)
+        except FileNotFoundError:
+            logger.warning(f"Référence {args.reference} introuvable, aucune comparaison")
+
+    for taille in args.tailles:
+        for nom, mesure in bench_size(taille, args.repetitions, args.seed, args.taille_max_classeur).items():
+            resultats['resultats'][f"{nom}@{taille}"] = mesure
+
+    with open(args.sortie, 'w', encoding='utf-8') as f:
+        json.dump(resultats, f, indent=2, ensure_ascii=False)
+    logger.info(f"Résultats enregistrés dans {args.sortie}")
+
+    if reference is not None:
+        logger.info(f"Comparaison à {args.reference} ({reference.get('meta', {}).get('plateforme', '?')})")
+        regressions = compare(resultats, reference, args.seuil)
+        if regressions:
+            print(f"{len(regressions)} régression(s) au-delà de {args.seuil:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -5,26 +5,42 @@ Version MVP 2.0 - Refonte avec sélection par tags
 """
 
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import requests
-import json
-import hubspot
-import numpy as np
+import streamlit.components.v1 as components
 import logging
-from hubspot.crm.contacts import SimplePublicObjectInputForCreate, SimplePublicObjectInput, ApiException
+import threading
+import uuid
+from types import MappingProxyType
+from demarrage_esg import lazy_import, log_import_report
+import instrumentation_esg
+from journal_esg import setup_logging
 
-# Configuration du logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("logs/calculateur_esg.log"),
-        logging.StreamHandler()
-    ]
-)
+# Dépendances lourdes chargées à leur première utilisation (la page d'accueil n'en a pas besoin)
+pd = lazy_import("pandas")
+catalogue_esg = lazy_import("catalogue_esg")
+recherche_esg = lazy_import("recherche_esg")
+graphiques_esg = lazy_import("graphiques_esg")
+hubspot_esg = lazy_import("hubspot_esg")
+theme_esg = lazy_import("theme_esg")
+similarite_esg = lazy_import("similarite_esg")
+memoire_esg = lazy_import("memoire_esg")
+
+# Configuration du logging: écriture en arrière-plan via une file, avec rotation par taille
+# (options facultatives dans la section [journal] de st.secrets)
+setup_logging(**(st.secrets.get("journal", {}) if st.secrets.load_if_toml_exists() else {}))
 logger = logging.getLogger("calculateur_esg")
 
+# Journaliser une seule fois par processus le coût des imports au démarrage
+log_import_report()
+
+# Émoji associé à chaque direction de tendance du marché
+TENDANCE_EMOJIS = {
+    'hausse': "🚀",
+    'croissance': "📈",
+    'stable': "➡️",
+    'baisse': "📉",
+    'inconnue': "📊"
+}
+
 # Note: Le mode clair est forcé via .streamlit/config.toml pour garantir une expérience utilisateur cohérente
 
 # ----- CONFIGURATION DE L'APPLICATION -----
@@ -36,14 +52,6 @@ def configure_app():
         layout="wide"
     )
     
-    # Forcer le mode clair directement dans le code pour tous les composants
-    st.markdown("""
-        <script>
-        // Désactiver le mode sombre et forcer le mode clair
-        localStorage.setItem('theme', 'light');
-        </script>
-        """, unsafe_allow_html=True)
-    
     # Ajouter un script JavaScript pour scroller en haut de la page si nécessaire
     if st.session_state.get('scroll_to_top', False):
         st.session_state.scroll_to_top = False  # Réinitialiser le flag
@@ -72,258 +80,29 @@ def configure_app():
         'background': "#f7f7f5"   # Fond gris
     })
     
-    # CSS amélioré pour forcer le mode clair sur TOUS les éléments
-    colors = st.session_state.colors
-    st.markdown(f"""
-    <style>
-    /* FORÇAGE GLOBAL DU MODE CLAIR */
-    :root {{
-        color-scheme: light !important;
-    }}
-    
-    /* Forcer le fond principal en mode clair */
-    .stApp, .main, [data-testid="stAppViewContainer"], [data-testid="stHeader"] {{
-        background-color: {colors['background']} !important;
-        color: #333333 !important;
-    }}
-    
-    /* Forcer TOUS les conteneurs Streamlit en mode clair */
-    .stApp > *, .main > *, section[data-testid="stSidebar"], 
-    .element-container, .stMarkdown, .stAlert, div[data-testid="column"] {{
-        background-color: transparent !important;
-        color: #333333 !important;
-    }}
-    
-    /* Styles existants pour les composants custom */
-    .stButton>button {{
-        background-color: {colors['secondary']} !important;
-        color: #003366 !important;
-        font-weight: bold;
-        border-radius: 5px;
-        border: none;
-        padding: 10px 20px;
-        transition: all 0.3s ease;
-    }}
-    .stButton>button:hover {{
-        transform: translateY(-2px);
-        box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-    }}
-    .progress-bar {{
-        height: 10px;
-        background-color: #E0E0E0;
-        border-radius: 5px;
-        margin-bottom: 20px;
-    }}
-    .progress-bar-fill {{
-        height: 100%;
-        background-color: {colors['secondary']};
-        border-radius: 5px;
-    }}
-    .highlight-box {{
-        padding: 20px;
-        border-radius: 10px;
-        background-color: white !important;
-        color: #333333 !important;
-        border-left: 5px solid {colors['primary']};
-        margin: 20px 0;
-        box-shadow: 0 2px 5px rgba(0,0,0,0.05);
-    }}
-    .highlight-box * {{
-        color: #333333 !important;
-    }}
-    .feature-card {{
-        padding: 15px;
-        border-radius: 10px;
-        background-color: white !important;
-        color: #333333 !important;
-        margin-bottom: 15px;
-        box-shadow: 0 2px 5px rgba(0,0,0,0.05);
-        border-top: 3px solid {colors['secondary']};
-    }}
-    .feature-card * {{
-        color: #333333 !important;
-    }}
-    .tag-selector {{
-        display: inline-block;
-        margin: 5px;
-        padding: 8px 15px;
-        background-color: white !important;
-        color: #333333 !important;
-        border: 1px solid #ddd;
-        border-radius: 20px;
-        cursor: pointer;
-        transition: all 0.2s;
-    }}
-    .tag-selector:hover {{
-        border-color: {colors['primary']};
-    }}
-    .tag-selected {{
-        background-color: {colors['primary']} !important;
-        color: white !important;
-        border-color: {colors['primary']};
-    }}
-    div[data-testid="stCheckbox"] {{
-        background-color: white !important;
-        border-radius: 8px;
-        padding: 2px 10px;
-        margin: 4px;
-        border: 1px solid #e6e6e6;
-        box-shadow: 0 1px 2px rgba(0,0,0,0.05);
-        transition: all 0.2s;
-    }}
-    div[data-testid="stCheckbox"]:hover {{
-        border-color: {colors['primary']};
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }}
-    div[data-testid="stCheckbox"] label {{
-        color: #333333 !important;
-    }}
-    /* Pour les cases cochées */
-    div[data-testid="stCheckbox"] label:has(input:checked) {{
-        font-weight: 600;
-        color: {colors['primary']} !important;
-    }}
-    .metier-card {{
-        padding: 15px;
-        border-radius: 10px;
-        background-color: white !important;
-        color: #333333 !important;
-        margin-bottom: 15px;
-        box-shadow: 0 2px 5px rgba(0,0,0,0.05);
-        border-left: 3px solid {colors['primary']};
-        cursor: pointer;
-        transition: all 0.2s;
-    }}
-    .metier-card * {{
-        color: #333333 !important;
-    }}
-    .metier-card:hover {{
-        transform: translateY(-2px);
-        box-shadow: 0 4px 10px rgba(0,0,0,0.1);
-    }}
-    
-    /* Headers avec couleur primaire */
-    h1, h2, h3, h4, h5, h6 {{
-        color: {colors['primary']} !important;
-    }}
-    
-    /* Forcer les couleurs du texte en mode clair pour TOUS les composants Streamlit */
-    [data-testid="stMarkdownContainer"], [data-testid="stText"] {{
-        color: #333333 !important;
-        background-color: transparent !important;
-    }}
-    
-    /* Forcer le texte dans tous les éléments génériques */
-    p, li, span, label, div, td, th {{
-        color: #333333 !important;
-    }}
-    
-    /* Sélecteurs et dropdowns */
-    [data-baseweb="select"], [data-baseweb="popover"], [data-baseweb="menu"], 
-    [data-baseweb="tag"], [data-baseweb="select-dropdown"] {{
-        background-color: white !important;
-        color: #333333 !important;
-        border-color: #cccccc !important;
-    }}
-    
-    /* Options des menus déroulants */
-    [role="option"], [data-baseweb="menu"] ul li, [data-baseweb="menu"] div {{
-        background-color: white !important;
-        color: #333333 !important;
-    }}
-    [role="option"]:hover {{
-        background-color: #f0f0f0 !important;
-        color: #333333 !important;
-    }}
-    
-    /* Placeholders et valeurs sélectionnées */
-    [data-baseweb="select"] div, [data-baseweb="select-value"], 
-    [data-baseweb="placeholder"], [data-baseweb="select-value-container"] {{
-        background-color: white !important;
-        color: #333333 !important;
-    }}
-    
-    /* Tags dans multiselect */
-    [data-baseweb="tag"] {{
-        background-color: #f0f0f0 !important;
-        color: #333333 !important;
-    }}
-    
-    /* Formulaires et inputs */
-    form {{
-        background-color: white !important;
-    }}
-    
-    input, textarea, select {{
-        background-color: white !important;
-        color: #333333 !important;
-        border-color: #CCCCCC !important;
-    }}
-    
-    input::placeholder, textarea::placeholder {{
-        color: #666666 !important;
-        opacity: 1 !important;
-    }}
-    
-    /* Forcer les inputs dans les sélecteurs */
-    [data-baseweb="select"] input {{
-        color: #333333 !important;
-        background-color: white !important;
-    }}
-    
-    /* Messages d'alerte et info boxes */
-    .stAlert, [data-testid="stAlert"] {{
-        background-color: white !important;
-        color: #333333 !important;
-    }}
-    
-    /* Expanders */
-    [data-testid="stExpander"] {{
-        background-color: white !important;
-    }}
-    [data-testid="stExpander"] * {{
-        color: #333333 !important;
-    }}
-    
-    /* Radio buttons et selectbox */
-    [data-testid="stRadio"] label, [data-testid="stSelectbox"] label {{
-        color: #333333 !important;
-    }}
-    
-    /* Force le mode clair sur les graphiques matplotlib */
-    .stPyplot {{
-        background-color: white !important;
-    }}
-    
-    /* Classes custom du projet */
-    .info-card {{
-        background-color: white !important;
-        color: #333333 !important;
-    }}
-    .info-card * {{
-        color: #333333 !important;
-    }}
-    
-    .premium-box {{
-        background-color: white !important;
-        color: #333333 !important;
-    }}
-    .premium-box * {{
-        color: #333333 !important;
-    }}
-    
-    .cta-message {{
-        background-color: #f0f7ff !important;
-        color: #333333 !important;
-    }}
-    
-    /* Force headers GitHub style */
-    .markdown-body h1, .markdown-body h2, .markdown-body h3, 
-    .markdown-body h4, .markdown-body h5, .markdown-body h6 {{
-        color: {colors['primary']} !important;
-    }}
-    </style>
-    """, unsafe_allow_html=True)
+    # CSS et JavaScript du thème (mode clair forcé sur TOUS les éléments), compilés une fois
+    inject_theme(st.session_state.colors)
+
+def inject_theme(colors):
+    """
+    Injecte le thème compilé dans la page.
+
+    Le thème est ajouté au <head> de la page une seule fois par session (et à
+    nouveau si la palette change): les reruns suivants n'envoient plus la
+    feuille de style. En mode "markdown", la feuille de style est envoyée à
+    chaque rerun, comme avant.
+    """
+    bundle = theme_esg.build_theme_bundle(colors)
+    if get_config("interface", "injection_theme", "unique") == "markdown":
+        st.markdown(f"<style>{bundle['css']}</style>", unsafe_allow_html=True)
+        return
+
+    if st.session_state.get('theme_empreinte') == bundle['empreinte']:
+        return
+    components.html(bundle['html'], height=0)
+    st.session_state.theme_empreinte = bundle['empreinte']
+    logger.info(f"Thème {bundle['empreinte']} injecté dans la session ({bundle['taille'] / 1024:.1f} Ko), "
+                f"les reruns suivants ne le renvoient plus")
 
 # ----- GESTION DE L'ÉTAT DE L'APPLICATION -----
 def initialize_session_state():
@@ -338,13 +117,14 @@ def initialize_session_state():
             'opt_in': True,       # Case à cocher RGPD cochée par défaut
             'tags': [],           # Tags d'intérêt sélectionnés
             'entreprises': [],    # Types d'entreprises sélectionnés
-            'metiers_matches': [], # Métiers correspondant aux tags
+            'metiers_matches': (), # Références (métier, scores) des métiers correspondant aux tags
             'metier_selectionne': "", # Métier sélectionné pour la page détaillée
             'hubspot_submitted': False  # Indicateur d'envoi à Hubspot
         },
         'selected_tags': [],      # Tags sélectionnés
         'selected_entreprises': [], # Types d'entreprises sélectionnés
         'email_submitted': False,  # Indicateur de soumission d'email
+        'session_id': uuid.uuid4().hex,  # Identifiant de session (limitation des soumissions)
         'scroll_to_top': True     # Indicateur de défilement automatique vers le haut (activé par défaut)
     }
     
@@ -366,109 +146,182 @@ def change_page(page_name):
     st.session_state.scroll_to_top = True
     st.rerun()
 
+def get_config(section, key, default=None):
+    """Lit une option de configuration dans st.secrets, avec une valeur par défaut."""
+    # Sans fichier secrets.toml, utiliser la valeur par défaut (sans afficher d'erreur)
+    if not st.secrets.load_if_toml_exists():
+        return default
+    return st.secrets.get(section, {}).get(key, default)
+
 # ----- INTÉGRATION HUBSPOT -----
+@st.cache_resource
+def get_hubspot_client():
+    """Crée le client Hubspot partagé par tout le processus (connexions réutilisées, SDK chargé au premier envoi)."""
+    api_key = get_config("hubspot", "api_key")
+    if not api_key:
+        return None
+    return hubspot_esg.HubSpotContacts(api_key, host=get_config("hubspot", "host"))
+
+@st.cache_resource
+def get_lead_outbox():
+    """
+    Ouvre la file d'envoi durable des leads et démarre la synchronisation Hubspot.
+
+    La file et son thread sont partagés par toutes les sessions du processus.
+    """
+    outbox = hubspot_esg.LeadOutbox(get_config("hubspot", "outbox", hubspot_esg.FICHIER_OUTBOX))
+    client = get_hubspot_client()
+
+    worker = None
+    if client is not None:
+        # Limiteur de débit et disjoncteur partagés par toutes les sessions
+        limiteur = hubspot_esg.TokenBucket(
+            debit=get_config("hubspot", "requetes_par_seconde", hubspot_esg.REQUETES_PAR_SECONDE),
+            capacite=get_config("hubspot", "rafale", hubspot_esg.RAFALE)
+        )
+        disjoncteur = hubspot_esg.CircuitBreaker(
+            seuil=get_config("hubspot", "seuil_disjoncteur", hubspot_esg.SEUIL_DISJONCTEUR),
+            delai=get_config("hubspot", "delai_disjoncteur", hubspot_esg.DELAI_DISJONCTEUR)
+        )
+        worker = hubspot_esg.HubSpotSyncWorker(
+            outbox, client.upsert,
+            intervalle=get_config("hubspot", "intervalle_synchro", 5.0),
+            limiteur=limiteur,
+            disjoncteur=disjoncteur
+        )
+        worker.start()
+    else:
+        logger.warning("Clé API Hubspot absente: les leads restent dans la file d'envoi")
+    logger.info(f"File d'envoi Hubspot ouverte: {outbox.stats()}")
+    return outbox, worker
+
+@st.cache_resource
+def get_submission_throttle():
+    """Crée le limiteur de soumissions (par session et par email) partagé par le processus."""
+    return hubspot_esg.SubmissionThrottle(
+        delai_session=get_config("hubspot", "delai_session", hubspot_esg.DELAI_SESSION),
+        delai_email=get_config("hubspot", "delai_email", hubspot_esg.DELAI_EMAIL)
+    )
+
 def send_data_to_hubspot(user_data):
     """
-    Envoie les données utilisateur à Hubspot via l'API.
-    
+    Enregistre les données utilisateur dans la file d'envoi vers Hubspot.
+
+    L'envoi réel est fait en arrière-plan, avec nouvelles tentatives en cas
+    d'échec: la soumission du formulaire n'attend pas l'API Hubspot.
+
     Args:
         user_data: Dictionnaire contenant les données de l'utilisateur
-    
+
     Returns:
-        bool: True si l'envoi est réussi, sinon lève une exception
+        bool: True si le lead est enregistré, sinon lève une exception
+        (SubmissionThrottled si la soumission est trop rapprochée de la précédente)
     """
+    # Refuser les soumissions trop rapprochées (lève SubmissionThrottled)
+    throttle = get_submission_throttle()
     try:
-        # Récupérer la clé API depuis les secrets
-        api_key = st.secrets["hubspot"]["api_key"]
-        
-        # Initialiser le client Hubspot avec token d'accès
-        client = hubspot.Client.create(access_token=api_key)
-        
-        # Préparer les propriétés pour l'API Hubspot (UNIQUEMENT les informations de base)
-        properties = {
-            "firstname": user_data.get('prenom', ''),
-            "lastname": user_data.get('nom', ''), 
-            "email": user_data.get('email', ''),
-            "phone": user_data.get('telephone', ''),
-            "hs_marketable_status": True  # Toujours envoyer True à Hubspot
-        }
-        
-        # NE PAS envoyer les tags ni le métier sélectionné à Hubspot
-        
-        # Rechercher si le contact existe déjà
-        existing_contact = None
-        try:
-            # Utiliser l'API pour rechercher par email
-            filter_groups = [{"filters": [{"propertyName": "email", "operator": "EQ", "value": user_data.get('email')}]}]
-            public_object_search_request = {"filterGroups": filter_groups}
-            contact_search_results = client.crm.contacts.search_api.do_search(public_object_search_request=public_object_search_request)
-            
-            # Vérifier s'il y a des résultats
-            if contact_search_results.results and len(contact_search_results.results) > 0:
-                existing_contact = contact_search_results.results[0]
-        except Exception as search_error:
-            # Si la recherche échoue, continuer pour créer un nouveau contact
-            logger.warning(f"Erreur de recherche contact: {str(search_error)}")
-            pass
-
-        # Mettre à jour le contact existant ou en créer un nouveau
-        if existing_contact:
-            # Mettre à jour le contact existant
-            contact_id = existing_contact.id
-            simple_public_object_input = SimplePublicObjectInput(properties=properties)
-            api_response = client.crm.contacts.basic_api.update(contact_id=contact_id, simple_public_object_input=simple_public_object_input)
-            logger.info(f"Contact mis à jour dans Hubspot: {contact_id}")
+        throttle.check(st.session_state.session_id, user_data.get('email', ''))
+    except hubspot_esg.SubmissionThrottled:
+        logger.warning(f"Soumission limitée, compteurs: {throttle.stats()}")
+        raise
+    try:
+        outbox, worker = get_lead_outbox()
+        properties = hubspot_esg.build_contact_properties(user_data)
+        if outbox.enqueue(properties):
+            logger.info("Lead enregistré dans la file d'envoi Hubspot")
+            if worker is not None:
+                worker.notify()
         else:
-            # Créer un nouveau contact
-            simple_public_object_input_for_create = SimplePublicObjectInputForCreate(properties=properties)
-            api_response = client.crm.contacts.basic_api.create(simple_public_object_input_for_create=simple_public_object_input_for_create)
-            logger.info(f"Nouveau contact créé dans Hubspot: {api_response.id}")
-        
+            logger.info("Lead identique déjà envoyé à Hubspot, rien à faire")
+        # Compter la soumission seulement une fois le lead enregistré
+        throttle.record(st.session_state.session_id, user_data.get('email', ''))
         return True
     except Exception as e:
         # Journaliser l'erreur mais la remonter pour gestion
-        logger.error(f"Erreur lors de l'envoi des données à Hubspot: {str(e)}")
+        logger.error(f"Erreur lors de l'enregistrement du lead: {str(e)}")
         raise e
 
 # ----- GESTION DES DONNÉES -----
-@st.cache_data(ttl=3600)  # Cache de 1 heure
-def load_data():
-    """Charge les données depuis le fichier Excel."""
-    # Note: avec @st.cache_data, on n'utilise plus st.session_state pour le cache
-    
+# Pages de début de parcours: une session y adopte la dernière version du catalogue
+PAGES_DEBUT_PARCOURS = ("accueil", "interests")
+# Nombre de métiers proposés sur la page de résultats
+NB_METIERS_AFFICHES = 3
+# Nombre de métiers proposés par la recherche par mots-clés
+NB_RESULTATS_RECHERCHE = 5
+# Nombre de métiers proches proposés sur la fiche d'un métier
+NB_METIERS_PROCHES = 3
+
+@st.cache_resource
+def get_catalogue_watcher():
+    """
+    Charge le catalogue et démarre la surveillance du classeur (une fois par processus).
+
+    Le catalogue est rechargé en arrière-plan dès que le classeur change,
+    au lieu d'attendre l'expiration d'un cache.
+    """
+    watcher = catalogue_esg.CatalogueWatcher(
+        intervalle=get_config("catalogue", "intervalle_surveillance", catalogue_esg.INTERVALLE_SURVEILLANCE),
+        compact=get_config("catalogue", "compact", False)
+    )
+    watcher.start()
+    logger.info(f"Surveillance du catalogue démarrée: {watcher.stats()}")
+    return watcher
+
+def get_session_catalogue():
+    """
+    Retourne la version du catalogue utilisée par la session.
+
+    Une session garde la même version pendant tout son parcours (intérêts,
+    résultats, fiches): elle ne passe à la dernière version publiée qu'en
+    revenant à une page de début de parcours.
+    """
+    catalogue = st.session_state.get('catalogue')
+    if catalogue is not None and st.session_state.get('page') not in PAGES_DEBUT_PARCOURS:
+        return catalogue
     try:
-        file_path = 'data/IED _ esg_calculator data.xlsx'
-        
-        # Charger toutes les feuilles directement avec leurs noms standardisés
-        df_metiers = pd.read_excel(file_path, sheet_name='metier')
-        df_salaire = pd.read_excel(file_path, sheet_name='salaire')
-        df_competences = pd.read_excel(file_path, sheet_name='competences_cles')
-        df_formations = pd.read_excel(file_path, sheet_name='formations_IED')
-        df_tendances = pd.read_excel(file_path, sheet_name='tendances_marche')
-        
-        logger.debug(f"Colonnes disponibles dans la feuille métier: {df_metiers.columns.tolist()}")
-        
-        # Retourner directement les données (le cache est géré par Streamlit)
-        data = {
-            'salaire': df_salaire,
-            'competences': df_competences,
-            'metiers': df_metiers,
-            'formations': df_formations,
-            'tendances': df_tendances
-        }
-        logger.info("Toutes les données ont été chargées avec succès.")
-        return data
+        courant = get_catalogue_watcher().courant
     except Exception as e:
         logger.error(f"Erreur critique lors du chargement des données: {str(e)}")
         st.error(f"Erreur lors du chargement des données: {str(e)}")
-        return {
-            'salaire': pd.DataFrame(),
-            'competences': pd.DataFrame(),
-            'metiers': pd.DataFrame(),
-            'formations': pd.DataFrame(),
-            'tendances': pd.DataFrame()
-        }
+        # Ne pas épingler le catalogue vide: le chargement sera retenté au prochain rerun
+        return catalogue or catalogue_esg.Catalogue.empty()
+    if catalogue is not courant:
+        if catalogue is not None:
+            logger.info(f"Session {st.session_state.get('session_id', '-')[:8]} passée au catalogue "
+                        f"{courant.empreinte[:12]}")
+        st.session_state.catalogue = courant
+    return courant
+
+@instrumentation_esg.timed('donnees')
+def load_data():
+    """Retourne les données du catalogue de la session (feuilles du fichier Excel)."""
+    data = get_session_catalogue().data
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Colonnes disponibles dans la feuille métier: {data['metiers'].columns.tolist()}")
+    
+    return data
+
+@instrumentation_esg.timed('donnees')
+def load_tag_index():
+    """Retourne l'index inversé des tags, construit une seule fois par version du catalogue."""
+    return get_session_catalogue().index
 
+@instrumentation_esg.timed('donnees')
+def load_text_index():
+    """Retourne l'index plein texte des métiers, construit une seule fois par version du catalogue."""
+    return get_session_catalogue().texte
+
+@instrumentation_esg.timed('donnees')
+def search_metiers(requete):
+    """Cherche les métiers correspondant à des mots-clés (noms, tags, compétences, formations)."""
+    resultats = recherche_esg.search_text(load_text_index(), requete, limite=NB_RESULTATS_RECHERCHE)
+    secteurs = load_tag_index()['secteur_par_metier']
+    for resultat in resultats:
+        resultat['Secteur'] = secteurs.get(resultat['Metier'], recherche_esg.SECTEUR_PAR_DEFAUT)
+    return resultats
+
+@instrumentation_esg.timed('donnees')
 def get_all_tags():
     """Récupère tous les tags disponibles depuis la feuille métier."""
     data = load_data()
@@ -487,13 +340,8 @@ def get_all_tags():
         return ["Finance durable", "ESG", "Data/Analytics", "Reporting", "Conseil", "Investissement", 
                 "Développement durable", "RSE", "Audit", "Conformité", "Risk Management"]
     
-    # Extraire et dédupliquer tous les tags
-    all_tags = []
-    for tags_str in df_metiers['Tags'].dropna():
-        # Vérifier le type de données pour éviter les erreurs
-        if isinstance(tags_str, str):
-            tags = [tag.strip() for tag in tags_str.split(',')]
-            all_tags.extend(tags)
+    # Les tags dédupliqués et triés sont fournis par l'index construit au chargement
+    all_tags = load_tag_index()['tags']
     
     # Si aucun tag n'a été trouvé, utiliser des valeurs par défaut
     if not all_tags:
@@ -501,8 +349,8 @@ def get_all_tags():
         return ["Finance durable", "ESG", "Data/Analytics", "Reporting", "Conseil", "Investissement", 
                 "Développement durable", "RSE", "Audit", "Conformité", "Risk Management"]
     
-    # Retourner la liste unique triée
-    return sorted(list(set(all_tags)))
+    # Retourner une copie de la liste triée (l'index est partagé entre sessions)
+    return list(all_tags)
 
 def get_all_entreprises():
     """Récupère tous les types d'entreprises disponibles."""
@@ -516,342 +364,118 @@ def get_all_entreprises():
         "Cabinet de conseil"
     ]
 
+@instrumentation_esg.timed('donnees')
 def filter_metiers_by_tags(selected_tags):
-    """Filtre les métiers selon les tags sélectionnés."""
-    data = load_data()
-    df_metiers = data.get('metiers', pd.DataFrame())
-    df_salaire = data.get('salaire', pd.DataFrame())
-    
-    # Si les données métier sont vides ou si aucun tag n'est sélectionné, utiliser les données salaire comme fallback
-    if df_metiers.empty or not selected_tags:
-        if df_salaire.empty:
-            # Aucune donnée disponible
-            return []
-        else:
-            # Utiliser les données de salaire pour créer une liste de métiers avec minimum d'information
-            logger.info("Utilisation des données de salaire comme fallback pour les métiers")
-            # Prendre jusqu'à 5 métiers de la table salaire
-            fallback_metiers = []
-            for i, (_, row) in enumerate(df_salaire.iterrows()):
-                if i >= 5:  # Limiter à 5 métiers pour le fallback
-                    break
-                    
-                metier_info = {
-                    'Metier': row['Métier'],
-                    'Secteur': row['Secteur'] if 'Secteur' in row else 'Non spécifié',
-                    'Description': row.get('Description', 'Information non disponible'),
-                    'Tags': [],
-                    'match_score': 1  # Score arbitraire
-                }
-                fallback_metiers.append(metier_info)
-            return fallback_metiers
-    
-    # Maintenant nous savons que la colonne Tags existe dans le fichier reformaté
-    tag_column = 'Tags'
-    
-    # Filtrer les métiers qui contiennent au moins un des tags sélectionnés
-    matching_metiers = []
-    
-    for _, row in df_metiers.iterrows():
-        if pd.isna(row[tag_column]):
-            continue
-            
-        # Vérifier que c'est bien une chaîne de caractères
-        if not isinstance(row[tag_column], str):
-            continue
-            
-        metier_tags = [tag.strip() for tag in row[tag_column].split(',')]
-        
-        # Vérifier si au moins un tag sélectionné est présent
-        if any(tag in metier_tags for tag in selected_tags):
-            # Calculer un score de correspondance (nombre de tags correspondants)
-            match_score = sum(1 for tag in selected_tags if tag in metier_tags)
-            
-            # Récupérer les informations du métier
-            # Chercher le secteur dans la table des salaires si disponible
-            secteur = 'Non spécifié'
-            if not df_salaire.empty:
-                salaire_row = df_salaire[df_salaire['Métier'] == row['Métier']]
-                if not salaire_row.empty and 'Secteur' in salaire_row.columns:
-                    secteur = salaire_row['Secteur'].iloc[0]
-            
-            matching_metiers.append({
-                'Metier': row['Métier'],
-                'Secteur': secteur,  # Utiliser le secteur trouvé dans la table des salaires
-                'Description': row.get('Description', 'Information non disponible'),
-                'Tags': metier_tags,
-                'match_score': match_score
-            })
-    
-    # Si aucun métier ne correspond, utiliser quelques métiers par défaut de la table salaire
-    if not matching_metiers and not df_salaire.empty:
-        logger.info("Aucun métier correspondant aux tags, utilisation de données de fallback")
-        # Prendre jusqu'à 3 métiers de la table salaire
-        for i, (_, row) in enumerate(df_salaire.iterrows()):
-            if i >= 3:  # Limiter à 3 métiers pour le fallback
-                break
-                
-            metier_info = {
-                'Metier': row['Métier'],
-                'Secteur': row['Secteur'] if 'Secteur' in row else 'Non spécifié',
-                'Description': row.get('Description', f"Métier en rapport avec les thématiques: {', '.join(selected_tags)}"),
-                'Tags': selected_tags,  # Associer les tags sélectionnés
-                'match_score': 1  # Score arbitraire
-            }
-            matching_metiers.append(metier_info)
-    
-    # Trier par score de correspondance décroissant
-    matching_metiers.sort(key=lambda x: x['match_score'], reverse=True)
-    
-    return matching_metiers
+    """
+    Filtre les métiers selon les tags sélectionnés.
+
+    Retourne les références des `NB_METIERS_AFFICHES` meilleurs métiers: des
+    tuples (nom du métier, match_score, pertinence), où match_score est le
+    nombre de tags en commun et pertinence le score du classement configuré.
+    Les entrées de repli (aucun tag ou aucune correspondance) ont match_score 1
+    et pertinence None. Les secteurs, descriptions et tags s'obtiennent avec
+    `resolve_metiers_matches`.
+
+    Returns:
+        list: Tuples (métier, match_score, pertinence), meilleurs d'abord
+    """
+    # Les scores sont calculés sur l'index inversé construit au chargement du catalogue:
+    # seuls les métiers affichés sont sélectionnés, sans trier toutes les correspondances
+    return recherche_esg.match_metier_refs(
+        load_tag_index(), selected_tags,
+        mode=get_config("recherche", "classement", recherche_esg.CLASSEMENT_PAR_DEFAUT),
+        limite=NB_METIERS_AFFICHES,
+        avec_description=get_config("recherche", "description", False)
+    )
+
+def store_metiers_matches(selected_tags):
+    """
+    Calcule les métiers correspondant aux tags et en garde les références dans la session.
 
+    La session ne conserve que des tuples (métier, scores): les secteurs,
+    descriptions et tags sont lus dans l'index partagé au moment de l'affichage.
+    """
+    metiers_matches = tuple(filter_metiers_by_tags(selected_tags))
+    st.session_state.user_data['metiers_matches'] = metiers_matches
+    if logger.isEnabledFor(logging.DEBUG):
+        taille = memoire_esg.session_size(st.session_state.user_data, load_tag_index())
+        logger.debug(f"Session {st.session_state.get('session_id', '-')[:8]}: données utilisateur "
+                     f"{taille} octets ({len(metiers_matches)} métiers retenus)")
+    return metiers_matches
+
+@instrumentation_esg.timed('donnees')
+def resolve_metiers_matches(metiers_matches):
+    """Retrouve les champs d'affichage des métiers retenus dans l'index du catalogue de la session."""
+    return recherche_esg.resolve_metiers(load_tag_index(), metiers_matches, st.session_state.selected_tags)
+
+@instrumentation_esg.timed('donnees')
+def load_metier_bundles():
+    """Retourne les fiches métier, matérialisées une seule fois par version du catalogue."""
+    return get_session_catalogue().bundles
+
+@instrumentation_esg.timed('donnees')
+def get_metiers_proches(metier_nom):
+    """Retourne les métiers proches d'un métier (voisins précalculés au chargement du catalogue)."""
+    return similarite_esg.get_similar_metiers(get_session_catalogue().similarite, metier_nom,
+                                              limite=NB_METIERS_PROCHES)
+
+@instrumentation_esg.timed('donnees')
 def get_metier_details(metier_nom):
     """Récupère toutes les informations pour un métier donné."""
-    data = load_data()
+    # Les fiches sont précalculées au chargement du catalogue: simple recherche dans un dictionnaire
+    metier_data = load_metier_bundles().get(metier_nom)
     
-    # Récupérer les informations de base du métier
-    df_metiers = data.get('metiers', pd.DataFrame())
-    metier_info = df_metiers[df_metiers['Métier'] == metier_nom].to_dict('records')
-    
-    if not metier_info:
-        logger.warning(f"Aucune information de base trouvée pour le métier: {metier_nom}")
+    if metier_data is None:
+        logger.warning(f"Aucune information trouvée pour le métier: {metier_nom}")
         # Créer une entrée minimale pour éviter de retourner None
-        metier_data = {'Métier': metier_nom}
-    else:
-        metier_data = metier_info[0]
-    
-    # Ajouter les données salariales
-    df_salaire = data.get('salaire', pd.DataFrame())
-    salaire_info = df_salaire[df_salaire['Métier'] == metier_nom]
-    
-    if not salaire_info.empty:
-        logger.debug(f"Données salariales trouvées pour {metier_nom}")
-        # Récupérer la description du métier à partir de la feuille salaire
-        if 'Description' in salaire_info.columns and not metier_data.get('Description'):
-            desc = salaire_info['Description'].iloc[0]
-            if pd.notna(desc) and desc:
-                metier_data['Description'] = desc
-        
-        metier_data['salaire'] = salaire_info.to_dict('records')
-    else:
-        logger.warning(f"Aucune donnée salariale trouvée pour {metier_nom}")
-    
-    # Ajouter les compétences
-    df_competences = data.get('competences', pd.DataFrame())
-    competences_filtered = get_competences_par_metier(df_competences, metier_nom)
-    
-    if not competences_filtered.empty:
-        logger.debug(f"Compétences trouvées pour {metier_nom}")
-        metier_data['competences'] = competences_filtered.to_dict('records')
-    else:
-        logger.warning(f"Aucune compétence trouvée pour {metier_nom}")
-    
-    # Ajouter les formations
-    df_formations = data.get('formations', pd.DataFrame())
-    formations_filtered = get_formations_par_metier(df_formations, metier_nom)
-    
-    if not formations_filtered.empty:
-        logger.debug(f"Formations trouvées pour {metier_nom}")
-        metier_data['formations'] = formations_filtered.to_dict('records')
-    else:
-        logger.warning(f"Aucune formation trouvée pour {metier_nom}")
-    
-    # Ajouter les tendances du marché
-    df_tendances = data.get('tendances', pd.DataFrame())
-    # Logging des informations de débogage
-    logger.debug(f"Colonnes dans df_tendances: {df_tendances.columns.tolist()}")
-    if 'Métier' in df_tendances.columns:
-        logger.debug(f"Valeurs uniques de métiers dans df_tendances: {df_tendances['Métier'].unique().tolist()}")
-    else:
-        logger.warning("Aucune colonne Métier dans les données de tendances")
-    
-    tendances_filtered = df_tendances[df_tendances['Métier'] == metier_nom]
-    
-    if not tendances_filtered.empty:
-        logger.debug(f"Tendances trouvées pour {metier_nom}")
-        metier_data['tendances'] = tendances_filtered.to_dict('records')
-    else:
-        logger.warning(f"Aucune tendance trouvée pour {metier_nom}")
-    
-    # Convertir les types de données à des formes sérialisables si nécessaire
-    for key, value in metier_data.items():
-        if isinstance(value, pd.Series):
-            metier_data[key] = value.to_dict()
-        elif isinstance(value, np.ndarray):
-            metier_data[key] = value.tolist()
-        elif isinstance(value, np.integer):
-            metier_data[key] = int(value)
-        elif isinstance(value, np.floating):
-            metier_data[key] = float(value)
+        return MappingProxyType({'Métier': metier_nom})
     
     return metier_data
 
-def get_competences_par_metier(df_competences, metier):
-    """Retourne les compétences pour un métier donné."""
-    if df_competences.empty or 'Métier' not in df_competences.columns:
-        return pd.DataFrame()
-    
-    # Filtrer pour le métier spécifique
-    df_filtered = df_competences[df_competences['Métier'] == metier]
-    
-    if df_filtered.empty:
-        return pd.DataFrame()
-    
-    # Chercher toutes les colonnes potentielles de compétences avec différentes orthographes possibles
-    competence_patterns = ['Compétence', 'Competence', 'compétence', 'competence']
-    
-    # Récupérer toutes les colonnes qui pourraient contenir des compétences
-    competence_cols = []
-    for pattern in competence_patterns:
-        # Chercher les colonnes qui commencent par ce motif
-        pattern_cols = [col for col in df_filtered.columns if str(col).startswith(pattern)]
-        competence_cols.extend(pattern_cols)
-    
-    # Supprimer les doublons
-    competence_cols = list(set(competence_cols))
-    
-    # Si aucune colonne de compétences trouvée, essayer de trouver des colonnes numériques (Compétence1, Compétence2...)
-    if not competence_cols:
-        # Essayer de trouver des colonnes qui contiennent des chiffres et qui pourraient être des compétences
-        competence_cols = [col for col in df_filtered.columns if any(p in str(col) for p in competence_patterns) or 
-                          (any(c.isdigit() for c in str(col)) and len(str(col)) <= 15)]
-    
-    # Trier les colonnes pour avoir un ordre cohérent
-    competence_cols.sort()
-    
-    logger.debug(f"Colonnes de compétences trouvées: {competence_cols}")
-    
-    if competence_cols:
-        # Créer un nouveau DataFrame pour stocker les compétences
-        competences_list = []
-        
-        for _, row in df_filtered.iterrows():
-            # Pour chaque colonne de compétence, créer une ligne
-            for i, col in enumerate(competence_cols, 1):
-                if pd.notna(row[col]) and row[col]:
-                    competence_entry = {
-                        'Compétence': row[col],
-                        'Importance': 6-min(i, 5)  # Importance décroissante basée sur l'ordre (max 5)
-                    }
-                    competences_list.append(competence_entry)
-        
-        # Créer un DataFrame à partir de la liste
-        if competences_list:
-            return pd.DataFrame(competences_list).sort_values(by='Importance', ascending=False)
-    
-    # Si aucun format ne correspond, retourner un DataFrame vide
-    return pd.DataFrame(columns=['Compétence', 'Importance'])
+# ----- VISUALISATIONS -----
+def get_chart_engine():
+    """Retourne le moteur de rendu des graphiques configuré ('vega-lite' ou 'matplotlib')."""
+    moteur = get_config("graphiques", "moteur", graphiques_esg.MOTEUR_PAR_DEFAUT)
+    if moteur not in graphiques_esg.MOTEURS_GRAPHIQUES:
+        logger.warning(f"Moteur de graphiques inconnu '{moteur}', utilisation de {graphiques_esg.MOTEUR_PAR_DEFAUT}")
+        return graphiques_esg.MOTEUR_PAR_DEFAUT
+    return moteur
 
-def get_formations_par_metier(df_formations, metier):
-    """Retourne les formations recommandées pour un métier donné."""
-    if df_formations.empty or 'Métier' not in df_formations.columns:
-        return pd.DataFrame()
-    
-    # Filtrer pour le métier spécifique
-    df_filtered = df_formations[df_formations['Métier'] == metier]
-    
-    if df_filtered.empty:
-        return pd.DataFrame()
-    
-    # Créer une copie explicite du DataFrame pour éviter les SettingWithCopyWarning
-    df_result = df_filtered.copy()
-    
-    # Ajouter une colonne Formation si elle n'existe pas déjà
-    if 'Formation' not in df_result.columns:
-        # Utiliser Programme_Principal comme Formation si disponible
-        if 'Programme_Principal' in df_result.columns:
-            df_result['Formation'] = df_result['Programme_Principal']
-    
-    # Ajouter d'autres colonnes nécessaires pour l'affichage
-    if 'Description' not in df_result.columns and 'Modules_Clés' in df_result.columns:
-        df_result['Description'] = df_result['Modules_Clés']
-    
-    if 'Durée' not in df_result.columns and 'Durée_Formation' in df_result.columns:
-        df_result['Durée'] = df_result['Durée_Formation']
-        
-    if 'Niveau' not in df_result.columns and 'Prérequis' in df_result.columns:
-        df_result['Niveau'] = df_result['Prérequis']
-    
-    return df_result
+@instrumentation_esg.timed('graphique')
+def display_salary_chart(metier_nom, salaire_records, small_version=False):
+    """Affiche le graphique salarial d'un métier avec le moteur configuré."""
+    if get_chart_engine() == 'vega-lite':
+        # Spécification déclarative rendue côté navigateur, sans matplotlib
+        spec = graphiques_esg.build_salary_chart_spec(salaire_records, st.session_state.colors, small_version)
+        st.vega_lite_chart(spec, use_container_width=True)
+    else:
+        st.image(get_salary_chart(metier_nom, salaire_records, small_version), use_column_width=True)
 
-# ----- VISUALISATIONS -----
-def create_salary_chart(df_filtered, small_version=False):
-    """Crée un graphique d'évolution salariale.
+def get_salary_chart(metier_nom, salaire_records, small_version=False):
+    """Retourne le graphique salarial d'un métier en PNG, rendu une seule fois puis servi depuis le cache.
     
     Args:
-        df_filtered: DataFrame des données filtrées
-        small_version: Si True, crée une version plus petite pour l'aperçu
+        metier_nom: Nom du métier
+        salaire_records: Enregistrements salariaux du métier
+        small_version: Si True, retourne la version plus petite pour l'aperçu
     """
-    colors = st.session_state.colors
-    
-    # Vérifier et normaliser les colonnes obligatoires (avec ou sans accent)
-    column_mapping = {
-        'Expérience': ['Expérience', 'Experience'],
-        'Salaire_Min': ['Salaire_Min', 'Salaire_min'],
-        'Salaire_Max': ['Salaire_Max', 'Salaire_max'],
-        'Salaire_Moyen': ['Salaire_Moyen', 'Salaire_moyen']
-    }
-    
-    # Normaliser les colonnes du DataFrame
-    for expected_col, possible_cols in column_mapping.items():
-        for actual_col in possible_cols:
-            if actual_col in df_filtered.columns and expected_col != actual_col:
-                df_filtered.rename(columns={actual_col: expected_col}, inplace=True)
-    
-    # Vérifier les colonnes après normalisation
-    required_columns = ['Expérience', 'Salaire_Min', 'Salaire_Max', 'Salaire_Moyen']
-    missing_columns = [col for col in required_columns if col not in df_filtered.columns]
-    
-    if missing_columns:
-        # Colonnes manquantes - créer un graphique simple avec message d'erreur
-        fig, ax = plt.subplots(figsize=(5, 3) if not small_version else (3.5, 2.5))
-        ax.text(0.5, 0.5, f"Données salariales incomplètes\nColonnes manquantes: {', '.join(missing_columns)}", 
-                ha='center', va='center', transform=ax.transAxes, fontsize=12)
-        ax.set_axis_off()
-        return fig
-    
-    # Choisir la taille en fonction du contexte
-    if small_version:
-        # Version compact pour l'aperçu
-        fig, ax = plt.subplots(figsize=(4.5, 3))
-    else:
-        # Version normale pour les résultats détaillés - plus large et plus haute
-        fig, ax = plt.subplots(figsize=(9, 5))
-    
-    # Créer des données pour le graphique
-    experience = df_filtered['Expérience'].tolist()
-    min_salary = df_filtered['Salaire_Min'].tolist()
-    max_salary = df_filtered['Salaire_Max'].tolist()
-    avg_salary = df_filtered['Salaire_Moyen'].tolist()
-    
-    # Tracer les lignes et l'aire entre min et max
-    x = range(len(experience))
-    ax.plot(x, avg_salary, marker='o', linestyle='-', color=colors['primary'], linewidth=2, label='Salaire moyen')
-    ax.fill_between(x, min_salary, max_salary, alpha=0.2, color=colors['primary'], label='Fourchette salariale')
-    
-    # Personnaliser le graphique
-    ax.set_ylabel('Salaire annuel brut (€)', fontsize=11)
-    ax.set_xlabel('Expérience', fontsize=11)
-    ax.set_xticks(x)
-    ax.set_xticklabels(experience, fontsize=10)
-    ax.grid(True, linestyle='--', alpha=0.7)
-    
-    # Ajuster la taille de la légende
-    if small_version:
-        ax.legend(fontsize=9, loc='upper left')
-    else:
-        ax.legend(fontsize=10, loc='upper left')
-    
-    # Ajouter les valeurs (agrandies)
-    for i, avg_val in enumerate(avg_salary):
-        font_size = 9 if small_version else 10
-        y_offset = 10 if small_version else 12
-        ax.annotate(f"{avg_val}€", (i, avg_val), textcoords="offset points", 
-                    xytext=(0, y_offset), ha='center', fontweight='bold', fontsize=font_size)
-    
-    # Ajouter plus d'espace autour du graphique
-    plt.tight_layout(pad=1.5)
-    return fig
+    setup_chart_cache()
+    return graphiques_esg.get_salary_chart_image(metier_nom, salaire_records, st.session_state.colors, small_version)
+
+@st.cache_resource
+def setup_chart_cache():
+    """Dimensionne une seule fois par processus le cache des graphiques rendus."""
+    graphiques_esg.configure_chart_cache(get_config("graphiques", "taille_cache", graphiques_esg.TAILLE_CACHE_GRAPHIQUES))
+    return graphiques_esg.get_chart_cache_stats()
+
+@st.cache_resource
+def start_chart_warm_up(theme):
+    """Lance une seule fois par processus le prérendu des graphiques (dans la limite du cache)."""
+    setup_chart_cache()
+    thread = threading.Thread(target=graphiques_esg.warm_up_salary_charts, args=(load_metier_bundles(), dict(theme)),
+                              name="prechauffage-graphiques", daemon=True)
+    thread.start()
+    return thread
 
 # ----- COMPOSANTS D'INTERFACE -----
 def display_header():
@@ -925,15 +549,8 @@ def display_contact_form():
                 st.session_state.scroll_to_top = True  # Activer le défilement vers le haut
                 st.rerun()
                 return True
-            except ApiException as e:
-                # Traitement spécifique des erreurs d'API Hubspot
-                if "email provided is invalid" in str(e).lower():
-                    st.error("L'adresse email fournie n'est pas valide. Veuillez entrer une adresse email professionnelle correcte.")
-                elif "rate limit" in str(e).lower():
-                    st.error("Trop de requêtes en cours. Veuillez réessayer dans quelques instants.")
-                else:
-                    st.error(f"Erreur de validation des données: {str(e)}")
-                logger.error(f"Erreur Hubspot API: {str(e)}")
+            except hubspot_esg.SubmissionThrottled:
+                st.error("Trop de requêtes en cours. Veuillez réessayer dans quelques instants.")
                 return False
             except Exception as e:
                 # Gestion des autres types d'erreurs
@@ -995,6 +612,24 @@ def page_accueil():
         change_page("interests")
     
 
+def display_search_results(requete):
+    """Affiche les métiers trouvés par la recherche par mots-clés."""
+    resultats = search_metiers(requete)
+    if not resultats:
+        st.info("Aucun métier ne correspond à cette recherche. Essayez un autre mot-clé ou sélectionnez des domaines ci-dessous.")
+        return
+    
+    for i, resultat in enumerate(resultats):
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.markdown(f"**{resultat['Metier']}** · {resultat['Secteur']}  \n"
+                        f"<span style='color: #666666 !important; font-size: 0.9em;'>Trouvé dans : "
+                        f"{', '.join(resultat['champs'])}</span>", unsafe_allow_html=True)
+        with col2:
+            if st.button("Voir la fiche", key=f"recherche_{i}", use_container_width=True):
+                st.session_state.user_data['metier_selectionne'] = resultat['Metier']
+                change_page("metier_detail")
+
 def page_interests():
     """Affiche la page de sélection des intérêts."""
     display_header()
@@ -1052,6 +687,15 @@ def page_interests():
     </div>
     """, unsafe_allow_html=True)
     
+    # Recherche par mots-clés dans les noms, tags, compétences et formations des métiers
+    requete = st.text_input(
+        label="Rechercher par mot-clé",
+        placeholder="Ex : reporting CSRD, bilan carbone",
+        key="recherche_metiers"
+    )
+    if requete.strip():
+        display_search_results(requete)
+    
     # Créer des colonnes pour organiser les checkboxes
     col1, col2, col3 = st.columns(3)
     
@@ -1128,8 +772,7 @@ def page_interests():
                 st.session_state.user_data['tags'] = st.session_state.selected_tags
                 
                 # Exécuter la recherche des métiers correspondants
-                metiers_matches = filter_metiers_by_tags(st.session_state.selected_tags)
-                st.session_state.user_data['metiers_matches'] = metiers_matches
+                store_metiers_matches(st.session_state.selected_tags)
                 
                 # Aller à la page de résultats
                 change_page("resultats")
@@ -1149,8 +792,7 @@ def page_resultats():
             change_page("interests")
             return
             
-        metiers_matches = filter_metiers_by_tags(selected_tags)
-        st.session_state.user_data['metiers_matches'] = metiers_matches
+        metiers_matches = store_metiers_matches(selected_tags)
     else:
         # Utiliser les résultats existants
         metiers_matches = st.session_state.user_data.get('metiers_matches')
@@ -1173,8 +815,8 @@ def page_resultats():
     st.markdown(f"### Top 3 des métiers à impact basés sur vos intérêts")
     st.markdown(f"**Vos domaines sélectionnés :** *{', '.join(st.session_state.selected_tags)}*")
     
-    # Afficher les 3 premiers métiers
-    top_metiers = metiers_matches[:3]
+    # Afficher les 3 premiers métiers (champs d'affichage lus dans le catalogue partagé)
+    top_metiers = resolve_metiers_matches(metiers_matches[:NB_METIERS_AFFICHES])
     
     # Utiliser des colonnes pour une meilleure présentation sur grand écran
     cols = st.columns(min(len(top_metiers), 3))
@@ -1182,17 +824,6 @@ def page_resultats():
     for i, metier in enumerate(top_metiers):
         metier_nom = metier['Metier']
         secteur = metier.get('Secteur', 'Non spécifié')
-        description = metier.get('Description', 'Information non disponible')
-        
-        # Enrichir les données si nécessaire
-        if secteur == 'Non spécifié':
-            # Tenter de trouver le secteur dans les données de salaire
-            data = load_data()
-            df_salaire = data.get('salaire', pd.DataFrame())
-            if not df_salaire.empty:
-                secteur_info = df_salaire[df_salaire['Métier'] == metier_nom]
-                if not secteur_info.empty and 'Secteur' in secteur_info.columns:
-                    secteur = secteur_info['Secteur'].iloc[0]
         
         # Faire un log pour le débogage
         logger.debug(f"Affichage du métier: {metier_nom}, Secteur: {secteur}")
@@ -1248,6 +879,33 @@ def page_contact():
     # Rediriger vers la page détaillée avec paywall intégré
     change_page("metier_detail")
 
+def select_metier(metier_nom):
+    """Sélectionne un autre métier pour la page détaillée (rappel de bouton)."""
+    st.session_state.user_data['metier_selectionne'] = metier_nom
+    st.session_state.scroll_to_top = True
+
+def display_metiers_proches(metier_nom):
+    """Affiche les métiers proches (tags et compétences en commun) avec un lien vers leur fiche."""
+    metiers_proches = get_metiers_proches(metier_nom)
+    if not metiers_proches:
+        return
+    
+    st.markdown("### 🧭 Métiers proches")
+    cols = st.columns(len(metiers_proches))
+    secteurs = load_tag_index()['secteur_par_metier']
+    for i, (nom_proche, similarite) in enumerate(metiers_proches):
+        with cols[i]:
+            st.markdown(f"""
+            <div class='metier-card'>
+                <h4>{nom_proche}</h4>
+                <p><strong>Secteur :</strong> {secteurs.get(nom_proche, recherche_esg.SECTEUR_PAR_DEFAUT)}</p>
+                <p style='color: #666666 !important; font-size: 0.9em;'>Similarité : {similarite:.0%}</p>
+            </div>
+            """, unsafe_allow_html=True)
+            # Rester sur la page détaillée: un rerun explicite garderait le bouton actif (boucle)
+            st.button("Voir ce métier", key=f"proche_{i}", use_container_width=True,
+                      on_click=select_metier, args=(nom_proche,))
+
 def page_metier_detail():
     """Affiche la page détaillée d'un métier avec paywall visuel."""
     display_header()
@@ -1260,6 +918,10 @@ def page_metier_detail():
         change_page("resultats")
         return
     
+    # Prérendre les graphiques matplotlib à la première fiche affichée si activé dans la configuration
+    if get_config("graphiques", "prechauffage", False) and get_chart_engine() == 'matplotlib':
+        start_chart_warm_up(tuple(sorted(st.session_state.colors.items())))
+    
     # Récupérer les détails du métier
     metier_details = get_metier_details(metier_nom)
     
@@ -1365,30 +1027,13 @@ def page_metier_detail():
     with col_chart:
         if 'salaire' in metier_details and metier_details['salaire']:
             try:
-                # Convertir en DataFrame
-                salaire_data = pd.DataFrame(metier_details['salaire'])
-                
-                # Normaliser les colonnes
-                column_mapping = {
-                    'Expérience': ['Expérience', 'Experience'],
-                    'Salaire_Min': ['Salaire_Min', 'Salaire_min'],
-                    'Salaire_Max': ['Salaire_Max', 'Salaire_max'],
-                    'Salaire_Moyen': ['Salaire_Moyen', 'Salaire_moyen']
-                }
-                
-                for expected_col, possible_cols in column_mapping.items():
-                    for actual_col in possible_cols:
-                        if actual_col in salaire_data.columns and expected_col != actual_col:
-                            salaire_data.rename(columns={actual_col: expected_col}, inplace=True)
-                
-                # Vérifier les colonnes nécessaires
-                salary_columns = ['Expérience', 'Salaire_Min', 'Salaire_Max', 'Salaire_Moyen']
-                has_salary_columns = all(col in salaire_data.columns for col in salary_columns)
+                # Vérifier les colonnes nécessaires (noms canoniques appliqués au chargement)
+                has_salary_columns = all(col in metier_details['salaire'][0]
+                                         for col in graphiques_esg.COLONNES_SALAIRE)
                 
                 if has_salary_columns:
                     # Créer un graphique de salaire normal (pas compact)
-                    fig_salary = create_salary_chart(salaire_data, small_version=False)
-                    st.pyplot(fig_salary)
+                    display_salary_chart(metier_nom, metier_details['salaire'], small_version=False)
                 else:
                     st.info("Données salariales incomplètes.")
             except Exception as e:
@@ -1409,20 +1054,17 @@ def page_metier_detail():
             
             # Remplacer l'évolution du poste par une info simplifiée
             if 'Croissance_Annuelle' in tendances and pd.notna(tendances['Croissance_Annuelle']):
-                tendance_str = str(tendances['Croissance_Annuelle']).lower()
-                emoji = "🚀" if "hausse" in tendance_str or "forte" in tendance_str else "📈" if "croissance" in tendance_str else "📊"
+                # La direction de la tendance est classée au chargement du catalogue
+                expansion = metier_details.get('tendance_expansion', 'inconnue')
+                emoji = "🚀" if expansion == 'hausse' else "📈" if expansion == 'croissance' else "📊"
                 key_points.append(f"{emoji} **Métier en expansion** sur le marché")
         
         # Ajouter des informations sur le salaire si disponibles
         if 'salaire' in metier_details and metier_details['salaire']:
-            salaire_data = pd.DataFrame(metier_details['salaire'])
-            if 'Salaire_Moyen' in salaire_data.columns and not salaire_data.empty:
-                # Obtenir le salaire moyen senior (dernière ligne généralement)
-                try:
-                    top_salary = salaire_data['Salaire_Moyen'].iloc[-1]
-                    key_points.append(f"💰 **Salaire potentiel**: Jusqu'à {top_salary}€ brut/an en moyenne")
-                except:
-                    pass
+            # Obtenir le salaire moyen senior (dernière ligne généralement)
+            top_salary = metier_details['salaire'][-1].get('Salaire_Moyen')
+            if top_salary is not None:
+                key_points.append(f"💰 **Salaire potentiel**: Jusqu'à {top_salary}€ brut/an en moyenne")
         
         # Ajouter les compétences principales si disponibles
         if 'competences' in metier_details and metier_details['competences']:
@@ -1525,6 +1167,8 @@ def page_metier_detail():
                         st.success("Vos informations ont été enregistrées avec succès.")
                         st.session_state.scroll_to_top = True  # Activer le défilement vers le haut
                         st.rerun()
+                    except hubspot_esg.SubmissionThrottled:
+                        st.error("Trop de requêtes en cours. Veuillez réessayer dans quelques instants.")
                     except Exception as e:
                         # Gestion des erreurs
                         st.error("Une erreur est survenue lors de l'enregistrement de vos données. Veuillez vérifier vos informations.")
@@ -1602,12 +1246,13 @@ def page_metier_detail():
                 if 'Croissance_Annuelle' in tendances:
                     tendance = tendances['Croissance_Annuelle']
                     if pd.notna(tendance):
-                        # Déterminer l'émoji selon la tendance
-                        tendance_str = str(tendance).lower()
-                        tendance_emoji = "🚀" if "hausse" in tendance_str or "forte" in tendance_str or "+" in tendance_str else "📈" if "croissance" in tendance_str or "positive" in tendance_str else "➡️" if "stable" in tendance_str else "📉" if "baisse" in tendance_str or "déclin" in tendance_str or "-" in tendance_str else "📊"
+                        # Déterminer l'émoji selon la direction classée au chargement du catalogue
+                        direction = metier_details.get('tendance_direction', 'inconnue')
+                        tendance_emoji = TENDANCE_EMOJIS.get(direction, "📊")
                         
                         # Créer un style visuel pour la tendance
-                        tendance_color = f"{st.session_state.colors['green']}" if "hausse" in tendance_str or "croissance" in tendance_str or "positive" in tendance_str or "+" in tendance_str else f"{st.session_state.colors['primary']}" if "stable" in tendance_str else "#e74c3c"
+                        couleur = metier_details.get('tendance_couleur', 'negative')
+                        tendance_color = f"{st.session_state.colors['green']}" if couleur == 'positive' else f"{st.session_state.colors['primary']}" if couleur == 'stable' else "#e74c3c"
                         
                         st.markdown(f"""
                         <div class='info-card'>
@@ -1661,6 +1306,9 @@ def page_metier_detail():
         Visitez le site de l'IED pour plus d'informations : www.ied-paris.fr
         """)
     
+    # ========== MÉTIERS PROCHES (communs aux deux états) ==========
+    display_metiers_proches(metier_nom)
+    
     # ========== BOUTONS DE NAVIGATION (communs aux deux états) ==========
     
     # Séparateur visuel avant les boutons
@@ -1675,6 +1323,17 @@ def page_metier_detail():
         if st.button("Modifier mes intérêts →", use_container_width=True):
             change_page("interests")
 
+# ----- INSTRUMENTATION -----
+@st.cache_resource
+def start_instrumentation():
+    """Active l'instrumentation et l'export des métriques si la configuration le demande."""
+    if get_config("instrumentation", "actif", instrumentation_esg.is_enabled()):
+        instrumentation_esg.configure(
+            fichier=get_config("instrumentation", "fichier", instrumentation_esg.FICHIER_METRIQUES),
+            port=get_config("instrumentation", "port"),
+            intervalle=get_config("instrumentation", "intervalle_export", instrumentation_esg.INTERVALLE_EXPORT)
+        )
+
 # ----- FONCTION PRINCIPALE -----
 def main():
     """Fonction principale de l'application."""
@@ -1684,20 +1343,29 @@ def main():
     # Initialiser l'état de la session
     initialize_session_state()
     
+    # La file d'envoi des leads est ouverte au premier formulaire soumis et le
+    # moteur de graphiques résolu à la première fiche métier: la page d'accueil
+    # ne charge ni Hubspot, ni SQLite, ni les graphiques
+    
+    # Associer les mesures de ce rerun à la page et à la session
+    start_instrumentation()
+    instrumentation_esg.set_context(page=st.session_state.page, session=st.session_state.session_id)
+    
     # Afficher la page correspondante à l'état actuel
-    if st.session_state.page == "accueil":
-        page_accueil()
-    elif st.session_state.page == "interests":
-        page_interests()
-    elif st.session_state.page == "resultats":
-        page_resultats()
-    elif st.session_state.page == "contact":
-        page_contact()
-    elif st.session_state.page == "metier_detail":
-        page_metier_detail()
-    else:
-        # Page par défaut
-        page_accueil()
+    with instrumentation_esg.span('page', st.session_state.page):
+        if st.session_state.page == "accueil":
+            page_accueil()
+        elif st.session_state.page == "interests":
+            page_interests()
+        elif st.session_state.page == "resultats":
+            page_resultats()
+        elif st.session_state.page == "contact":
+            page_contact()
+        elif st.session_state.page == "metier_detail":
+            page_metier_detail()
+        else:
+            # Page par défaut
+            page_accueil()
 
 # ----- POINT D'ENTRÉE -----
 if __name__ == "__main__":
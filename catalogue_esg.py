@@ -0,0 +1,1043 @@
+"""
+Catalogue ESG - Institut d'Économie Durable
+Compilation du classeur Excel des métiers en instantané binaire indexé par empreinte de contenu
+"""
+
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+import memoire_esg
+import recherche_esg
+import schema_esg
+import similarite_esg
+
+logger = logging.getLogger("calculateur_esg.catalogue")
+
+# Classeur source et dossier des instantanés compilés
+FICHIER_CLASSEUR = 'data/IED _ esg_calculator data.xlsx'
+DOSSIER_INSTANTANES = 'data/.catalogue'
+
+# Clé interne -> nom de la feuille dans le classeur
+FEUILLES = {
+    'metiers': 'metier',
+    'salaire': 'salaire',
+    'competences': 'competences_cles',
+    'formations': 'formations_IED',
+    'tendances': 'tendances_marche'
+}
+
+# Version du format d'instantané (à incrémenter si la structure change)
+# 3: feuilles enregistrées après application du schéma canonique (schema_esg)
+VERSION_FORMAT = 3
+# Format des fichiers de feuilles d'un instantané (les instantanés pickle ne sont plus relus)
+FORMAT_INSTANTANE = 'parquet'
+
+# Délai entre deux vérifications du classeur par la surveillance (secondes)
+INTERVALLE_SURVEILLANCE = 5.0
+
+# Taille XML décompressée au-delà de laquelle une feuille est lue dans un processus séparé
+SEUIL_PROCESSUS = 4 * 1024 * 1024
+
+# Espaces de noms OOXML utilisés pour localiser les feuilles dans l'archive
+_NS_CLASSEUR = {
+    'main': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
+    'rel': 'http://schemas.openxmlformats.org/package/2006/relationships'
+}
+_ATTR_RID = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+
+# Cellule faisant référence à une chaîne partagée: <c r="A1" t="s"><v>12</v></c>
+_CELLULE_PARTAGEE = re.compile(rb'<c\b[^>]*\bt="s"[^>]*>\s*<v>(\d+)</v>')
+
+# ----- EMPREINTE DU CLASSEUR -----
+def hash_workbook(file_path=FICHIER_CLASSEUR):
+    """Calcule l'empreinte SHA-256 du contenu du classeur."""
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for bloc in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(bloc)
+    return sha.hexdigest()
+
+def _stat_key(file_path):
+    """Retourne la signature (taille, date de modification) du fichier."""
+    stat = os.stat(file_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def _read_pointer(dossier):
+    """Lit le pointeur vers le dernier instantané compilé."""
+    try:
+        with open(os.path.join(dossier, 'courant.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_json_atomic(path, contenu):
+    """Écrit un fichier JSON de manière atomique."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(contenu, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+def resolve_workbook_hash(file_path=FICHIER_CLASSEUR, dossier=DOSSIER_INSTANTANES):
+    """
+    Retourne l'empreinte du classeur sans le relire si rien n'a changé.
+
+    La taille et la date de modification servent de garde rapide: l'empreinte
+    n'est recalculée que si elles diffèrent de celles du dernier instantané.
+    """
+    pointeur = _read_pointer(dossier)
+    if (pointeur.get('classeur') == os.path.abspath(file_path)
+            and pointeur.get('stat') == _stat_key(file_path)
+            and pointeur.get('empreinte')):
+        return pointeur['empreinte']
+    return hash_workbook(file_path)
+
+# ----- LECTURE ET COMPILATION -----
+def _sheet_paths(archive):
+    """Associe chaque feuille du classeur au chemin de son XML dans l'archive."""
+    relations = ET.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    cibles = {rel.get('Id'): rel.get('Target') for rel in relations.findall('rel:Relationship', _NS_CLASSEUR)}
+    classeur = ET.fromstring(archive.read('xl/workbook.xml'))
+    chemins = {}
+    for feuille in classeur.findall('main:sheets/main:sheet', _NS_CLASSEUR):
+        cible = cibles.get(feuille.get(_ATTR_RID), '')
+        # Les cibles sont relatives à xl/ ou absolues dans l'archive
+        chemins[feuille.get('name')] = (cible.lstrip('/') if cible.startswith('/')
+                                        else posixpath.normpath(posixpath.join('xl', cible)))
+    return chemins
+
+def _sheet_sizes(contenu):
+    """Associe chaque feuille du classeur à la taille décompressée de son XML."""
+    with zipfile.ZipFile(io.BytesIO(contenu)) as archive:
+        tailles = {}
+        for feuille, chemin in _sheet_paths(archive).items():
+            try:
+                tailles[feuille] = archive.getinfo(chemin).file_size
+            except KeyError:
+                tailles[feuille] = 0
+        return tailles
+
+def _shared_strings(archive):
+    """Retourne les chaînes partagées du classeur, encodées en UTF-8."""
+    try:
+        racine = ET.fromstring(archive.read('xl/sharedStrings.xml'))
+    except KeyError:
+        return []
+    balise_texte = f"{{{_NS_CLASSEUR['main']}}}t"
+    return [''.join(t.text or '' for t in si.iter(balise_texte)).encode('utf-8')
+            for si in racine.findall('main:si', _NS_CLASSEUR)]
+
+def sheet_signatures(file_path=FICHIER_CLASSEUR):
+    """
+    Calcule une signature du contenu de chaque feuille du catalogue.
+
+    La signature porte sur le XML de la feuille où chaque référence à une
+    chaîne partagée est remplacée par la chaîne elle-même: modifier une
+    feuille ne change pas la signature des autres, même si la table des
+    chaînes partagées du classeur est renumérotée.
+
+    Returns:
+        dict: Signature SHA-256 par clé interne de feuille
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        chemins = _sheet_paths(archive)
+        chaines = _shared_strings(archive)
+        signatures = {}
+        for cle, feuille in FEUILLES.items():
+            sha = hashlib.sha256()
+            try:
+                xml = archive.read(chemins[feuille])
+            except KeyError:
+                signatures[cle] = None
+                continue
+            position = 0
+            for cellule in _CELLULE_PARTAGEE.finditer(xml):
+                sha.update(xml[position:cellule.start(1)])
+                indice = int(cellule.group(1))
+                sha.update(chaines[indice] if indice < len(chaines) else cellule.group(1))
+                position = cellule.end(1)
+            sha.update(xml[position:])
+            signatures[cle] = sha.hexdigest()
+    return signatures
+
+# Parties fixes du classeur minimal envoyé à un processus de lecture
+_TYPES_FEUILLE = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    b'<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    b'<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    b'<Default Extension="xml" ContentType="application/xml"/>'
+    b'<Override PartName="/xl/workbook.xml" '
+    b'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    b'<Override PartName="/xl/worksheets/sheet1.xml" '
+    b'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    b'<Override PartName="/xl/sharedStrings.xml" '
+    b'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+    b'<Override PartName="/xl/styles.xml" '
+    b'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    b'</Types>')
+_RELATIONS_RACINE = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    b'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    b'<Relationship Id="rId1" Target="xl/workbook.xml" '
+    b'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+    b'</Relationships>')
+_RELATIONS_CLASSEUR = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    b'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    b'<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+    b'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+    b'<Relationship Id="rId2" Target="sharedStrings.xml" '
+    b'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings"/>'
+    b'<Relationship Id="rId3" Target="styles.xml" '
+    b'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"/>'
+    b'</Relationships>')
+_STYLES_VIDES = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    b'<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"/>')
+
+# Éléments bruts de la table des chaînes partagées
+_RACINE_CHAINES = re.compile(rb'<((?:\w+:)?)sst\b[^>]*>')
+_CHAINE_BRUTE = re.compile(rb'<(?:\w+:)?si\b[^>]*/>|<((?:\w+:)?)si\b.*?</\1si>', re.DOTALL)
+
+def _sheet_payload(archive, chemin, feuille, chaines_brutes, entete_chaines, styles):
+    """
+    Construit un classeur minimal ne contenant qu'une feuille.
+
+    Le XML de la feuille est repris tel quel, à ceci près que ses références
+    aux chaînes partagées sont renumérotées vers la seule partie de la table
+    qu'elle utilise. L'archive n'est pas compressée: elle ne sert qu'à
+    transmettre la feuille au processus de lecture.
+    """
+    xml = archive.read(chemin)
+    if chaines_brutes:
+        renumerotation = {}
+        def renumeroter(cellule):
+            # La correspondance se termine par l'indice suivi de </v>
+            indice = renumerotation.setdefault(int(cellule.group(1)), len(renumerotation))
+            return cellule.group(0)[:cellule.start(1) - cellule.start(0)] + b'%d</v>' % indice
+        xml = _CELLULE_PARTAGEE.sub(renumeroter, xml)
+        prefixe, entete = entete_chaines
+        chaines = (entete + b''.join(chaines_brutes[indice] if indice < len(chaines_brutes) else b'<si/>'
+                                     for indice in renumerotation)
+                   + b'</' + prefixe + b'sst>')
+    else:
+        chaines = (b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                   b'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"/>')
+    nom = feuille.replace('&', '&amp;').replace('<', '&lt;').replace('"', '&quot;').encode('utf-8')
+    tampon = io.BytesIO()
+    with zipfile.ZipFile(tampon, 'w', zipfile.ZIP_STORED) as sortie:
+        sortie.writestr('[Content_Types].xml', _TYPES_FEUILLE)
+        sortie.writestr('_rels/.rels', _RELATIONS_RACINE)
+        sortie.writestr('xl/workbook.xml',
+                        b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        b'<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                        b'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                        b'<sheets><sheet name="' + nom + b'" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        sortie.writestr('xl/_rels/workbook.xml.rels', _RELATIONS_CLASSEUR)
+        sortie.writestr('xl/worksheets/sheet1.xml', xml)
+        sortie.writestr('xl/sharedStrings.xml', chaines)
+        sortie.writestr('xl/styles.xml', styles)
+    return tampon.getvalue()
+
+def _sheet_payloads(contenu, feuilles):
+    """Extrait une seule fois les chaînes partagées et prépare le classeur minimal de chaque feuille."""
+    with zipfile.ZipFile(io.BytesIO(contenu)) as archive:
+        chemins = _sheet_paths(archive)
+        try:
+            table = archive.read('xl/sharedStrings.xml')
+        except KeyError:
+            table = b''
+        racine = _RACINE_CHAINES.search(table)
+        chaines_brutes = [c.group(0) for c in _CHAINE_BRUTE.finditer(table, racine.end())] if racine else []
+        entete_chaines = (racine.group(1), table[:racine.end()]) if racine else (b'', b'')
+        try:
+            styles = archive.read('xl/styles.xml')
+        except KeyError:
+            styles = _STYLES_VIDES
+        return {feuille: _sheet_payload(archive, chemins[feuille], feuille,
+                                        chaines_brutes, entete_chaines, styles)
+                for feuille in feuilles}
+
+def _parse_sheet(contenu, feuille):
+    """Lit une feuille depuis un classeur minimal (exécuté dans un processus séparé)."""
+    debut = time.perf_counter()
+    df = pd.read_excel(io.BytesIO(contenu), sheet_name=feuille)
+    return df, (time.perf_counter() - debut) * 1000
+
+def read_workbook(file_path=FICHIER_CLASSEUR, seuil_processus=SEUIL_PROCESSUS, cles=None, nb_processus=None):
+    """
+    Lit les feuilles du catalogue en une seule ouverture du classeur Excel.
+
+    Le fichier est lu une fois en mémoire et les feuilles sont lues depuis une
+    seule instance du classeur (chaînes partagées analysées une seule fois).
+    Sur une machine à plusieurs cœurs, les feuilles dont le XML dépasse
+    `seuil_processus` sont lues en parallèle dans des processus séparés:
+    chacun ne reçoit que le XML de sa feuille et les chaînes partagées
+    qu'elle utilise. Avec un seul cœur, les processus ne feraient qu'ajouter
+    leur coût de démarrage et de transfert: tout est lu dans le processus courant.
+
+    Args:
+        cles: Clés internes des feuilles à lire (toutes par défaut)
+        nb_processus: Nombre de processus de lecture (nombre de cœurs par défaut)
+
+    Returns:
+        tuple: (dict des DataFrames par clé interne, dict des durées de lecture en ms)
+    """
+    cles = list(FEUILLES) if cles is None else [cle for cle in FEUILLES if cle in cles]
+    nb_processus = (os.cpu_count() or 1) if nb_processus is None else nb_processus
+    with open(file_path, 'rb') as f:
+        contenu = f.read()
+    grandes = []
+    if nb_processus > 1:
+        tailles = _sheet_sizes(contenu)
+        grandes = [cle for cle in cles if tailles.get(FEUILLES[cle], 0) >= seuil_processus]
+
+    resultats = {}
+    pool = None
+    futures = {}
+    if grandes:
+        charges = _sheet_payloads(contenu, [FEUILLES[cle] for cle in grandes])
+        # 'spawn' évite de dupliquer les threads du serveur Streamlit dans les processus fils
+        pool = ProcessPoolExecutor(max_workers=min(len(grandes), nb_processus),
+                                   mp_context=multiprocessing.get_context('spawn'))
+        futures = {cle: pool.submit(_parse_sheet, charges.pop(FEUILLES[cle]), FEUILLES[cle]) for cle in grandes}
+    try:
+        petites = [cle for cle in cles if cle not in futures]
+        if petites:
+            with pd.ExcelFile(io.BytesIO(contenu)) as classeur:
+                for cle in petites:
+                    debut = time.perf_counter()
+                    resultats[cle] = (classeur.parse(FEUILLES[cle]), (time.perf_counter() - debut) * 1000)
+        for cle, future in futures.items():
+            resultats[cle] = future.result()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    data = {cle: resultats[cle][0] for cle in cles}
+    durees = {cle: round(resultats[cle][1], 1) for cle in cles}
+    for cle in cles:
+        mode = "processus séparé" if cle in futures else "processus courant"
+        logger.info(f"Feuille '{FEUILLES[cle]}' lue en {durees[cle]:.1f} ms ({len(data[cle])} lignes, {mode})")
+    return data, durees
+
+class SnapshotError(ValueError):
+    """Feuille que l'instantané ne peut pas représenter en Parquet."""
+
+def _write_sheet(df, dossier, cle):
+    """
+    Écrit une feuille compilée en Parquet.
+
+    Les instantanés ne contiennent que des fichiers Parquet: un fichier pickle
+    relu depuis le dossier des instantanés pourrait exécuter du code.
+
+    Raises:
+        SnapshotError: Si pyarrow est absent ou ne peut pas représenter la feuille
+            (colonne contenant à la fois des nombres et des textes, par exemple)
+    """
+    try:
+        df.to_parquet(os.path.join(dossier, _sheet_file(cle, FORMAT_INSTANTANE)), index=False)
+    except (ImportError, ValueError, TypeError) as e:
+        raise SnapshotError(f"Feuille '{FEUILLES[cle]}' non convertible en Parquet: {str(e)}") from e
+    return FORMAT_INSTANTANE
+
+def _read_sheet(dossier, cle, format_feuille):
+    """Relit une feuille compilée."""
+    if format_feuille != FORMAT_INSTANTANE:
+        raise ValueError(f"Format de feuille non pris en charge: {format_feuille}")
+    return pd.read_parquet(os.path.join(dossier, _sheet_file(cle, format_feuille)))
+
+def _sheet_file(cle, format_feuille):
+    return f"{cle}.{format_feuille}"
+
+def _reuse_sheet_file(source, cible):
+    """Reprend le fichier d'une feuille inchangée (lien physique, ou copie à défaut)."""
+    try:
+        os.link(source, cible)
+    except OSError:
+        shutil.copy2(source, cible)
+
+def compile_catalogue(file_path=FICHIER_CLASSEUR, dossier=DOSSIER_INSTANTANES, empreinte=None, precedent=None):
+    """
+    Compile le classeur en instantané binaire (un fichier par feuille).
+
+    Seules les feuilles dont la signature a changé depuis l'instantané
+    précédent sont relues dans le classeur; les autres sont reprises telles
+    quelles (fichiers compilés et, si `precedent` est fourni, DataFrames
+    déjà en mémoire).
+
+    Args:
+        file_path: Chemin du classeur Excel source
+        dossier: Dossier racine des instantanés
+        empreinte: Empreinte du classeur si elle est déjà connue
+        precedent: Catalogue actuellement en mémoire, dont les feuilles inchangées sont reprises
+
+    Returns:
+        dict: Les DataFrames canoniques du catalogue, indexés par clé interne
+
+    Raises:
+        schema_esg.SchemaError: Si une feuille relue n'a pas ses colonnes obligatoires
+    """
+    debut = time.perf_counter()
+    stat = _stat_key(file_path)
+    empreinte = empreinte or hash_workbook(file_path)
+    signatures = sheet_signatures(file_path)
+
+    # Feuilles inchangées par rapport au dernier instantané compilé
+    ancien = _read_pointer(dossier).get('empreinte')
+    ancien_manifeste = _load_manifest(os.path.join(dossier, ancien)) if ancien else None
+    inchangees = {}
+    if ancien_manifeste is not None and ancien != empreinte:
+        inchangees = {cle: ancien_manifeste['formats'][cle] for cle in FEUILLES
+                      if signatures.get(cle) and ancien_manifeste.get('signatures', {}).get(cle) == signatures[cle]}
+
+    a_lire = [cle for cle in FEUILLES if cle not in inchangees]
+    data, durees = read_workbook(file_path, cles=a_lire) if a_lire else ({}, {})
+    # Noms de colonnes et types canoniques, une seule fois, avant l'écriture de l'instantané
+    data = schema_esg.apply_schema(data)
+    for cle, format_feuille in inchangees.items():
+        if precedent is not None and precedent.signatures.get(cle) == signatures[cle]:
+            data[cle] = precedent.data[cle]
+        else:
+            data[cle] = _read_sheet(os.path.join(dossier, ancien), cle, format_feuille)
+        durees[cle] = ancien_manifeste.get('durees_lecture_ms', {}).get(cle)
+    if inchangees:
+        logger.info(f"Feuilles inchangées reprises de l'instantané {ancien[:12]}: {', '.join(inchangees)}")
+
+    os.makedirs(dossier, exist_ok=True)
+    # Écriture dans un dossier temporaire puis renommage pour ne jamais exposer un instantané partiel
+    tmp_dossier = tempfile.mkdtemp(prefix='compilation-', dir=dossier)
+    try:
+        formats = {}
+        for cle in FEUILLES:
+            if cle in inchangees:
+                formats[cle] = inchangees[cle]
+                _reuse_sheet_file(os.path.join(dossier, ancien, _sheet_file(cle, formats[cle])),
+                                  os.path.join(tmp_dossier, _sheet_file(cle, formats[cle])))
+            else:
+                formats[cle] = _write_sheet(data[cle], tmp_dossier, cle)
+        _write_json_atomic(os.path.join(tmp_dossier, 'manifeste.json'), {
+            'version': VERSION_FORMAT,
+            'empreinte': empreinte,
+            'formats': formats,
+            'signatures': signatures,
+            'lignes': {cle: len(df) for cle, df in data.items()},
+            'durees_lecture_ms': durees
+        })
+        cible = os.path.join(dossier, empreinte)
+        if os.path.isdir(cible):
+            shutil.rmtree(cible)
+        os.replace(tmp_dossier, cible)
+    except SnapshotError as e:
+        # Le catalogue reste utilisable, mais sera recompilé à chaque démarrage
+        shutil.rmtree(tmp_dossier, ignore_errors=True)
+        logger.error(f"Instantané du catalogue non écrit, le classeur sera relu au prochain démarrage: {str(e)}")
+        return {cle: data[cle] for cle in FEUILLES}
+    except Exception:
+        shutil.rmtree(tmp_dossier, ignore_errors=True)
+        raise
+
+    _write_json_atomic(os.path.join(dossier, 'courant.json'), {
+        'classeur': os.path.abspath(file_path),
+        'stat': stat,
+        'empreinte': empreinte
+    })
+
+    # Supprimer les instantanés obsolètes
+    for nom in os.listdir(dossier):
+        chemin = os.path.join(dossier, nom)
+        if os.path.isdir(chemin) and nom != empreinte and not nom.startswith('compilation-'):
+            shutil.rmtree(chemin, ignore_errors=True)
+
+    logger.info(f"Catalogue compilé ({empreinte[:12]}) en {(time.perf_counter() - debut) * 1000:.0f} ms "
+                f"({len(a_lire)} feuille(s) relue(s) sur {len(FEUILLES)})")
+    return {cle: data[cle] for cle in FEUILLES}
+
+def _load_manifest(dossier_instantane):
+    """Lit le manifeste d'un instantané, ou retourne None s'il est absent ou d'un autre format."""
+    try:
+        with open(os.path.join(dossier_instantane, 'manifeste.json'), encoding='utf-8') as f:
+            manifeste = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Manifeste illisible dans {dossier_instantane}: {str(e)}")
+        return None
+    formats = manifeste.get('formats', {})
+    if manifeste.get('version') != VERSION_FORMAT or set(formats) != set(FEUILLES):
+        return None
+    if any(fmt != FORMAT_INSTANTANE for fmt in formats.values()):
+        logger.warning(f"Instantané {dossier_instantane} ignoré: format de feuille non pris en charge")
+        return None
+    return manifeste
+
+def load_snapshot(empreinte, dossier=DOSSIER_INSTANTANES):
+    """Charge un instantané compilé, ou retourne None s'il est absent ou incomplet."""
+    dossier_instantane = os.path.join(dossier, empreinte)
+    manifeste = _load_manifest(dossier_instantane)
+    if manifeste is None:
+        return None
+    try:
+        return {cle: _read_sheet(dossier_instantane, cle, fmt) for cle, fmt in manifeste['formats'].items()}
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Instantané {empreinte[:12]} illisible: {str(e)}")
+        return None
+
+def load_catalogue(file_path=FICHIER_CLASSEUR, dossier=DOSSIER_INSTANTANES):
+    """
+    Charge le catalogue depuis l'instantané compilé, en le recompilant si le classeur a changé.
+
+    Returns:
+        dict: Les DataFrames 'metiers', 'salaire', 'competences', 'formations' et 'tendances'
+    """
+    empreinte = resolve_workbook_hash(file_path, dossier)
+    data = load_snapshot(empreinte, dossier)
+    if data is not None:
+        logger.debug(f"Catalogue chargé depuis l'instantané {empreinte[:12]}")
+        return data
+
+    logger.info(f"Aucun instantané pour le classeur {empreinte[:12]}, compilation en cours")
+    return compile_catalogue(file_path, dossier, empreinte)
+
+# ----- COMPÉTENCES (FORMAT LONG) -----
+COLONNES_COMPETENCES = ['Métier', 'Compétence', 'Importance']
+
+def competence_columns(df_competences):
+    """
+    Colonnes de la feuille compétences contenant un intitulé de compétence.
+
+    L'ordre des colonnes fixe l'importance des compétences (la première est
+    la plus importante).
+    """
+    # Chercher toutes les colonnes potentielles de compétences avec différentes orthographes possibles
+    competence_patterns = ['Compétence', 'Competence', 'compétence', 'competence']
+    competence_cols = list({col for col in df_competences.columns
+                            if any(str(col).startswith(pattern) for pattern in competence_patterns)})
+
+    # Si aucune colonne de compétences trouvée, essayer de trouver des colonnes numériques (Compétence1, Compétence2...)
+    if not competence_cols:
+        competence_cols = [col for col in df_competences.columns if col != 'Métier' and (
+            any(p in str(col) for p in competence_patterns) or
+            (any(c.isdigit() for c in str(col)) and len(str(col)) <= 15))]
+
+    # Trier les colonnes pour avoir un ordre cohérent
+    return sorted(competence_cols, key=str)
+
+class CompetenceTable:
+    """
+    Compétences du catalogue au format long: une ligne (Métier, Compétence, Importance) par compétence.
+
+    Les lignes sont regroupées par métier (puis triées par importance
+    décroissante): les compétences d'un métier sont une tranche contiguë de
+    la table, dont les bornes sont indexées par nom de métier.
+    """
+
+    def __init__(self, table, bornes):
+        self.table = table
+        self.bornes = MappingProxyType(bornes)
+
+    def get(self, metier):
+        """Compétences d'un métier (tranche de la table, vide si le métier est inconnu)."""
+        debut, fin = self.bornes.get(metier, (0, 0))
+        return self.table.iloc[debut:fin, 1:]
+
+    def __contains__(self, metier):
+        return metier in self.bornes
+
+    def __len__(self):
+        return len(self.table)
+
+def normalize_competences(df_competences):
+    """
+    Convertit la feuille compétences (une colonne par compétence) au format long, une seule fois.
+
+    L'importance d'une compétence dépend de sa colonne (5 pour la première,
+    puis décroissante jusqu'à 1). Métiers et compétences sont stockés en
+    catégories.
+
+    Returns:
+        CompetenceTable: Table longue indexée par métier
+    """
+    colonnes = competence_columns(df_competences) if 'Métier' in df_competences.columns else []
+    if df_competences.empty or not colonnes:
+        table = pd.DataFrame({'Métier': pd.Categorical([]), 'Compétence': pd.Categorical([]),
+                              'Importance': np.array([], dtype=np.int8)})
+        metiers = df_competences['Métier'].dropna().unique() if 'Métier' in df_competences.columns else []
+        return CompetenceTable(table, {metier: (0, 0) for metier in metiers})
+
+    valeurs = df_competences[colonnes].to_numpy(dtype=object)
+    presentes = np.vectorize(lambda valeur: bool(pd.notna(valeur) and valeur), otypes=[bool])(valeurs)
+    presentes &= df_competences['Métier'].notna().to_numpy()[:, None]
+    lignes, rangs = np.nonzero(presentes)
+
+    metiers = pd.Categorical(df_competences['Métier'].to_numpy()[lignes],
+                             categories=df_competences['Métier'].dropna().unique())
+    importance = (6 - np.minimum(rangs + 1, 5)).astype(np.int8)
+    # Regroupement par métier (ordre de la feuille), importance décroissante, puis ordre de lecture
+    ordre = np.lexsort((np.arange(len(lignes)), -importance, metiers.codes))
+    table = pd.DataFrame({
+        'Métier': metiers[ordre],
+        'Compétence': pd.Categorical(valeurs[lignes[ordre], rangs[ordre]]),
+        'Importance': importance[ordre]
+    })
+
+    codes = table['Métier'].cat.codes.to_numpy()
+    debuts = np.searchsorted(codes, np.arange(len(metiers.categories) + 1))
+    bornes = {metier: (int(debuts[code]), int(debuts[code + 1])) for code, metier in enumerate(metiers.categories)}
+    return CompetenceTable(table, bornes)
+
+# ----- FICHES MÉTIER -----
+def get_competences_par_metier(competences, metier):
+    """
+    Retourne les compétences pour un métier donné, par importance décroissante.
+
+    Args:
+        competences: Table longue (`normalize_competences`), ou feuille compétences brute
+    """
+    if not isinstance(competences, CompetenceTable):
+        if competences.empty or 'Métier' not in competences.columns:
+            return pd.DataFrame()
+        competences = normalize_competences(competences[competences['Métier'] == metier])
+    return competences.get(metier)
+
+# Règles de classement de la croissance annuelle (mots-clés cherchés dans le texte de la valeur,
+# la première règle qui correspond l'emporte), telles qu'affichées sur la fiche métier
+REGLES_DIRECTION = (('hausse', ("hausse", "forte", "+")), ('croissance', ("croissance", "positive")),
+                    ('stable', ("stable",)), ('baisse', ("baisse", "déclin", "-")))
+# Couleur de la carte "Croissance annuelle"
+REGLES_COULEUR = (('positive', ("hausse", "croissance", "positive", "+")), ('stable', ("stable",)))
+# Émoji du point clé "Métier en expansion"
+REGLES_EXPANSION = (('hausse', ("hausse", "forte")), ('croissance', ("croissance",)))
+
+def _classify_text(valeur, regles, defaut):
+    tendance_str = str(valeur).lower()
+    for classe, mots in regles:
+        if any(mot in tendance_str for mot in mots):
+            return classe
+    return defaut
+
+def classify_tendance(valeur):
+    """
+    Classe une croissance annuelle pour l'affichage de la fiche métier.
+
+    La valeur est classée d'après son texte, y compris lorsqu'elle est
+    numérique (0.25 n'est ni une hausse ni une baisse), comme l'a toujours
+    fait la fiche métier.
+
+    Returns:
+        dict: 'direction' ('hausse', 'croissance', 'stable', 'baisse' ou 'inconnue'),
+        'couleur' ('positive', 'stable' ou 'negative') et 'expansion' ('hausse', 'croissance' ou 'inconnue')
+    """
+    if valeur is None or (not isinstance(valeur, str) and pd.isna(valeur)):
+        return {'direction': 'inconnue', 'couleur': 'negative', 'expansion': 'inconnue'}
+    return {
+        'direction': _classify_text(valeur, REGLES_DIRECTION, 'inconnue'),
+        'couleur': _classify_text(valeur, REGLES_COULEUR, 'negative'),
+        'expansion': _classify_text(valeur, REGLES_EXPANSION, 'inconnue')
+    }
+
+def to_native(value):
+    """Convertit les types numpy en types Python natifs."""
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, np.ndarray):
+        return tuple(value.tolist())
+    return value
+
+def _freeze_records(df):
+    """Convertit un DataFrame en tuple d'enregistrements immuables."""
+    return tuple(MappingProxyType({cle: to_native(val) for cle, val in record.items()})
+                 for record in df.to_dict('records'))
+
+def _missing_text_as_none(df):
+    """
+    Remplace les cellules vides des colonnes texte par None avant de figer des lignes.
+
+    Une cellule texte vide vaut NaN après compilation du classeur, None après
+    relecture d'un instantané Parquet, et NaN une fois la colonne convertie en
+    catégories (mode compact): les fiches reçoivent toujours None. Les colonnes
+    numériques gardent NaN.
+    """
+    colonnes = {}
+    for colonne in df.columns:
+        serie = df[colonne]
+        if (serie.dtype == object or isinstance(serie.dtype, pd.CategoricalDtype)) and serie.hasnans:
+            colonnes[colonne] = serie.astype(object).where(serie.notna(), None)
+    return df.assign(**colonnes) if colonnes else df
+
+# Sections des fiches, chacune tirée d'une feuille (la feuille métiers fournit les informations de base)
+SECTIONS_FICHE = ('metiers', 'salaire', 'competences', 'formations', 'tendances')
+
+class MetierSection:
+    """
+    Lignes figées d'une feuille réparties par métier: une section des fiches métier.
+
+    L'empreinte des lignes de chaque métier permet à la version suivante du
+    catalogue de reprendre telles quelles les lignes des métiers inchangés.
+    """
+
+    __slots__ = ('lignes', 'empreintes', 'colonnes')
+
+    def __init__(self, lignes, empreintes, colonnes):
+        self.lignes = lignes
+        self.empreintes = empreintes
+        self.colonnes = colonnes
+
+def _freeze_by_metier(df, figer, precedent=None, positions=None):
+    """
+    Fige les lignes d'une feuille en une seule passe, puis les répartit par métier.
+
+    Args:
+        figer: Conversion d'un DataFrame en tuple de lignes figées
+        precedent: Section de la version précédente: les métiers dont les lignes
+            n'ont pas changé reprennent leurs lignes figées, seules les autres sont converties
+        positions: Positions des lignes de chaque métier (lues dans la colonne 'Métier' si None)
+
+    Returns:
+        MetierSection: Lignes de chaque métier, dans l'ordre de la feuille (lignes sans métier ignorées)
+    """
+    if positions is None:
+        if df.empty or 'Métier' not in df.columns:
+            return MetierSection({}, {}, tuple(df.columns))
+        positions = {}
+        for position, (metier, valide) in enumerate(zip(df['Métier'].tolist(), df['Métier'].notna().tolist())):
+            if valide:
+                positions.setdefault(metier, []).append(position)
+    colonnes = tuple(df.columns)
+    empreintes_lignes = pd.util.hash_pandas_object(df, index=False).to_numpy() if len(df) else np.empty(0, np.uint64)
+    empreintes = {metier: empreintes_lignes[list(rangs)].tobytes() for metier, rangs in positions.items()}
+
+    reprises = {}
+    if precedent is not None and precedent.colonnes == colonnes:
+        reprises = {metier: precedent.lignes[metier] for metier, empreinte in empreintes.items()
+                    if precedent.empreintes.get(metier) == empreinte}
+    rangs = [rang for metier, rangs_metier in positions.items() if metier not in reprises for rang in rangs_metier]
+    figees = iter(figer(_missing_text_as_none(df.iloc[rangs])) if rangs else ())
+    lignes = {metier: reprises[metier] if metier in reprises else tuple(next(figees) for _ in rangs_metier)
+              for metier, rangs_metier in positions.items()}
+    return MetierSection(lignes, empreintes, colonnes)
+
+def build_bundle_sections(data, competences, compact=False, precedent=None, inchangees=()):
+    """
+    Fige les feuilles du catalogue en sections des fiches métier.
+
+    Args:
+        competences: Table longue des compétences (`normalize_competences`)
+        compact: Si True, les lignes sont des `FrozenRecord` (à slots) au lieu de dictionnaires
+        precedent: Sections de la version précédente du catalogue (même mode)
+        inchangees: Feuilles identiques dans la version précédente, dont la section est reprise telle quelle
+
+    Returns:
+        dict: `MetierSection` par section (voir SECTIONS_FICHE)
+    """
+    figer = memoire_esg.RecordFreezer(to_native) if compact else _freeze_records
+    precedent = precedent or {}
+    sections = {}
+    for cle in SECTIONS_FICHE:
+        if cle in inchangees and cle in precedent:
+            sections[cle] = precedent[cle]
+        elif cle == 'metiers':
+            df_metiers = data.get('metiers', pd.DataFrame())
+            if 'Métier' in df_metiers.columns:
+                df_metiers = df_metiers.drop_duplicates(subset='Métier', keep='first')
+            sections[cle] = _freeze_by_metier(df_metiers, lambda df: df.to_dict('records'), precedent.get(cle))
+        elif cle == 'competences':
+            # Tranches contiguës de la table longue, y compris pour les métiers sans compétence
+            sections[cle] = _freeze_by_metier(
+                competences.table.iloc[:, 1:], figer, precedent.get(cle),
+                positions={metier: range(debut, fin) for metier, (debut, fin) in competences.bornes.items()})
+        else:
+            sections[cle] = _freeze_by_metier(data.get(cle, pd.DataFrame()), figer, precedent.get(cle))
+    return sections
+
+def _assemble_fiche(metier_nom, parties, manquants):
+    """Construit la fiche d'un métier à partir de ses lignes dans chaque section."""
+    info = parties['metiers'][0] if parties['metiers'] else {'Métier': metier_nom}
+    metier_data = {cle: to_native(val) for cle, val in info.items()}
+
+    salaire_info = parties['salaire']
+    if salaire_info:
+        # Récupérer la description du métier à partir de la feuille salaire
+        desc = salaire_info[0].get('Description')
+        if not metier_data.get('Description') and desc is not None and pd.notna(desc) and desc:
+            metier_data['Description'] = desc
+        metier_data['salaire'] = salaire_info
+    else:
+        manquants['salaire'] += 1
+
+    for section in ('competences', 'formations'):
+        if parties[section]:
+            metier_data[section] = parties[section]
+        else:
+            manquants[section] += 1
+
+    tendances_info = parties['tendances']
+    if tendances_info:
+        metier_data['tendances'] = tendances_info
+        classes = classify_tendance(tendances_info[0].get('Croissance_Annuelle'))
+        metier_data['tendance_direction'] = classes['direction']
+        metier_data['tendance_couleur'] = classes['couleur']
+        metier_data['tendance_expansion'] = classes['expansion']
+    else:
+        manquants['tendances'] += 1
+    return MappingProxyType(metier_data)
+
+def assemble_metier_bundles(sections, precedent=None, sections_precedentes=None):
+    """
+    Assemble les fiches métier à partir des sections.
+
+    Args:
+        precedent: Fiches de la version précédente: la fiche d'un métier dont
+            aucune section n'a changé (mêmes objets) est reprise telle quelle
+        sections_precedentes: Sections à partir desquelles `precedent` a été construit
+
+    Returns:
+        MappingProxyType: Fiche immuable par nom de métier
+    """
+    debut = time.perf_counter()
+    # Tous les métiers connus d'au moins une feuille, dans l'ordre de la feuille métier
+    noms = list(dict.fromkeys(nom for cle in SECTIONS_FICHE for nom in sections[cle].lignes))
+    manquants = {'salaire': 0, 'competences': 0, 'formations': 0, 'tendances': 0}
+
+    bundles = {}
+    reprises = 0
+    for metier_nom in noms:
+        parties = {cle: sections[cle].lignes.get(metier_nom) for cle in SECTIONS_FICHE}
+        if (precedent is not None and metier_nom in precedent
+                and all(parties[cle] is sections_precedentes[cle].lignes.get(metier_nom) for cle in SECTIONS_FICHE)):
+            bundles[metier_nom] = precedent[metier_nom]
+            reprises += 1
+            continue
+        bundles[metier_nom] = _assemble_fiche(metier_nom, parties, manquants)
+
+    logger.info(f"{len(bundles)} fiches métier construites en {(time.perf_counter() - debut) * 1000:.0f} ms "
+                f"(reprises: {reprises}, sans salaire: {manquants['salaire']}, "
+                f"sans compétences: {manquants['competences']}, sans formations: {manquants['formations']}, "
+                f"sans tendances: {manquants['tendances']})")
+    return MappingProxyType(bundles)
+
+def build_metier_bundles(data, competences=None, compact=False):
+    """
+    Matérialise la fiche détaillée de chaque métier du catalogue.
+
+    Chaque fiche regroupe les informations de base, les salaires, les compétences
+    classées, les formations normalisées et les tendances du marché, avec la
+    direction de tendance déjà classée. Les fiches sont immuables pour pouvoir
+    être partagées entre toutes les sessions.
+
+    Chaque feuille est convertie en une seule passe (un seul parcours des
+    lignes), puis ses lignes sont réparties entre les métiers: le coût ne
+    dépend que du nombre de lignes, pas d'un filtrage par métier.
+
+    Args:
+        data: Dictionnaire des DataFrames du catalogue
+        competences: Table longue des compétences (construite depuis `data` si None)
+        compact: Si True, les lignes des fiches sont des `FrozenRecord` (à slots) au lieu de dictionnaires
+
+    Returns:
+        MappingProxyType: Fiche immuable par nom de métier
+    """
+    if competences is None:
+        competences = normalize_competences(data.get('competences', pd.DataFrame()))
+    return assemble_metier_bundles(build_bundle_sections(data, competences, compact=compact))
+
+# ----- VERSIONS DU CATALOGUE ET RECHARGEMENT À CHAUD -----
+class Catalogue:
+    """
+    Version immuable du catalogue: les feuilles et les structures qui en dérivent.
+
+    Une session conserve la même instance pendant tout un parcours; un
+    rechargement construit une nouvelle instance au lieu de modifier celle-ci.
+    Les feuilles sont canoniques (schema_esg) et partagées par toutes les
+    sessions sans copie: `data` est un dictionnaire en lecture seule, et ses
+    DataFrames ne doivent pas être modifiés en place (filtres et sélections
+    en produisent de nouveaux; copier avec `.copy()` avant toute modification).
+
+    En mode compact (`compact=True`), les feuilles utilisent des catégories,
+    des entiers 32 bits et des chaînes internées, et les lignes des fiches
+    sont des enregistrements à slots (voir memoire_esg).
+    """
+
+    def __init__(self, data, empreinte=None, signatures=None, precedent=None, compact=False):
+        self.compact = compact
+        self.empreinte = empreinte
+        self.signatures = MappingProxyType(dict(signatures or {}))
+        if compact:
+            # Les feuilles inchangées reprennent leur version compacte, sans nouvelle conversion
+            data = {cle: precedent.data[cle]
+                    if precedent is not None and precedent.compact and self.unchanged(precedent, cle)
+                    else memoire_esg.compact_sheet(df) for cle, df in data.items()}
+        self.data = MappingProxyType(dict(data))
+        self.charge_le = time.time()
+        # Structures dérivées, construites une fois par version (l'index des tags
+        # est repris tant que les feuilles dont il dépend n'ont pas changé)
+        if precedent is not None and self.unchanged(precedent, 'metiers', 'salaire'):
+            self.index = precedent.index
+        else:
+            self.index = recherche_esg.build_tag_index(data['metiers'], data['salaire'])
+        # Compétences au format long, partagées par l'index plein texte, les similarités et les fiches
+        if precedent is not None and self.unchanged(precedent, 'competences'):
+            self.competences = precedent.competences
+        else:
+            self.competences = normalize_competences(data['competences'])
+        if precedent is not None and self.unchanged(precedent, 'metiers', 'competences', 'formations'):
+            self.texte = precedent.texte
+        else:
+            self.texte = recherche_esg.build_text_index(data, self.competences.table)
+        if precedent is not None and self.unchanged(precedent, 'metiers', 'competences'):
+            self.similarite = precedent.similarite
+        else:
+            noms = data['metiers']['Métier'].drop_duplicates().tolist() if 'Métier' in data['metiers'].columns else []
+            self.similarite = similarite_esg.build_similarity_index(data, noms, self.competences.table)
+        # Fiches métier: seules les sections tirées des feuilles modifiées sont refigées, et seules
+        # les fiches des métiers dont une section a changé sont reconstruites
+        reprendre = precedent is not None and precedent.compact == compact
+        inchangees = [cle for cle in SECTIONS_FICHE if reprendre and self.unchanged(precedent, cle)]
+        self.sections = build_bundle_sections(data, self.competences, compact=compact,
+                                              precedent=precedent.sections if reprendre else None,
+                                              inchangees=inchangees)
+        self.bundles = assemble_metier_bundles(self.sections, precedent.bundles if reprendre else None,
+                                               precedent.sections if reprendre else None)
+
+    def unchanged(self, autre, *cles):
+        """Indique si les feuilles `cles` ont le même contenu dans les deux versions."""
+        return all(self.signatures.get(cle) is not None and self.signatures.get(cle) == autre.signatures.get(cle)
+                   for cle in cles)
+
+    @classmethod
+    def empty(cls):
+        """Catalogue vide (classeur illisible), avec les mêmes clés que le catalogue réel."""
+        return cls({cle: schema_esg.empty_sheet(cle) for cle in FEUILLES})
+
+    def memory_report(self):
+        """Occupation mémoire de cette version (octets par feuille, par structure et par métier)."""
+        return memoire_esg.memory_report(self)
+
+def load_catalogue_version(file_path=FICHIER_CLASSEUR, dossier=DOSSIER_INSTANTANES, precedent=None, compact=False):
+    """
+    Charge la version courante du catalogue (instantané, ou recompilation des feuilles modifiées).
+
+    Args:
+        precedent: Version actuellement en mémoire, dont les feuilles inchangées sont reprises
+        compact: Si True, construit la version en mode compact (voir `Catalogue`)
+
+    Returns:
+        Catalogue: La version chargée
+    """
+    empreinte = resolve_workbook_hash(file_path, dossier)
+    if precedent is not None and precedent.empreinte == empreinte:
+        return precedent
+    manifeste = _load_manifest(os.path.join(dossier, empreinte))
+    data = load_snapshot(empreinte, dossier) if manifeste is not None else None
+    if data is None:
+        logger.info(f"Aucun instantané pour le classeur {empreinte[:12]}, compilation en cours")
+        data = compile_catalogue(file_path, dossier, empreinte, precedent=precedent)
+        manifeste = _load_manifest(os.path.join(dossier, empreinte))
+    return Catalogue(data, empreinte, (manifeste or {}).get('signatures'), precedent=precedent, compact=compact)
+
+class CatalogueWatcher(threading.Thread):
+    """
+    Surveille le classeur et remplace le catalogue en mémoire lorsqu'il change.
+
+    Le premier chargement est synchrone. Ensuite, le thread compare toutes
+    les `intervalle` secondes la taille et la date du classeur (puis son
+    empreinte), reconstruit la nouvelle version en arrière-plan et la publie
+    d'un seul coup dans `courant`: les lecteurs voient soit l'ancienne
+    version complète, soit la nouvelle.
+    """
+
+    def __init__(self, file_path=FICHIER_CLASSEUR, dossier=DOSSIER_INSTANTANES,
+                 intervalle=INTERVALLE_SURVEILLANCE, compact=False):
+        super().__init__(name="surveillance-catalogue", daemon=True)
+        self.file_path = file_path
+        self.dossier = dossier
+        self.intervalle = intervalle
+        self.compact = compact
+        self._arret = threading.Event()
+        self._stat = _stat_key(file_path)
+        self._stat_en_echec = None
+        self.rechargements = 0
+        self.echecs = 0
+        self.courant = load_catalogue_version(file_path, dossier, compact=compact)
+
+    def run(self):
+        while not self._arret.wait(self.intervalle):
+            self.check()
+
+    def stop(self):
+        self._arret.set()
+
+    def check(self):
+        """
+        Recharge le catalogue si le classeur a changé depuis la dernière vérification.
+
+        Returns:
+            bool: True si une nouvelle version a été publiée
+        """
+        try:
+            stat = _stat_key(self.file_path)
+        except OSError as e:
+            logger.warning(f"Classeur {self.file_path} inaccessible: {str(e)}")
+            return False
+        # Un classeur en cours d'écriture ou invalide n'est retenté qu'après une nouvelle modification
+        if stat == self._stat or stat == self._stat_en_echec:
+            return False
+
+        precedent = self.courant
+        debut = time.perf_counter()
+        try:
+            nouveau = load_catalogue_version(self.file_path, self.dossier, precedent=precedent, compact=self.compact)
+        except Exception as e:
+            self.echecs += 1
+            self._stat_en_echec = stat
+            logger.error(f"Rechargement du catalogue impossible, la version {(precedent.empreinte or '-')[:12]} "
+                         f"reste en service: {str(e)}", exc_info=True)
+            return False
+
+        self._stat = stat
+        self._stat_en_echec = None
+        if nouveau is precedent:
+            logger.info("Classeur modifié sur disque mais contenu identique, catalogue conservé")
+            return False
+        self.courant = nouveau
+        self.rechargements += 1
+        logger.info(f"Catalogue rechargé: {(precedent.empreinte or '-')[:12]} -> {nouveau.empreinte[:12]} "
+                    f"en {(time.perf_counter() - debut) * 1000:.0f} ms")
+        return True
+
+    def stats(self):
+        return {
+            'empreinte': self.courant.empreinte,
+            'charge_le': self.courant.charge_le,
+            'rechargements': self.rechargements,
+            'echecs': self.echecs,
+            'compact': self.compact
+        }
+
+# ----- POINT D'ENTRÉE -----
+if __name__ == "__main__":
+    # Compilation explicite, par exemple lors du déploiement: python catalogue_esg.py
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    compile_catalogue()
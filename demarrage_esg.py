@@ -0,0 +1,94 @@
+"""
+Démarrage ESG - Institut d'Économie Durable
+Imports différés des dépendances lourdes et rapport des temps d'import au démarrage
+"""
+
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+import types
+
+logger = logging.getLogger("calculateur_esg.demarrage")
+
+# Mode de démarrage: les dépendances lourdes sont chargées à leur première utilisation,
+# sauf si ESG_IMPORTS_DIFFERES=0 (tout est alors importé au chargement du script)
+IMPORTS_DIFFERES = os.environ.get('ESG_IMPORTS_DIFFERES', '1') != '0'
+
+# Nom du module -> (durée d'import en ms, mode d'import)
+_TEMPS_IMPORT = {}
+_verrou = threading.Lock()
+_rapport_journalise = False
+
+def timed_import(name, mode='démarrage'):
+    """Importe un module en mesurant la durée de son premier import."""
+    deja_charge = name in sys.modules
+    debut = time.perf_counter()
+    module = importlib.import_module(name)
+    duree_ms = (time.perf_counter() - debut) * 1000
+    with _verrou:
+        if name not in _TEMPS_IMPORT:
+            # Un module déjà chargé (par Streamlit ou une autre dépendance) n'a rien coûté ici
+            _TEMPS_IMPORT[name] = (0.0 if deja_charge else duree_ms, 'déjà chargé' if deja_charge else mode)
+    return module
+
+class LazyModule(types.ModuleType):
+    """Module importé à la première lecture d'un de ses attributs."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            debut = time.perf_counter()
+            module = timed_import(self.__name__, mode='différé')
+            self.__dict__['_module'] = module
+            logger.info(f"Module '{self.__name__}' chargé à la première utilisation en "
+                        f"{(time.perf_counter() - debut) * 1000:.1f} ms")
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+def lazy_import(name):
+    """
+    Retourne le module demandé, chargé à la première utilisation en mode différé.
+
+    Si le module est déjà importé, ou si les imports différés sont désactivés,
+    le module réel est retourné directement.
+    """
+    if name in sys.modules or not IMPORTS_DIFFERES:
+        return timed_import(name)
+    with _verrou:
+        _TEMPS_IMPORT.setdefault(name, None)
+    return LazyModule(name)
+
+def get_import_timings():
+    """Retourne les durées d'import mesurées (None pour les modules pas encore chargés)."""
+    with _verrou:
+        return dict(_TEMPS_IMPORT)
+
+def log_import_report():
+    """Écrit une seule fois par processus le rapport des temps d'import dans le journal."""
+    global _rapport_journalise
+    with _verrou:
+        if _rapport_journalise:
+            return
+        _rapport_journalise = True
+        temps = dict(_TEMPS_IMPORT)
+
+    mode = "différés" if IMPORTS_DIFFERES else "immédiats"
+    charges = {nom: valeur for nom, valeur in temps.items() if valeur is not None}
+    total_ms = sum(duree for duree, _ in charges.values())
+    logger.info(f"Rapport d'import au démarrage (imports {mode}): {total_ms:.1f} ms au total")
+    for nom, (duree, mode_import) in sorted(charges.items(), key=lambda item: -item[1][0]):
+        logger.info(f"  {nom}: {duree:.1f} ms ({mode_import})")
+    for nom in sorted(nom for nom, valeur in temps.items() if valeur is None):
+        logger.info(f"  {nom}: différé, chargé à la première utilisation")
@@ -0,0 +1,219 @@
+"""
+Générateur ESG - Institut d'Économie Durable
+Génération de classeurs synthétiques reproductibles pour les tests de montée en charge
+
+Usage:
+    python generateur_esg.py --metiers 1400 --sortie data/synthetique.xlsx
+"""
+
+import argparse
+import datetime
+import logging
+import os
+import random
+import re
+import time
+import zipfile
+
+import pandas as pd
+
+from catalogue_esg import FEUILLES
+
+logger = logging.getLogger("calculateur_esg.generateur")
+
+# Vocabulaire inspiré du classeur réel
+THEMATIQUES = [
+    "Analyse de données", "Reporting et indicateurs", "Impact financier", "Réglementaire droit et juridique",
+    "Éthique des affaires", "Stratégie d'entreprise", "Leadership éthique", "Conformité réglementaire",
+    "Communication d'impact", "Transformation des organisations", "Climat et carbone", "Biodiversité",
+    "Économie circulaire", "Investissement responsable", "Gestion des risques", "Achats responsables",
+    "Innovation durable", "Ressources humaines", "Énergie", "Gouvernance"
+]
+ROLES = ["Analyste", "Responsable", "Consultant", "Chargé de mission", "Directeur", "Chef de projet",
+         "Auditeur", "Gestionnaire", "Ingénieur", "Coordinateur"]
+DOMAINES = ["ESG", "RSE", "Climat", "Finance durable", "Biodiversité", "Reporting extra-financier",
+            "Achats responsables", "Économie circulaire", "Impact", "Transition énergétique"]
+SECTEURS = ["Finance", "Conseil", "Industrie", "Énergie", "Secteur public", "Distribution", "Audit"]
+TYPES_ENTREPRISES = ["Grand groupe", "PME", "Startup", "Cabinet de conseil", "Secteur public", "ONG"]
+NIVEAUX_REQUIS = ["Débutant", "Intermédiaire", "Expert"]
+DEMANDES = ["Faible", "Modérée", "Forte", "Très forte"]
+TENDANCES_SALAIRE = ["En hausse", "Stable", "En baisse"]
+DUREES = ["6 mois", "1 an", "1 à 2 ans", "2 ans"]
+PREREQUIS = ["Bac+2", "Bac+3 tous profils", "Bac+3 Commerce/Gestion/Finance", "Bac+4/+5"]
+
+# Date fixe du classeur (propriétés et entrées de l'archive): deux générations
+# identiques produisent le même fichier, et donc la même empreinte de catalogue
+DATE_CLASSEUR = datetime.datetime(2024, 1, 1)
+
+def experience_levels(nb_niveaux):
+    """Retourne les libellés de niveaux d'expérience ('0-2 ans', '2-5 ans', ...)."""
+    bornes = [0, 2, 5, 10, 15, 20]
+    while len(bornes) <= nb_niveaux:
+        bornes.append(bornes[-1] + 5)
+    return [f"{bornes[i]}-{bornes[i + 1]} ans" for i in range(nb_niveaux)]
+
+def tag_pool(nb_tags):
+    """Retourne `nb_tags` thématiques, complétées par des thématiques numérotées."""
+    return (THEMATIQUES + [f"Thématique {i}" for i in range(len(THEMATIQUES), nb_tags)])[:nb_tags]
+
+# ----- GÉNÉRATION -----
+def generate_catalogue(nb_metiers, tags_par_metier=5, nb_tags=60, nb_niveaux=3, nb_formations=20,
+                       nb_competences=5, nb_competences_distinctes=None, seed=42):
+    """
+    Génère un catalogue synthétique aux feuilles et colonnes du classeur réel.
+
+    Args:
+        nb_metiers: Nombre de métiers
+        tags_par_metier: Nombre de tags de chaque métier
+        nb_tags: Nombre de thématiques distinctes
+        nb_niveaux: Nombre de niveaux d'expérience (lignes de salaire par métier)
+        nb_formations: Nombre de programmes de formation IED
+        nb_competences: Nombre de colonnes Competence_N
+        nb_competences_distinctes: Taille du vocabulaire des compétences. Par défaut, il grandit
+            avec le catalogue (une compétence est partagée par deux métiers en moyenne), comme
+            les compétences en texte libre du classeur réel
+        seed: Graine du générateur aléatoire (même graine, même catalogue)
+
+    Returns:
+        dict: Les DataFrames 'metiers', 'salaire', 'competences', 'formations' et 'tendances'
+
+    Raises:
+        ValueError: Si `nb_formations` est inférieur à 1 (chaque métier reçoit un programme principal)
+    """
+    if nb_formations < 1:
+        raise ValueError(f"Au moins un programme de formation est nécessaire (nb_formations={nb_formations})")
+    rng = random.Random(seed)
+    tags = tag_pool(max(nb_tags, tags_par_metier))
+    niveaux = experience_levels(nb_niveaux)
+    programmes = [f"Programme {i + 1} - {rng.choice(DOMAINES)} (Bac+{rng.choice([3, 5])})"
+                  for i in range(nb_formations)]
+    modules = [f"Module {i + 1}" for i in range(max(nb_formations * 3, 10))]
+    if nb_competences_distinctes is None:
+        nb_competences_distinctes = max(len(DOMAINES) * 20, nb_metiers * nb_competences // 2)
+    par_domaine = -(-nb_competences_distinctes // len(DOMAINES))
+    vocabulaire_competences = [f"Compétence {domaine} {i + 1}" for domaine in DOMAINES for i in range(par_domaine)]
+
+    noms = []
+    for i in range(nb_metiers):
+        nom = f"{ROLES[i % len(ROLES)]} {DOMAINES[(i // len(ROLES)) % len(DOMAINES)]}"
+        # Au-delà des combinaisons rôle/domaine, numéroter pour garder des noms uniques
+        cycle = i // (len(ROLES) * len(DOMAINES))
+        noms.append(nom if cycle == 0 else f"{nom} {cycle + 1}")
+
+    metiers, salaire, competences, formations, tendances = [], [], [], [], []
+    for nom in noms:
+        secteur = rng.choice(SECTEURS)
+        metiers.append({
+            'Métier': nom,
+            'Formation_IED': rng.choice(["Oui", "Non"]),
+            'Tags': ', '.join(rng.sample(tags, tags_par_metier)),
+            'Types_entreprises': ', '.join(rng.sample(TYPES_ENTREPRISES, 2))
+        })
+
+        description = (f"Le métier de {nom.lower()} se développe dans le secteur {secteur.lower()}, "
+                       f"porté par l'évolution des réglementations et les attentes des parties prenantes.")
+        salaire_min = rng.randrange(30000, 55000, 1000)
+        for niveau in niveaux:
+            ecart = rng.randrange(8000, 15000, 1000)
+            salaire.append({
+                'Métier': nom, 'Secteur': secteur, 'Experience': niveau,
+                'Salaire_Min': salaire_min, 'Salaire_Max': salaire_min + ecart,
+                'Salaire_Moyen': salaire_min + ecart // 2, 'Description': description
+            })
+            salaire_min += rng.randrange(5000, 12000, 1000)
+
+        ligne_competences = {'Métier': nom}
+        for i, competence in enumerate(rng.sample(vocabulaire_competences, nb_competences), 1):
+            ligne_competences[f'Competence_{i}'] = competence
+        ligne_competences['Niveau_Requis'] = rng.choice(NIVEAUX_REQUIS)
+        competences.append(ligne_competences)
+
+        principal, secondaire = rng.sample(programmes, 2) if len(programmes) > 1 else (programmes[0], None)
+        formations.append({
+            'Métier': nom,
+            'Programme_Principal': principal,
+            'Programme_Secondaire': secondaire,
+            'Modules_Clés': ', '.join(rng.sample(modules, 3)),
+            'Durée_Formation': rng.choice(DUREES),
+            'Prérequis': rng.choice(PREREQUIS)
+        })
+
+        tendances.append({
+            'Métier': nom,
+            'Croissance_Annuelle': round(rng.uniform(-0.05, 0.35), 2),
+            'Demande_Marché': rng.choice(DEMANDES),
+            'Salaire_Tendance': rng.choice(TENDANCES_SALAIRE),
+            'Secteurs_Recruteurs': ', '.join(rng.sample(SECTEURS, 3))
+        })
+
+    return {
+        'metiers': pd.DataFrame(metiers),
+        'salaire': pd.DataFrame(salaire),
+        'competences': pd.DataFrame(competences),
+        'formations': pd.DataFrame(formations),
+        'tendances': pd.DataFrame(tendances)
+    }
+
+def write_workbook(data, file_path):
+    """
+    Écrit le catalogue dans un classeur Excel aux noms de feuilles attendus par `load_data`.
+
+    Le classeur est écrit en flux (mode write_only d'openpyxl), ce qui garde
+    la mémoire bornée pour les grands catalogues.
+    """
+    from openpyxl import Workbook
+
+    debut = time.perf_counter()
+    classeur = Workbook(write_only=True)
+    classeur.properties.created = DATE_CLASSEUR
+    for cle, nom_feuille in FEUILLES.items():
+        df = data[cle]
+        feuille = classeur.create_sheet(nom_feuille)
+        feuille.append(list(df.columns))
+        for ligne in df.itertuples(index=False, name=None):
+            feuille.append([None if pd.isna(valeur) else valeur for valeur in ligne])
+    classeur.save(file_path)
+    _normalize_workbook(file_path)
+    logger.info(f"Classeur écrit dans {file_path} en {time.perf_counter() - debut:.1f} s "
+                f"({len(data['metiers'])} métiers, {len(data['salaire'])} lignes de salaire)")
+
+def _normalize_workbook(file_path):
+    """Fixe les dates que openpyxl renseigne à l'enregistrement, pour un fichier reproductible."""
+    date_zip = DATE_CLASSEUR.timetuple()[:6]
+    date_xml = DATE_CLASSEUR.strftime('%Y-%m-%dT%H:%M:%SZ').encode()
+    temporaire = f"{file_path}.tmp"
+    with zipfile.ZipFile(file_path) as source, \
+            zipfile.ZipFile(temporaire, 'w', zipfile.ZIP_DEFLATED) as destination:
+        for info in source.infolist():
+            contenu = source.read(info)
+            if info.filename == 'docProps/core.xml':
+                contenu = re.sub(rb'(<dcterms:modified[^>]*>)[^<]*', rb'\g<1>' + date_xml, contenu)
+            destination.writestr(zipfile.ZipInfo(info.filename, date_time=date_zip), contenu,
+                                 compress_type=zipfile.ZIP_DEFLATED)
+    os.replace(temporaire, file_path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère un classeur ESG synthétique reproductible")
+    parser.add_argument('--metiers', type=int, default=1400, help="Nombre de métiers")
+    parser.add_argument('--tags-par-metier', type=int, default=5)
+    parser.add_argument('--tags', type=int, default=60, help="Nombre de thématiques distinctes")
+    parser.add_argument('--niveaux', type=int, default=3, help="Nombre de niveaux d'expérience")
+    parser.add_argument('--formations', type=int, default=20, help="Nombre de programmes de formation")
+    parser.add_argument('--competences', type=int, default=5, help="Nombre de compétences par métier")
+    parser.add_argument('--competences-distinctes', type=int, default=None,
+                        help="Taille du vocabulaire des compétences (par défaut: croît avec le nombre de métiers)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--sortie', default='data/synthetique.xlsx', help="Chemin du classeur généré")
+    args = parser.parse_args()
+    if args.formations < 1:
+        parser.error("--formations doit être au moins 1")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    data = generate_catalogue(args.metiers, tags_par_metier=args.tags_par_metier, nb_tags=args.tags,
+                              nb_niveaux=args.niveaux, nb_formations=args.formations,
+                              nb_competences=args.competences,
+                              nb_competences_distinctes=args.competences_distinctes, seed=args.seed)
+    write_workbook(data, args.sortie)
+
+if __name__ == "__main__":
+    main()
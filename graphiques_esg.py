@@ -0,0 +1,300 @@
+"""
+Graphiques ESG - Institut d'Économie Durable
+Graphiques salariaux: spécification Vega-Lite rendue côté navigateur, ou images
+matplotlib (importé à la demande) conservées dans un cache LRU partagé entre les sessions
+"""
+
+import io
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+logger = logging.getLogger("calculateur_esg.graphiques")
+
+# Moteurs de rendu disponibles: 'vega-lite' (natif Streamlit, sans matplotlib) ou 'matplotlib'
+MOTEURS_GRAPHIQUES = ('vega-lite', 'matplotlib')
+MOTEUR_PAR_DEFAUT = 'vega-lite'
+
+# Nombre maximal de graphiques rendus conservés en mémoire
+TAILLE_CACHE_GRAPHIQUES = 256
+
+# Options de rendu identiques à celles de st.pyplot
+OPTIONS_RENDU = {'bbox_inches': 'tight', 'dpi': 200}
+
+# Colonnes attendues pour le graphique (noms canoniques du schéma, voir schema_esg)
+COLONNES_SALAIRE = ('Expérience', 'Salaire_Min', 'Salaire_Max', 'Salaire_Moyen')
+
+# ----- SPÉCIFICATION VEGA-LITE -----
+def _salary_chart_values(salaire_records):
+    """Extrait les points (expérience, min, moyen, max) des enregistrements salariaux."""
+    valeurs = []
+    for record in salaire_records:
+        missing_columns = [col for col in COLONNES_SALAIRE if col not in record]
+        if missing_columns:
+            raise ValueError(f"Colonnes manquantes: {', '.join(missing_columns)}")
+        point = {col: record[col] for col in COLONNES_SALAIRE}
+        point['Expérience'] = str(point['Expérience'])
+        point['Libellé'] = f"{point['Salaire_Moyen']}€"
+        valeurs.append(point)
+    return valeurs
+
+def build_salary_chart_spec(salaire_records, colors, small_version=False):
+    """Construit la spécification Vega-Lite du graphique d'évolution salariale.
+
+    Le graphique reprend celui de matplotlib (fourchette min-max, courbe du
+    salaire moyen et valeurs annotées) mais est rendu par le navigateur via
+    st.vega_lite_chart, sans importer matplotlib côté serveur.
+
+    Args:
+        salaire_records: Enregistrements salariaux du métier
+        colors: Couleurs du thème de l'application
+        small_version: Si True, crée une version plus petite pour l'aperçu
+    """
+    valeurs = _salary_chart_values(salaire_records)
+    taille_police = 9 if small_version else 10
+    # La série tracée est portée par un champ calculé pour obtenir une légende commune
+    couleur = {
+        'field': 'Série', 'type': 'nominal',
+        'scale': {'domain': ['Salaire moyen', 'Fourchette salariale'], 'range': [colors['primary'], colors['primary']]},
+        'legend': {'title': None, 'orient': 'top-left', 'labelFontSize': taille_police}
+    }
+    axe_y = {'type': 'quantitative', 'title': 'Salaire annuel brut (€)', 'scale': {'zero': False}}
+    return {
+        'height': 220 if small_version else 380,
+        'data': {'values': valeurs},
+        'encoding': {
+            'x': {
+                'field': 'Expérience', 'type': 'ordinal', 'title': 'Expérience',
+                'sort': [point['Expérience'] for point in valeurs],
+                'axis': {'labelAngle': 0, 'labelFontSize': taille_police}
+            },
+            'tooltip': [
+                {'field': 'Expérience', 'type': 'ordinal'},
+                {'field': 'Salaire_Min', 'type': 'quantitative', 'title': 'Minimum'},
+                {'field': 'Salaire_Moyen', 'type': 'quantitative', 'title': 'Moyen'},
+                {'field': 'Salaire_Max', 'type': 'quantitative', 'title': 'Maximum'}
+            ]
+        },
+        'layer': [
+            {
+                'mark': {'type': 'area', 'opacity': 0.2},
+                'transform': [{'calculate': "'Fourchette salariale'", 'as': 'Série'}],
+                'encoding': {
+                    'y': {'field': 'Salaire_Min', **axe_y},
+                    'y2': {'field': 'Salaire_Max'},
+                    'color': couleur
+                }
+            },
+            {
+                'mark': {'type': 'line', 'point': True, 'strokeWidth': 2},
+                'transform': [{'calculate': "'Salaire moyen'", 'as': 'Série'}],
+                'encoding': {
+                    'y': {'field': 'Salaire_Moyen', **axe_y},
+                    'color': couleur
+                }
+            },
+            {
+                'mark': {'type': 'text', 'dy': -12 if not small_version else -10,
+                         'fontWeight': 'bold', 'fontSize': taille_police},
+                'encoding': {
+                    'y': {'field': 'Salaire_Moyen', **axe_y},
+                    'text': {'field': 'Libellé'}
+                }
+            }
+        ],
+        'config': {'axis': {'gridDash': [4, 4]}}
+    }
+
+# ----- CRÉATION DES FIGURES MATPLOTLIB -----
+def create_salary_chart(df_filtered, colors, small_version=False):
+    """Crée un graphique d'évolution salariale.
+
+    La figure est créée hors de pyplot: elle n'est jamais enregistrée dans le
+    registre global de matplotlib et est libérée dès qu'elle n'est plus référencée.
+
+    Args:
+        df_filtered: DataFrame des données filtrées
+        colors: Couleurs du thème de l'application
+        small_version: Si True, crée une version plus petite pour l'aperçu
+    """
+    # Import à la demande: matplotlib n'est chargé que si ce moteur est utilisé
+    from matplotlib.figure import Figure
+
+    # Vérifier les colonnes (noms canoniques appliqués au chargement du catalogue)
+    missing_columns = [col for col in COLONNES_SALAIRE if col not in df_filtered.columns]
+
+    if missing_columns:
+        # Colonnes manquantes - créer un graphique simple avec message d'erreur
+        fig = Figure(figsize=(5, 3) if not small_version else (3.5, 2.5))
+        ax = fig.subplots()
+        ax.text(0.5, 0.5, f"Données salariales incomplètes\nColonnes manquantes: {', '.join(missing_columns)}",
+                ha='center', va='center', transform=ax.transAxes, fontsize=12)
+        ax.set_axis_off()
+        return fig
+
+    # Choisir la taille en fonction du contexte
+    if small_version:
+        # Version compact pour l'aperçu
+        fig = Figure(figsize=(4.5, 3))
+    else:
+        # Version normale pour les résultats détaillés - plus large et plus haute
+        fig = Figure(figsize=(9, 5))
+    ax = fig.subplots()
+
+    # Créer des données pour le graphique
+    experience = df_filtered['Expérience'].tolist()
+    min_salary = df_filtered['Salaire_Min'].tolist()
+    max_salary = df_filtered['Salaire_Max'].tolist()
+    avg_salary = df_filtered['Salaire_Moyen'].tolist()
+
+    # Tracer les lignes et l'aire entre min et max
+    x = range(len(experience))
+    ax.plot(x, avg_salary, marker='o', linestyle='-', color=colors['primary'], linewidth=2, label='Salaire moyen')
+    ax.fill_between(x, min_salary, max_salary, alpha=0.2, color=colors['primary'], label='Fourchette salariale')
+
+    # Personnaliser le graphique
+    ax.set_ylabel('Salaire annuel brut (€)', fontsize=11)
+    ax.set_xlabel('Expérience', fontsize=11)
+    ax.set_xticks(x)
+    ax.set_xticklabels(experience, fontsize=10)
+    ax.grid(True, linestyle='--', alpha=0.7)
+
+    # Ajuster la taille de la légende
+    if small_version:
+        ax.legend(fontsize=9, loc='upper left')
+    else:
+        ax.legend(fontsize=10, loc='upper left')
+
+    # Ajouter les valeurs (agrandies)
+    for i, avg_val in enumerate(avg_salary):
+        font_size = 9 if small_version else 10
+        y_offset = 10 if small_version else 12
+        ax.annotate(f"{avg_val}€", (i, avg_val), textcoords="offset points",
+                    xytext=(0, y_offset), ha='center', fontweight='bold', fontsize=font_size)
+
+    # Ajouter plus d'espace autour du graphique
+    fig.tight_layout(pad=1.5)
+    return fig
+
+def render_salary_chart(df_filtered, colors, small_version=False, image_format='png'):
+    """Rend le graphique salarial en image (PNG ou SVG) et libère la figure."""
+    fig = create_salary_chart(df_filtered, colors, small_version)
+    try:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=image_format, **OPTIONS_RENDU)
+        return buffer.getvalue()
+    finally:
+        # Libérer explicitement les artistes de la figure
+        fig.clear()
+
+# ----- CACHE DES GRAPHIQUES RENDUS -----
+class ChartCache:
+    """Cache LRU borné des graphiques rendus, partagé entre les sessions et les threads."""
+
+    def __init__(self, max_entries=TAILLE_CACHE_GRAPHIQUES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_render(self, key, render):
+        """Retourne l'image en cache pour la clé, ou la rend et la stocke."""
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return image
+            self.misses += 1
+
+        # Le rendu se fait hors du verrou pour ne pas bloquer les autres sessions
+        image = render()
+        with self._lock:
+            self._entries[key] = image
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return image
+
+    def stats(self):
+        """Retourne les compteurs du cache."""
+        with self._lock:
+            return {
+                'entrees': len(self._entries),
+                'octets': sum(len(image) for image in self._entries.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+    def clear(self):
+        """Vide le cache."""
+        with self._lock:
+            self._entries.clear()
+
+_CACHE_GRAPHIQUES = ChartCache()
+
+def _salary_data_key(salaire_records):
+    """Construit une clé hashable à partir des données salariales du graphique."""
+    return tuple(tuple(record.items()) for record in salaire_records)
+
+def get_salary_chart_image(metier_nom, salaire_records, colors, small_version=False, image_format='png'):
+    """
+    Retourne le graphique salarial d'un métier depuis le cache, en le rendant si besoin.
+
+    La clé inclut le métier, la taille, le thème de couleurs et les données
+    salariales elles-mêmes, pour qu'un rechargement du catalogue ne serve jamais
+    un graphique périmé.
+    """
+    cle = (metier_nom, small_version, tuple(sorted(colors.items())), image_format,
+           _salary_data_key(salaire_records))
+    return _CACHE_GRAPHIQUES.get_or_render(
+        cle,
+        lambda: render_salary_chart(pd.DataFrame(list(salaire_records)), colors, small_version, image_format)
+    )
+
+def warm_up_salary_charts(bundles, colors, image_format='png'):
+    """
+    Prérend les graphiques salariaux (normal et compact) des métiers, dans l'ordre du catalogue.
+
+    Le préchauffage s'arrête quand le cache est plein: au-delà, chaque nouveau
+    rendu évincerait un graphique prérendu juste avant.
+    """
+    debut = time.perf_counter()
+    capacite = _CACHE_GRAPHIQUES.max_entries
+    nb_graphiques = 0
+    nb_ignores = 0
+    for metier_nom, fiche in bundles.items():
+        if not fiche.get('salaire'):
+            continue
+        if nb_graphiques + 2 > capacite:
+            nb_ignores += 1
+            continue
+        for small_version in (False, True):
+            try:
+                get_salary_chart_image(metier_nom, fiche['salaire'], colors, small_version, image_format)
+                nb_graphiques += 1
+            except Exception as e:
+                logger.warning(f"Préchauffage du graphique impossible pour {metier_nom}: {str(e)}")
+    logger.info(f"{nb_graphiques} graphiques salariaux prérendus en {(time.perf_counter() - debut) * 1000:.0f} ms")
+    if nb_ignores:
+        logger.info(f"{nb_ignores} métiers non prérendus: cache des graphiques plein ({capacite} entrées)")
+    return nb_graphiques
+
+def configure_chart_cache(max_entries):
+    """Modifie la taille maximale du cache des graphiques (les entrées les plus anciennes sont évincées)."""
+    with _CACHE_GRAPHIQUES._lock:
+        _CACHE_GRAPHIQUES.max_entries = max_entries
+        while len(_CACHE_GRAPHIQUES._entries) > max_entries:
+            _CACHE_GRAPHIQUES._entries.popitem(last=False)
+            _CACHE_GRAPHIQUES.evictions += 1
+
+def get_chart_cache_stats():
+    """Retourne les compteurs du cache des graphiques."""
+    return _CACHE_GRAPHIQUES.stats()
@@ -0,0 +1,632 @@
+"""
+Hubspot ESG - Institut d'Économie Durable
+File d'envoi durable (SQLite) des leads et synchronisation en arrière-plan vers Hubspot
+"""
+
+import contextlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import instrumentation_esg
+
+logger = logging.getLogger("calculateur_esg.hubspot")
+
+# Fichier SQLite de la file d'envoi
+FICHIER_OUTBOX = 'data/.outbox/leads.sqlite3'
+
+# Politique de nouvelles tentatives
+MAX_TENTATIVES = 8
+DELAI_INITIAL = 2.0        # secondes avant la première nouvelle tentative
+DELAI_MAX = 15 * 60.0      # plafond du délai entre deux tentatives
+DUREE_BAIL = 120.0         # un lead réservé mais non acquitté redevient disponible après ce délai
+RETENTION_ENVOYES = 24 * 3600.0  # durée de conservation des leads envoyés (dédoublonnage)
+RETENTION_ECHECS = 30 * 24 * 3600.0  # durée de conservation des leads abandonnés (examen des erreurs)
+
+# Protection de l'API Hubspot (valeurs par défaut, configurables dans st.secrets['hubspot'])
+REQUETES_PAR_SECONDE = 10.0   # quota Hubspot des applications privées: 100 requêtes / 10 s
+RAFALE = 10                   # nombre de requêtes pouvant partir d'un coup
+SEUIL_DISJONCTEUR = 5         # échecs consécutifs avant ouverture du disjoncteur
+DELAI_DISJONCTEUR = 60.0      # durée d'ouverture du disjoncteur avant un essai (secondes)
+DELAI_SESSION = 30.0          # délai minimal entre deux soumissions d'une même session
+DELAI_EMAIL = 60.0            # délai minimal entre deux soumissions pour un même email
+
+# Statuts d'un lead dans la file
+EN_ATTENTE = 'en_attente'
+EN_COURS = 'en_cours'
+ENVOYE = 'envoye'
+ECHEC = 'echec'
+
+# ----- PROPRIÉTÉS ET ENVOI -----
+def build_contact_properties(user_data):
+    """Prépare les propriétés pour l'API Hubspot (UNIQUEMENT les informations de base)."""
+    # NE PAS envoyer les tags ni le métier sélectionné à Hubspot
+    return {
+        "firstname": user_data.get('prenom', ''),
+        "lastname": user_data.get('nom', ''),
+        "email": user_data.get('email', ''),
+        "phone": user_data.get('telephone', ''),
+        "hs_marketable_status": True  # Toujours envoyer True à Hubspot
+    }
+
+def create_hubspot_client(access_token, host=None):
+    """Crée un client Hubspot, éventuellement vers un serveur local de substitution."""
+    # Import à la demande: le client Hubspot n'est chargé qu'au premier envoi
+    import hubspot
+
+    options = {'access_token': access_token}
+    if host:
+        options['host'] = host
+    return hubspot.Client.create(**options)
+
+class UpsertError(Exception):
+    """Contact refusé par Hubspot dans la réponse d'un upsert (données invalides)."""
+
+    status = 400
+
+class HubSpotContacts:
+    """
+    Accès partagé à l'API contacts de Hubspot.
+
+    Le SDK construit un nouveau client HTTP (et donc un nouveau pool de
+    connexions) à chaque accès à `client.crm.contacts.<api>`: l'API batch est
+    donc résolue une seule fois et réutilisée pour tous les envois, ce qui
+    garde les connexions TLS ouvertes d'un lead à l'autre. Le client (et le
+    SDK Hubspot) n'est créé qu'au premier envoi.
+    """
+
+    def __init__(self, access_token, host=None):
+        self.access_token = access_token
+        self.host = host
+        self._batch_api = None
+        self._verrou_client = threading.Lock()
+        self._verrou = threading.Lock()
+        self._nb_appels = 0
+        self._nb_erreurs = 0
+        self._duree_totale_ms = 0.0
+        self._duree_max_ms = 0.0
+
+    @property
+    def batch_api(self):
+        """API batch des contacts, créée au premier envoi."""
+        if self._batch_api is None:
+            with self._verrou_client:
+                if self._batch_api is None:
+                    client = create_hubspot_client(self.access_token, host=self.host)
+                    self._batch_api = client.crm.contacts.batch_api
+        return self._batch_api
+
+    def upsert(self, properties):
+        """
+        Crée ou met à jour un contact en une seule requête, en l'identifiant par son email.
+
+        Returns:
+            str: Identifiant Hubspot du contact
+        """
+        from hubspot.crm.contacts import (
+            BatchInputSimplePublicObjectBatchInputUpsert, SimplePublicObjectBatchInputUpsert
+        )
+
+        entree = SimplePublicObjectBatchInputUpsert(
+            id=properties.get('email'), id_property='email', properties=properties
+        )
+        debut = time.perf_counter()
+        try:
+            reponse = self.batch_api.upsert(
+                batch_input_simple_public_object_batch_input_upsert=BatchInputSimplePublicObjectBatchInputUpsert(inputs=[entree])
+            )
+        except Exception:
+            self._record_call((time.perf_counter() - debut) * 1000, erreur=True)
+            raise
+        duree_ms = self._record_call((time.perf_counter() - debut) * 1000)
+
+        erreurs = getattr(reponse, 'errors', None)
+        if erreurs or not reponse.results:
+            message = erreurs[0].message if erreurs else "réponse vide"
+            raise UpsertError(f"Contact refusé par Hubspot: {message}")
+
+        contact = reponse.results[0]
+        action = "créé" if getattr(contact, 'new', False) else "mis à jour"
+        logger.info(f"Contact {action} dans Hubspot: {contact.id} ({duree_ms:.0f} ms)")
+        return contact.id
+
+    def _record_call(self, duree_ms, erreur=False):
+        """Cumule la latence d'un appel à l'API."""
+        instrumentation_esg.observe('hubspot', 'upsert', duree_ms / 1000)
+        with self._verrou:
+            self._nb_appels += 1
+            self._nb_erreurs += int(erreur)
+            self._duree_totale_ms += duree_ms
+            self._duree_max_ms = max(self._duree_max_ms, duree_ms)
+            moyenne_ms = self._duree_totale_ms / self._nb_appels
+        logger.info(f"Appel Hubspot upsert: {duree_ms:.0f} ms{' (erreur)' if erreur else ''} - "
+                    f"moyenne {moyenne_ms:.0f} ms sur {self._nb_appels} appels")
+        return duree_ms
+
+    def stats(self):
+        """Retourne les compteurs de latence des appels à l'API."""
+        with self._verrou:
+            return {
+                'appels': self._nb_appels,
+                'erreurs': self._nb_erreurs,
+                'duree_moyenne_ms': self._duree_totale_ms / self._nb_appels if self._nb_appels else 0.0,
+                'duree_max_ms': self._duree_max_ms
+            }
+
+def is_permanent_error(erreur):
+    """Indique si une erreur Hubspot ne se résoudra pas en réessayant (données refusées)."""
+    statut = getattr(erreur, 'status', None)
+    return isinstance(statut, int) and 400 <= statut < 500 and statut not in (408, 409, 429)
+
+def compute_backoff(tentatives, delai_initial=DELAI_INITIAL, delai_max=DELAI_MAX):
+    """Délai exponentiel avant la prochaine tentative, avec gigue pour étaler les reprises."""
+    delai = min(delai_initial * (2 ** max(tentatives - 1, 0)), delai_max)
+    return delai * random.uniform(0.5, 1.0)
+
+def get_retry_after(erreur):
+    """Lit l'en-tête Retry-After d'une erreur Hubspot (secondes), si présent."""
+    entetes = getattr(erreur, 'headers', None) or {}
+    try:
+        return float(entetes.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+# ----- PROTECTION DE L'API -----
+class TokenBucket:
+    """
+    Limiteur de débit à seau de jetons, partagé par tous les envois du processus.
+
+    Le seau se remplit de `debit` jetons par seconde, jusqu'à `capacite`;
+    chaque requête consomme un jeton.
+    """
+
+    def __init__(self, debit=REQUETES_PAR_SECONDE, capacite=RAFALE):
+        self.debit = float(debit)
+        self.capacite = float(capacite)
+        self._jetons = float(capacite)
+        self._dernier_remplissage = time.monotonic()
+        self._suspendu_jusqua = 0.0
+        self._verrou = threading.Lock()
+        self.compteurs = {'acquis': 0, 'attentes': 0, 'refus': 0, 'suspensions': 0}
+
+    def _refill(self, maintenant):
+        ecoule = maintenant - self._dernier_remplissage
+        self._jetons = min(self.capacite, self._jetons + ecoule * self.debit)
+        self._dernier_remplissage = maintenant
+
+    def acquire(self, timeout=None):
+        """
+        Consomme un jeton, en attendant si nécessaire.
+
+        Returns:
+            bool: False si aucun jeton n'a été obtenu avant `timeout` secondes
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        a_attendu = False
+        while True:
+            with self._verrou:
+                maintenant = time.monotonic()
+                self._refill(maintenant)
+                if maintenant >= self._suspendu_jusqua and self._jetons >= 1:
+                    self._jetons -= 1
+                    self.compteurs['acquis'] += 1
+                    self.compteurs['attentes'] += int(a_attendu)
+                    return True
+                attente = max(self._suspendu_jusqua - maintenant, (1 - self._jetons) / self.debit)
+                if limite is not None and maintenant + attente > limite:
+                    self.compteurs['refus'] += 1
+                    return False
+            a_attendu = True
+            time.sleep(attente)
+
+    def suspend(self, duree):
+        """Bloque les envois pendant `duree` secondes (par exemple après une erreur 429)."""
+        with self._verrou:
+            self._suspendu_jusqua = max(self._suspendu_jusqua, time.monotonic() + duree)
+            self._jetons = 0.0
+            self.compteurs['suspensions'] += 1
+
+    def stats(self):
+        with self._verrou:
+            return dict(self.compteurs)
+
+class CircuitBreaker:
+    """
+    Disjoncteur: après `seuil` échecs consécutifs, les envois sont suspendus
+    pendant `delai` secondes, puis un seul envoi d'essai est autorisé.
+    Un succès referme le disjoncteur, un échec le rouvre.
+    """
+
+    FERME = 'fermé'
+    OUVERT = 'ouvert'
+    SEMI_OUVERT = 'semi-ouvert'
+
+    def __init__(self, seuil=SEUIL_DISJONCTEUR, delai=DELAI_DISJONCTEUR):
+        self.seuil = seuil
+        self.delai = delai
+        self.etat = self.FERME
+        self._echecs = 0
+        self._ouvert_le = 0.0
+        self._verrou = threading.Lock()
+        self.compteurs = {'succes': 0, 'echecs': 0, 'ouvertures': 0, 'rejets': 0}
+
+    def allow(self):
+        """Indique si un envoi peut partir maintenant."""
+        with self._verrou:
+            if self.etat == self.FERME:
+                return True
+            if self.etat == self.OUVERT and time.monotonic() - self._ouvert_le >= self.delai:
+                # Laisser passer un seul envoi d'essai
+                self.etat = self.SEMI_OUVERT
+                logger.info("Disjoncteur Hubspot semi-ouvert: envoi d'essai")
+                return True
+            self.compteurs['rejets'] += 1
+            return False
+
+    def retry_in(self):
+        """Délai (secondes) avant que le disjoncteur n'autorise un nouvel essai."""
+        with self._verrou:
+            if self.etat != self.OUVERT:
+                return 0.0
+            return max(self.delai - (time.monotonic() - self._ouvert_le), 0.0)
+
+    def record_success(self):
+        with self._verrou:
+            self.compteurs['succes'] += 1
+            self._echecs = 0
+            if self.etat != self.FERME:
+                logger.info("Disjoncteur Hubspot refermé")
+            self.etat = self.FERME
+
+    def record_failure(self):
+        with self._verrou:
+            self.compteurs['echecs'] += 1
+            self._echecs += 1
+            if self.etat == self.SEMI_OUVERT or (self.etat == self.FERME and self._echecs >= self.seuil):
+                self.etat = self.OUVERT
+                self._ouvert_le = time.monotonic()
+                self.compteurs['ouvertures'] += 1
+                logger.warning(f"Disjoncteur Hubspot ouvert après {self._echecs} échec(s) consécutif(s), "
+                               f"envois suspendus pendant {self.delai:.0f} s")
+
+    def stats(self):
+        with self._verrou:
+            return dict(self.compteurs, etat=self.etat)
+
+class SubmissionThrottled(Exception):
+    """Soumission refusée car trop rapprochée de la précédente."""
+
+    def __init__(self, attente):
+        super().__init__(f"Soumission trop rapprochée, réessayer dans {attente:.0f} s")
+        self.attente = attente
+
+class SubmissionThrottle:
+    """
+    Limite la fréquence des soumissions de formulaire par session et par email.
+
+    `check` vérifie une soumission avant son enregistrement, `record` la
+    compte une fois enregistrée: une soumission qui échoue (file d'envoi
+    indisponible) ne bloque pas le nouvel essai de l'utilisateur.
+    """
+
+    def __init__(self, delai_session=DELAI_SESSION, delai_email=DELAI_EMAIL):
+        self.delai_session = delai_session
+        self.delai_email = delai_email
+        self._dernieres = {}  # ('session' | 'email', clé) -> instant de la dernière soumission
+        self._verrou = threading.Lock()
+        self.compteurs = {'acceptees': 0, 'limitees_session': 0, 'limitees_email': 0}
+
+    def _keys(self, session_id, email):
+        return ((('session', session_id), self.delai_session, 'limitees_session'),
+                (('email', email.strip().lower()), self.delai_email, 'limitees_email'))
+
+    def check(self, session_id, email):
+        """
+        Vérifie qu'une soumission peut être acceptée (sans l'enregistrer).
+
+        Raises:
+            SubmissionThrottled: Si la soumission est trop rapprochée de la précédente
+        """
+        maintenant = time.monotonic()
+        with self._verrou:
+            for cle, delai, compteur in self._keys(session_id, email):
+                attente = self._dernieres.get(cle, -delai) + delai - maintenant
+                if attente > 0:
+                    self.compteurs[compteur] += 1
+                    raise SubmissionThrottled(attente)
+
+    def record(self, session_id, email):
+        """Enregistre une soumission acceptée (à appeler une fois le lead enregistré)."""
+        maintenant = time.monotonic()
+        with self._verrou:
+            for cle, _, _ in self._keys(session_id, email):
+                self._dernieres[cle] = maintenant
+            self.compteurs['acceptees'] += 1
+            # Oublier les soumissions anciennes pour borner la mémoire
+            if len(self._dernieres) > 10000:
+                delai_max = max(self.delai_session, self.delai_email)
+                self._dernieres = {cle: instant for cle, instant in self._dernieres.items()
+                                   if maintenant - instant < delai_max}
+
+    def stats(self):
+        with self._verrou:
+            return dict(self.compteurs)
+
+# ----- FILE D'ENVOI DURABLE -----
+class LeadOutbox:
+    """
+    File d'envoi des leads persistée dans SQLite.
+
+    Un lead est identifié par son email: une nouvelle soumission pour le même
+    email remplace les propriétés en attente au lieu de créer un doublon.
+    Chaque soumission incrémente une version, ce qui permet de ne pas acquitter
+    une soumission plus récente arrivée pendant un envoi.
+    """
+
+    def __init__(self, path=FICHIER_OUTBOX):
+        self.path = path
+        dossier = os.path.dirname(path)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS leads (
+                    email TEXT PRIMARY KEY,
+                    proprietes TEXT NOT NULL,
+                    version INTEGER NOT NULL DEFAULT 1,
+                    statut TEXT NOT NULL,
+                    tentatives INTEGER NOT NULL DEFAULT 0,
+                    prochaine_tentative REAL NOT NULL,
+                    derniere_erreur TEXT,
+                    hubspot_id TEXT,
+                    cree_le REAL NOT NULL,
+                    maj_le REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_leads_echeance ON leads (statut, prochaine_tentative)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """
+        Ouvre une connexion pour une opération (utilisable depuis n'importe quel thread).
+
+        La transaction en cours est annulée en cas d'erreur, et la connexion
+        est toujours fermée en sortie.
+        """
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.row_factory = sqlite3.Row
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def enqueue(self, properties):
+        """
+        Enregistre un lead dans la file, de manière durable.
+
+        Returns:
+            bool: False si un envoi identique a déjà été fait pour cet email
+        """
+        email = properties.get('email', '').strip().lower()
+        if not email:
+            raise ValueError("Un lead doit avoir un email")
+        contenu = json.dumps(properties, sort_keys=True, ensure_ascii=False)
+        maintenant = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            existant = conn.execute("SELECT proprietes, statut FROM leads WHERE email = ?", (email,)).fetchone()
+            if existant is not None and existant['statut'] == ENVOYE and existant['proprietes'] == contenu:
+                conn.execute("COMMIT")
+                return False
+            conn.execute("""
+                INSERT INTO leads (email, proprietes, statut, prochaine_tentative, cree_le, maj_le)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(email) DO UPDATE SET
+                    proprietes = excluded.proprietes,
+                    version = leads.version + 1,
+                    statut = excluded.statut,
+                    tentatives = 0,
+                    prochaine_tentative = excluded.prochaine_tentative,
+                    derniere_erreur = NULL,
+                    maj_le = excluded.maj_le
+            """, (email, contenu, EN_ATTENTE, maintenant, maintenant, maintenant))
+            conn.execute("COMMIT")
+        return True
+
+    def claim_due(self, limit=10, duree_bail=DUREE_BAIL):
+        """Réserve les leads dont l'échéance est passée (y compris les réservations expirées)."""
+        maintenant = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            lignes = conn.execute("""
+                SELECT email, proprietes, version, tentatives FROM leads
+                WHERE statut IN (?, ?) AND prochaine_tentative <= ?
+                ORDER BY prochaine_tentative LIMIT ?
+            """, (EN_ATTENTE, EN_COURS, maintenant, limit)).fetchall()
+            for ligne in lignes:
+                conn.execute("UPDATE leads SET statut = ?, prochaine_tentative = ? WHERE email = ?",
+                             (EN_COURS, maintenant + duree_bail, ligne['email']))
+            conn.execute("COMMIT")
+        return [{
+            'email': ligne['email'],
+            'properties': json.loads(ligne['proprietes']),
+            'version': ligne['version'],
+            'tentatives': ligne['tentatives']
+        } for ligne in lignes]
+
+    def mark_sent(self, email, version, hubspot_id=None):
+        """Acquitte un lead envoyé (sauf si une soumission plus récente l'a remplacé)."""
+        with self._connect() as conn:
+            conn.execute("""
+                UPDATE leads SET statut = ?, hubspot_id = ?, derniere_erreur = NULL, maj_le = ?
+                WHERE email = ? AND version = ?
+            """, (ENVOYE, None if hubspot_id is None else str(hubspot_id), time.time(), email, version))
+
+    def mark_failed(self, email, version, erreur, permanent=False, max_tentatives=MAX_TENTATIVES):
+        """Enregistre un échec d'envoi et planifie la prochaine tentative."""
+        maintenant = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            ligne = conn.execute("SELECT tentatives FROM leads WHERE email = ? AND version = ?",
+                                 (email, version)).fetchone()
+            if ligne is not None:
+                tentatives = ligne['tentatives'] + 1
+                abandon = permanent or tentatives >= max_tentatives
+                conn.execute("""
+                    UPDATE leads SET statut = ?, tentatives = ?, prochaine_tentative = ?, derniere_erreur = ?, maj_le = ?
+                    WHERE email = ? AND version = ?
+                """, (ECHEC if abandon else EN_ATTENTE, tentatives, maintenant + compute_backoff(tentatives),
+                      str(erreur)[:1000], maintenant, email, version))
+            conn.execute("COMMIT")
+        return ligne is not None and (permanent or ligne['tentatives'] + 1 >= max_tentatives)
+
+    def release(self, email, version, delai=0.0):
+        """Remet un lead réservé en attente sans compter de tentative."""
+        with self._connect() as conn:
+            conn.execute("UPDATE leads SET statut = ?, prochaine_tentative = ? WHERE email = ? AND version = ? AND statut = ?",
+                         (EN_ATTENTE, time.time() + delai, email, version, EN_COURS))
+
+    def purge_sent(self, retention=RETENTION_ENVOYES, retention_echecs=RETENTION_ECHECS):
+        """
+        Supprime les leads envoyés, et les leads abandonnés, plus anciens que leur durée de rétention.
+
+        Les données personnelles ne restent ainsi dans la file que le temps de
+        l'envoi, du dédoublonnage et de l'examen des erreurs.
+        """
+        maintenant = time.time()
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM leads WHERE (statut = ? AND maj_le < ?) OR (statut = ? AND maj_le < ?)",
+                                (ENVOYE, maintenant - retention, ECHEC, maintenant - retention_echecs)).rowcount
+
+    def stats(self):
+        """Retourne le nombre de leads par statut."""
+        with self._connect() as conn:
+            lignes = conn.execute("SELECT statut, COUNT(*) AS nb FROM leads GROUP BY statut").fetchall()
+        return {ligne['statut']: ligne['nb'] for ligne in lignes}
+
+# ----- SYNCHRONISATION EN ARRIÈRE-PLAN -----
+class HubSpotSyncWorker(threading.Thread):
+    """
+    Thread de fond qui vide la file d'envoi vers Hubspot.
+
+    Les échecs temporaires sont réessayés avec un délai exponentiel, les
+    données refusées par Hubspot (erreurs 4xx) sont marquées en échec.
+    """
+
+    def __init__(self, outbox, send, intervalle=5.0, taille_lot=10, limiteur=None, disjoncteur=None,
+                 intervalle_rapport=300.0):
+        """
+        Args:
+            outbox: File d'envoi à vider
+            send: Fonction qui envoie les propriétés d'un contact et retourne son identifiant Hubspot
+            intervalle: Délai maximal entre deux passages sur la file (secondes)
+            taille_lot: Nombre de leads réservés par passage
+            limiteur: TokenBucket partagé limitant le débit des requêtes (facultatif)
+            disjoncteur: CircuitBreaker suspendant les envois après des échecs répétés (facultatif)
+            intervalle_rapport: Délai entre deux écritures des compteurs dans le journal (secondes)
+        """
+        super().__init__(name="synchro-hubspot", daemon=True)
+        self.outbox = outbox
+        self.send = send
+        self.intervalle = intervalle
+        self.taille_lot = taille_lot
+        self.limiteur = limiteur
+        self.disjoncteur = disjoncteur
+        self.intervalle_rapport = intervalle_rapport
+        self._dernier_rapport = time.monotonic()
+        self._reveil = threading.Event()
+        self._arret = threading.Event()
+        self._derniere_purge = 0.0
+
+    def notify(self):
+        """Réveille le thread après l'ajout d'un lead."""
+        self._reveil.set()
+
+    def stop(self, timeout=None):
+        """Arrête le thread après le passage en cours."""
+        self._arret.set()
+        self._reveil.set()
+        self.join(timeout)
+
+    def run(self):
+        logger.info("Synchronisation Hubspot démarrée")
+        while not self._arret.is_set():
+            try:
+                traites = self.drain_once()
+            except Exception as e:
+                logger.error(f"Erreur dans la synchronisation Hubspot: {str(e)}")
+                traites = 0
+            if traites < self.taille_lot:
+                # File vide (ou presque): attendre un nouveau lead ou l'intervalle
+                self._reveil.wait(self.intervalle)
+                self._reveil.clear()
+
+    def drain_once(self):
+        """Traite un lot de leads arrivés à échéance et retourne leur nombre."""
+        maintenant = time.time()
+        if maintenant - self._derniere_purge > 3600:
+            self._derniere_purge = maintenant
+            self.outbox.purge_sent()
+        if time.monotonic() - self._dernier_rapport > self.intervalle_rapport:
+            self._dernier_rapport = time.monotonic()
+            logger.info(f"Compteurs Hubspot: {self.stats()}")
+
+        # Disjoncteur ouvert: ne rien réserver, les leads restent en attente
+        if self.disjoncteur is not None and self.disjoncteur.retry_in() > 0:
+            return 0
+
+        leads = self.outbox.claim_due(self.taille_lot)
+        for lead in leads:
+            if self._arret.is_set():
+                self.outbox.release(lead['email'], lead['version'])
+                continue
+            if self.disjoncteur is not None and not self.disjoncteur.allow():
+                # Délester: remettre le lead en attente sans compter de tentative
+                self.outbox.release(lead['email'], lead['version'], delai=self.disjoncteur.retry_in())
+                continue
+            if self.limiteur is not None and not self.limiteur.acquire(timeout=self.intervalle):
+                self.outbox.release(lead['email'], lead['version'])
+                continue
+            try:
+                hubspot_id = self.send(lead['properties'])
+                self.outbox.mark_sent(lead['email'], lead['version'], hubspot_id)
+                if self.disjoncteur is not None:
+                    self.disjoncteur.record_success()
+            except Exception as e:
+                permanent = is_permanent_error(e)
+                if self.disjoncteur is not None:
+                    # Des données refusées ne disent rien de la santé du service
+                    if permanent:
+                        self.disjoncteur.record_success()
+                    else:
+                        self.disjoncteur.record_failure()
+                if getattr(e, 'status', None) == 429 and self.limiteur is not None:
+                    self.limiteur.suspend(get_retry_after(e) or 10.0)
+                abandon = self.outbox.mark_failed(lead['email'], lead['version'], e, permanent=permanent)
+                if abandon:
+                    logger.error(f"Lead abandonné après {lead['tentatives'] + 1} tentative(s): {str(e)}")
+                else:
+                    logger.warning(f"Échec d'envoi à Hubspot (tentative {lead['tentatives'] + 1}), "
+                                   f"nouvel essai planifié: {str(e)}")
+        return len(leads)
+
+    def stats(self):
+        """Retourne les compteurs de la file, du limiteur, du disjoncteur et du client."""
+        compteurs = {'file': self.outbox.stats()}
+        if self.limiteur is not None:
+            compteurs['limiteur'] = self.limiteur.stats()
+        if self.disjoncteur is not None:
+            compteurs['disjoncteur'] = self.disjoncteur.stats()
+        client_stats = getattr(getattr(self.send, '__self__', None), 'stats', None)
+        if client_stats is not None:
+            compteurs['client'] = client_stats()
+        return compteurs
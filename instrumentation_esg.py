@@ -0,0 +1,195 @@
+"""
+Instrumentation ESG - Institut d'Économie Durable
+Mesure des durées (pages, données, graphiques, Hubspot) et export au format texte Prometheus
+"""
+
+import bisect
+import functools
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger("calculateur_esg.instrumentation")
+
+# Activation par variable d'environnement (ESG_INSTRUMENTATION=1) ou par configure()
+_actif = os.environ.get('ESG_INSTRUMENTATION', '0') == '1'
+
+# Bornes des histogrammes (secondes), celles des clients Prometheus officiels
+BORNES = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+NOM_METRIQUE = 'esg_span_duration_seconds'
+FICHIER_METRIQUES = 'logs/metriques.prom'
+INTERVALLE_EXPORT = 15.0
+
+# Page et session du rerun en cours (Streamlit exécute chaque session dans son propre thread)
+_contexte = threading.local()
+
+class Histogram:
+    """Histogramme cumulatif des durées d'une série (catégorie, nom, page)."""
+
+    __slots__ = ('compteurs', 'somme', 'total')
+
+    def __init__(self):
+        self.compteurs = [0] * len(BORNES)
+        self.somme = 0.0
+        self.total = 0
+
+    def observe(self, duree):
+        position = bisect.bisect_left(BORNES, duree)
+        if position < len(BORNES):
+            self.compteurs[position] += 1
+        self.somme += duree
+        self.total += 1
+
+_histogrammes = {}  # (catégorie, nom, page) -> Histogram
+_verrou = threading.Lock()
+
+def is_enabled():
+    return _actif
+
+def set_context(page=None, session=None):
+    """Associe les spans du thread courant à une page et une session."""
+    _contexte.page = page
+    _contexte.session = session
+
+def observe(categorie, nom, duree):
+    """Enregistre une durée (secondes) mesurée par ailleurs."""
+    if not _actif:
+        return
+    cle = (categorie, nom, getattr(_contexte, 'page', None) or 'arriere-plan')
+    with _verrou:
+        histogramme = _histogrammes.get(cle)
+        if histogramme is None:
+            histogramme = _histogrammes[cle] = Histogram()
+        histogramme.observe(duree)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Span {categorie}/{nom} page={cle[2]} session={getattr(_contexte, 'session', None)}: "
+                     f"{duree * 1000:.2f} ms")
+
+class _Span:
+    __slots__ = ('categorie', 'nom', 'debut')
+
+    def __init__(self, categorie, nom):
+        self.categorie = categorie
+        self.nom = nom
+
+    def __enter__(self):
+        self.debut = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.categorie, self.nom, time.perf_counter() - self.debut)
+        return False
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_SPAN_NUL = _NullSpan()
+
+def span(categorie, nom):
+    """Contexte mesurant la durée d'un bloc (sans effet si l'instrumentation est désactivée)."""
+    if not _actif:
+        return _SPAN_NUL
+    return _Span(categorie, nom)
+
+def timed(categorie, nom=None):
+    """Décorateur mesurant chaque appel de la fonction décorée."""
+    def decorateur(func):
+        nom_span = nom or func.__name__
+
+        @functools.wraps(func)
+        def enveloppe(*args, **kwargs):
+            if not _actif:
+                return func(*args, **kwargs)
+            with _Span(categorie, nom_span):
+                return func(*args, **kwargs)
+        return enveloppe
+    return decorateur
+
+# ----- EXPORT PROMETHEUS -----
+def _escape_label(valeur):
+    return str(valeur).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def render_prometheus():
+    """Retourne les histogrammes au format texte d'exposition Prometheus."""
+    with _verrou:
+        series = [(cle, list(h.compteurs), h.somme, h.total) for cle, h in sorted(_histogrammes.items())]
+
+    lignes = [
+        f"# HELP {NOM_METRIQUE} Durée des rendus de page, accès aux données, graphiques et appels Hubspot",
+        f"# TYPE {NOM_METRIQUE} histogram"
+    ]
+    for (categorie, nom, page), compteurs, somme, total in series:
+        etiquettes = (f'categorie="{_escape_label(categorie)}",nom="{_escape_label(nom)}",'
+                      f'page="{_escape_label(page)}"')
+        cumul = 0
+        for borne, compteur in zip(BORNES, compteurs):
+            cumul += compteur
+            lignes.append(f'{NOM_METRIQUE}_bucket{{{etiquettes},le="{borne}"}} {cumul}')
+        lignes.append(f'{NOM_METRIQUE}_bucket{{{etiquettes},le="+Inf"}} {total}')
+        lignes.append(f'{NOM_METRIQUE}_sum{{{etiquettes}}} {somme:.6f}')
+        lignes.append(f'{NOM_METRIQUE}_count{{{etiquettes}}} {total}')
+    return '\n'.join(lignes) + '\n'
+
+def write_metrics_file(path=FICHIER_METRIQUES):
+    """Écrit les métriques dans un fichier (remplacement atomique, pour un collecteur textfile)."""
+    temporaire = f"{path}.tmp"
+    with open(temporaire, 'w', encoding='utf-8') as f:
+        f.write(render_prometheus())
+    os.replace(temporaire, path)
+
+def _make_handler():
+    from http.server import BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            corps = render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(corps)))
+            self.end_headers()
+            self.wfile.write(corps)
+    return Handler
+
+def configure(actif=True, fichier=None, port=None, intervalle=INTERVALLE_EXPORT):
+    """
+    Active l'instrumentation et démarre l'export des métriques.
+
+    Args:
+        actif: Active (True) ou désactive (False) l'enregistrement des spans
+        fichier: Fichier réécrit toutes les `intervalle` secondes (None: pas d'export fichier)
+        port: Port local servant les métriques sur /metrics (None: pas de serveur)
+    """
+    global _actif
+    _actif = bool(actif)
+    if not _actif:
+        logger.info("Instrumentation désactivée")
+        return
+
+    if fichier:
+        def exporter():
+            while True:
+                time.sleep(intervalle)
+                try:
+                    write_metrics_file(fichier)
+                except OSError as e:
+                    logger.warning(f"Export des métriques impossible vers {fichier}: {str(e)}")
+        threading.Thread(target=exporter, name="export-metriques", daemon=True).start()
+    if port:
+        from http.server import ThreadingHTTPServer
+
+        serveur = ThreadingHTTPServer(('127.0.0.1', int(port)), _make_handler())
+        threading.Thread(target=serveur.serve_forever, name="serveur-metriques", daemon=True).start()
+    logger.info(f"Instrumentation activée (fichier: {fichier or '-'}, port: {port or '-'})")
@@ -0,0 +1,124 @@
+"""
+Journal ESG - Institut d'Économie Durable
+Journalisation non bloquante: file d'attente, écriture en arrière-plan et rotation par taille
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+
+FICHIER_JOURNAL = 'logs/calculateur_esg.log'
+FORMAT_TEXTE = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+TAILLE_MAX = 10 * 1024 * 1024  # octets avant rotation
+NB_SAUVEGARDES = 5
+
+# Un seul écrivain par processus: Streamlit réexécute le script à chaque rerun
+_listener = None
+_verrou = threading.Lock()
+
+class JsonFormatter(logging.Formatter):
+    """Formate chaque enregistrement en une ligne JSON (pour l'expédition des journaux)."""
+
+    def format(self, record):
+        contenu = {
+            'horodatage': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'niveau': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName
+        }
+        trace = record.exc_text or (self.formatException(record.exc_info) if record.exc_info else None)
+        if trace:
+            contenu['exception'] = trace
+        return json.dumps(contenu, ensure_ascii=False)
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Dépose les enregistrements dans la file, message et trace déjà mis en forme.
+
+    Le QueueHandler standard ajoute la trace d'une exception au message: le
+    format JSON la perdrait dans le champ 'message'. Ici, la trace est gardée
+    à part (exc_text), dans le thread qui journalise.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _FORMATEUR_TRACES.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+_FORMATEUR_TRACES = logging.Formatter()
+
+def setup_logging(fichier=FICHIER_JOURNAL, niveau='INFO', json_lines=False,
+                  taille_max=TAILLE_MAX, nb_sauvegardes=NB_SAUVEGARDES):
+    """
+    Configure la journalisation du processus (une seule fois).
+
+    Les threads de l'application ne font que déposer les enregistrements dans
+    une file; un thread d'écriture les transmet au fichier (avec rotation par
+    taille) et à la console.
+
+    Args:
+        fichier: Fichier du journal
+        niveau: Niveau minimal journalisé ('DEBUG', 'INFO', ...)
+        json_lines: Si True, le fichier reçoit une ligne JSON par enregistrement
+        taille_max: Taille du fichier (octets) déclenchant une rotation
+        nb_sauvegardes: Nombre d'anciens fichiers conservés
+    """
+    global _listener
+    with _verrou:
+        if _listener is not None:
+            return
+
+        dossier = os.path.dirname(fichier)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        gestionnaire_fichier = logging.handlers.RotatingFileHandler(
+            fichier, maxBytes=taille_max, backupCount=nb_sauvegardes, encoding='utf-8'
+        )
+        gestionnaire_fichier.setFormatter(JsonFormatter() if json_lines else logging.Formatter(FORMAT_TEXTE))
+        console = logging.StreamHandler()
+        console.setFormatter(logging.Formatter(FORMAT_TEXTE))
+
+        file_attente = queue.SimpleQueue()
+        racine = logging.getLogger()
+        for gestionnaire in list(racine.handlers):
+            racine.removeHandler(gestionnaire)
+        racine.addHandler(_QueueHandler(file_attente))
+        racine.setLevel(niveau.upper() if isinstance(niveau, str) else niveau)
+
+        _listener = logging.handlers.QueueListener(
+            file_attente, gestionnaire_fichier, console, respect_handler_level=True
+        )
+        _listener.start()
+
+def stop_logging():
+    """
+    Vide la file, arrête le thread d'écriture et ferme le fichier du journal.
+
+    Appelé à l'arrêt du processus; `setup_logging` peut ensuite reconfigurer la journalisation.
+    """
+    global _listener
+    with _verrou:
+        if _listener is None:
+            return
+        _listener.stop()
+        racine = logging.getLogger()
+        for gestionnaire in list(racine.handlers):
+            if isinstance(gestionnaire, _QueueHandler):
+                racine.removeHandler(gestionnaire)
+        for gestionnaire in _listener.handlers:
+            gestionnaire.close()
+        _listener = None
+
+# Vider la file à l'arrêt du processus
+atexit.register(stop_logging)
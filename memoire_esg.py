@@ -0,0 +1,228 @@
+"""
+Mémoire ESG - Institut d'Économie Durable
+Mode compact du catalogue (catégories, entiers 32 bits, chaînes internées, fiches à slots)
+et mesure de l'occupation mémoire par feuille, par structure, par métier et par session
+"""
+
+import logging
+import sys
+from collections.abc import Mapping
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("calculateur_esg.memoire")
+
+# Colonnes toujours stockées en catégories (valeurs répétées d'une feuille à l'autre)
+COLONNES_CATEGORIELLES = ('Métier', 'Secteur', 'Tags')
+# Les autres colonnes texte passent en catégories si leurs valeurs distinctes sont au plus cette proportion
+PROPORTION_CATEGORIES = 0.5
+
+# ----- MODE COMPACT -----
+def _intern(valeur):
+    return sys.intern(valeur) if type(valeur) is str else valeur
+
+def compact_sheet(df):
+    """
+    Retourne une version compacte d'une feuille (la feuille d'origine n'est pas modifiée).
+
+    - `Métier`, `Secteur`, `Tags` et les colonnes texte peu variées deviennent des catégories;
+    - les colonnes entières (salaires) passent en int32 si leurs valeurs le permettent;
+    - les autres textes sont internés: une valeur répétée n'est stockée qu'une fois.
+
+    Les chaînes sont internées avant la conversion en catégories, de sorte
+    qu'un même nom de métier est un seul objet dans toutes les feuilles.
+    """
+    colonnes = {}
+    for colonne in df.columns:
+        serie = df[colonne]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            colonnes[colonne] = serie
+        elif pd.api.types.is_integer_dtype(serie.dtype):
+            if len(serie) and np.iinfo(np.int32).min <= serie.min() and serie.max() <= np.iinfo(np.int32).max:
+                serie = serie.astype(np.int32)
+            colonnes[colonne] = serie
+        elif serie.dtype == object:
+            serie = serie.map(_intern)
+            if colonne in COLONNES_CATEGORIELLES or serie.nunique() <= PROPORTION_CATEGORIES * len(serie):
+                serie = serie.astype('category')
+            colonnes[colonne] = serie
+        else:
+            colonnes[colonne] = serie
+    return pd.DataFrame(colonnes, index=df.index)
+
+def compact_catalogue(data):
+    """Applique `compact_sheet` à toutes les feuilles du catalogue."""
+    return {cle: compact_sheet(df) for cle, df in data.items()}
+
+class FrozenRecord(Mapping):
+    """
+    Enregistrement immuable d'une feuille (ligne d'une fiche métier), à slots.
+
+    Toutes les lignes d'une même feuille partagent le dictionnaire des
+    positions des colonnes; chaque ligne ne stocke que le tuple de ses valeurs.
+    S'utilise comme un dictionnaire en lecture seule.
+    """
+
+    __slots__ = ('_positions', '_valeurs')
+
+    def __init__(self, positions, valeurs):
+        self._positions = positions
+        self._valeurs = valeurs
+
+    def __getitem__(self, cle):
+        return self._valeurs[self._positions[cle]]
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, cle):
+        return cle in self._positions
+
+    def __repr__(self):
+        return f"FrozenRecord({dict(self)!r})"
+
+class RecordFreezer:
+    """
+    Convertit des DataFrames en tuples de `FrozenRecord`, en mutualisant ce qui se répète.
+
+    Une instance sert pour toute la construction des fiches: les lignes de
+    même structure partagent un seul dictionnaire de positions, et une valeur
+    répétée (texte, salaire...) n'est stockée qu'une fois.
+    """
+
+    def __init__(self, convertir):
+        """
+        Args:
+            convertir: Conversion de chaque valeur (types numpy -> types Python)
+        """
+        self.convertir = convertir
+        self._positions = {}
+        self._valeurs = {}
+
+    def _unique(self, valeur):
+        valeur = self.convertir(valeur)
+        # Textes et entiers seulement: les flottants (NaN, 0.0 et -0.0) sont gardés tels quels
+        if type(valeur) is str or type(valeur) is int:
+            return self._valeurs.setdefault(valeur, valeur)
+        return valeur
+
+    def __call__(self, df):
+        colonnes = tuple(df.columns)
+        positions = self._positions.get(colonnes)
+        if positions is None:
+            positions = self._positions[colonnes] = {colonne: position for position, colonne in enumerate(colonnes)}
+        return tuple(FrozenRecord(positions, tuple(self._unique(valeur) for valeur in ligne))
+                     for ligne in df.itertuples(index=False, name=None))
+
+# ----- MESURE DE L'OCCUPATION MÉMOIRE -----
+# Structures dérivées d'une version du catalogue: nom dans le rapport -> attribut de `Catalogue`
+STRUCTURES_MESUREES = {
+    'competences_longues': 'competences',
+    'index_tags': 'index',
+    'index_texte': 'texte',
+    'similarite': 'similarite',
+    'fiches': 'bundles'
+}
+
+def _array_size(valeurs, vus):
+    """Taille d'un tableau de colonne: données, plus les objets Python référencés (comptés une fois)."""
+    if isinstance(valeurs, pd.Categorical):
+        return _array_size(valeurs.codes, vus) + _array_size(np.asarray(valeurs.categories), vus)
+    valeurs = np.asarray(valeurs)
+    taille = valeurs.nbytes
+    if valeurs.dtype == object:
+        taille += sum(deep_size(valeur, vus) for valeur in valeurs.tolist())
+    return taille
+
+def frame_size(df, vus):
+    """Taille d'un DataFrame: colonnes et index, sans recompter les objets déjà vus."""
+    # sys.getsizeof d'un DataFrame mesure déjà son contenu (memory_usage): seules les colonnes sont comptées
+    vus.add(id(df))
+    taille = 0
+    for colonne in df.columns:
+        taille += _array_size(df[colonne].array, vus)
+    if not isinstance(df.index, pd.RangeIndex):
+        taille += _array_size(np.asarray(df.index), vus)
+    return taille
+
+def deep_size(objet, vus):
+    """
+    Taille d'un objet et de tout ce qu'il référence (dictionnaires, séquences,
+    tableaux numpy, DataFrames, enregistrements), chaque objet n'étant compté
+    qu'une fois grâce à `vus` (ensemble d'identifiants partagé entre les mesures).
+    """
+    taille = 0
+    a_visiter = [objet]
+    while a_visiter:
+        courant = a_visiter.pop()
+        if id(courant) in vus:
+            continue
+        vus.add(id(courant))
+        if isinstance(courant, pd.DataFrame):
+            taille += frame_size(courant, vus)
+            continue
+        if isinstance(courant, pd.Series):
+            taille += _array_size(courant.array, vus)
+            continue
+        if isinstance(courant, np.ndarray):
+            taille += _array_size(courant, vus)
+            continue
+        taille += sys.getsizeof(courant)
+        if isinstance(courant, MappingProxyType):
+            # Le dictionnaire enveloppé n'est pas accessible: sa taille est celle d'une copie
+            taille += sys.getsizeof(dict(courant))
+        if isinstance(courant, FrozenRecord):
+            a_visiter.extend((courant._positions, courant._valeurs))
+        elif isinstance(courant, Mapping):
+            for cle, valeur in courant.items():
+                a_visiter.append(cle)
+                a_visiter.append(valeur)
+        elif isinstance(courant, (list, tuple, set, frozenset)):
+            a_visiter.extend(courant)
+        elif hasattr(courant, '__dict__') and not isinstance(courant, type):
+            a_visiter.append(vars(courant))
+    return taille
+
+def session_size(etat, partages=None):
+    """
+    Occupation mémoire propre à une session: les objets qu'elle partage avec le
+    catalogue (`partages`, par exemple l'index des tags) ne sont pas comptés.
+    """
+    vus = set()
+    if partages is not None:
+        deep_size(partages, vus)
+    return deep_size(etat, vus)
+
+def memory_report(catalogue):
+    """
+    Mesure l'occupation mémoire d'une version du catalogue.
+
+    Les objets partagés (noms de métiers internés, feuilles reprises dans les
+    fiches...) sont comptés une seule fois, dans la première structure
+    mesurée: les feuilles, puis les structures dérivées.
+
+    Returns:
+        dict: octets et octets par métier, pour chaque feuille, chaque structure et au total
+    """
+    nb_metiers = max(1, len(catalogue.bundles))
+    vus = set()
+
+    def ligne(octets):
+        return {'octets': int(octets), 'octets_par_metier': round(octets / nb_metiers, 1)}
+
+    feuilles = {cle: ligne(frame_size(df, vus)) for cle, df in catalogue.data.items()}
+    structures = {nom: ligne(deep_size(getattr(catalogue, attribut), vus))
+                  for nom, attribut in STRUCTURES_MESUREES.items()}
+    total = sum(mesure['octets'] for mesure in [*feuilles.values(), *structures.values()])
+    return {
+        'mode': 'compact' if getattr(catalogue, 'compact', False) else 'normal',
+        'metiers': len(catalogue.bundles),
+        'feuilles': feuilles,
+        'structures': structures,
+        'total': ligne(total)
+    }
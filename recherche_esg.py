@@ -0,0 +1,561 @@
+"""
+Recherche ESG - Institut d'Économie Durable
+Index inversé tag -> métiers et calcul vectorisé des correspondances
+"""
+
+import bisect
+import logging
+import math
+import re
+import sys
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("calculateur_esg.recherche")
+
+SECTEUR_PAR_DEFAUT = 'Non spécifié'
+DESCRIPTION_PAR_DEFAUT = 'Information non disponible'
+
+# Nombre de métiers proposés par défaut selon le cas de repli
+NB_FALLBACK_SANS_TAGS = 5
+NB_FALLBACK_SANS_CORRESPONDANCE = 3
+
+# Classements disponibles: nombre de tags en commun (historique) ou pondération par rareté
+MODES_CLASSEMENT = ('comptage', 'tfidf', 'bm25')
+CLASSEMENT_PAR_DEFAUT = 'comptage'
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Poids des mots des descriptions par rapport aux tags (classements pondérés uniquement)
+POIDS_DESCRIPTION = 0.3
+
+MOTS_VIDES = frozenset({
+    'les', 'des', 'une', 'pour', 'dans', 'sur', 'aux', 'par', 'avec', 'est', 'son', 'ses', 'leur',
+    'leurs', 'qui', 'que', 'plus', 'ces', 'cette', 'entre', 'sont', 'the', 'and'
+})
+
+def split_tags(tags_str):
+    """Découpe une chaîne de tags séparés par des virgules."""
+    return [tag.strip() for tag in tags_str.split(',')]
+
+def normalize_text(texte):
+    """Met un texte en minuscules et retire les accents ('Économie' -> 'economie')."""
+    decompose = unicodedata.normalize('NFKD', texte.casefold())
+    return ''.join(c for c in decompose if not unicodedata.combining(c))
+
+def tokenize(texte):
+    """Découpe un texte en mots normalisés, sans mots vides ni mots de moins de 3 lettres."""
+    return [mot for mot in re.findall(r'\w+', normalize_text(texte)) if len(mot) >= 3 and mot not in MOTS_VIDES]
+
+def _bm25_weights(tf, longueurs, nb_documents, longueur_moyenne):
+    """Poids BM25 d'un terme pour les documents qui le contiennent (fréquences `tf`)."""
+    idf = math.log(1 + (nb_documents - len(tf) + 0.5) / (len(tf) + 0.5))
+    normalisation = BM25_K1 * (1 - BM25_B + BM25_B * longueurs / max(longueur_moyenne, 1e-9))
+    return (idf * tf * (BM25_K1 + 1) / (tf + normalisation)).astype(np.float32)
+
+def build_weights(postings, longueurs):
+    """
+    Précalcule, pour chaque tag, le poids TF-IDF et BM25 de chaque métier qui le porte.
+
+    Les poids sont alignés sur les positions de `postings`: le score d'une
+    sélection est la somme des poids de ses tags (np.bincount pondéré).
+
+    Returns:
+        dict: {'tfidf': {tag: poids}, 'bm25': {tag: poids}}
+    """
+    nb_documents = len(longueurs)
+    longueurs = np.asarray(longueurs, dtype=np.float32)
+    idf = {tag: math.log((1 + nb_documents) / (1 + len(positions))) + 1 for tag, positions in postings.items()}
+    # Norme L2 du vecteur TF-IDF de chaque métier (un tag vaut au plus 1 en fréquence)
+    normes = np.zeros(nb_documents, dtype=np.float64)
+    for tag, positions in postings.items():
+        normes[positions] += idf[tag] ** 2
+    normes = np.sqrt(np.maximum(normes, 1e-12))
+    longueur_moyenne = float(longueurs.mean()) if nb_documents else 0.0
+    return {
+        'tfidf': {tag: (idf[tag] / normes[positions]).astype(np.float32) for tag, positions in postings.items()},
+        'bm25': {tag: _bm25_weights(np.ones(len(positions), dtype=np.float32), longueurs[positions],
+                                    nb_documents, longueur_moyenne)
+                 for tag, positions in postings.items()}
+    }
+
+def build_text_postings(textes):
+    """
+    Construit l'index des mots des descriptions, avec leur poids BM25 par métier.
+
+    Returns:
+        dict: mot -> (positions des métiers en int32, poids en float32)
+    """
+    frequences = {}
+    longueurs = np.zeros(len(textes), dtype=np.float32)
+    for position, texte in enumerate(textes):
+        if not isinstance(texte, str):
+            continue
+        mots = tokenize(texte)
+        longueurs[position] = len(mots)
+        for mot in mots:
+            par_metier = frequences.setdefault(mot, {})
+            par_metier[position] = par_metier.get(position, 0) + 1
+    longueur_moyenne = float(longueurs[longueurs > 0].mean()) if (longueurs > 0).any() else 0.0
+    index_texte = {}
+    for mot, par_metier in frequences.items():
+        positions = np.fromiter(par_metier.keys(), dtype=np.int32, count=len(par_metier))
+        tf = np.fromiter(par_metier.values(), dtype=np.float32, count=len(par_metier))
+        index_texte[mot] = (positions, _bm25_weights(tf, longueurs[positions], len(textes), longueur_moyenne))
+    return index_texte
+
+# ----- CONSTRUCTION DE L'INDEX -----
+def build_tag_index(df_metiers, df_salaire):
+    """
+    Construit l'index inversé des tags à partir des feuilles métier et salaire.
+
+    L'index est calculé une seule fois au chargement du catalogue: chaque tag
+    pointe vers le tableau des positions des métiers qui le portent, et le
+    secteur de chaque métier est résolu à l'avance depuis la table des salaires.
+
+    Args:
+        df_metiers: DataFrame de la feuille métier
+        df_salaire: DataFrame de la feuille salaire
+
+    Returns:
+        dict: Index prêt pour `match_metiers`
+    """
+    # Secteur de chaque métier: première ligne correspondante de la table des salaires
+    secteur_par_metier = {}
+    fallback = []
+    if not df_salaire.empty and 'Métier' in df_salaire.columns:
+        if 'Secteur' in df_salaire.columns:
+            premieres = df_salaire.drop_duplicates(subset='Métier', keep='first')
+            secteur_par_metier = dict(zip(premieres['Métier'], premieres['Secteur']))
+        # Lignes de repli, dans l'ordre de la table des salaires
+        for _, row in df_salaire.head(NB_FALLBACK_SANS_TAGS).iterrows():
+            fallback.append((
+                row['Métier'],
+                row['Secteur'] if 'Secteur' in row else SECTEUR_PAR_DEFAUT,
+                row['Description'] if 'Description' in row else None
+            ))
+
+    # Texte indexé pour les classements pondérés: description de la feuille métier, sinon celle des salaires
+    description_par_metier = {}
+    if 'Description' in df_salaire.columns and 'Métier' in df_salaire.columns:
+        premieres = df_salaire.drop_duplicates(subset='Métier', keep='first')
+        description_par_metier = dict(zip(premieres['Métier'], premieres['Description']))
+
+    noms, secteurs, descriptions, tags_metiers, textes = [], [], [], [], []
+    positions_par_tag = {}
+    position_par_metier = {}
+    if not df_metiers.empty and 'Tags' in df_metiers.columns:
+        valeurs_description = (df_metiers['Description'].tolist() if 'Description' in df_metiers.columns
+                               else [DESCRIPTION_PAR_DEFAUT] * len(df_metiers))
+        for nom, tags_str, description in zip(df_metiers['Métier'], df_metiers['Tags'], valeurs_description):
+            # Ignorer les lignes sans tags exploitables
+            if not isinstance(tags_str, str):
+                continue
+            position = len(noms)
+            # Un nom présent sur plusieurs lignes garde sa première ligne: c'est elle
+            # qui fournit le secteur, la description et les tags affichés (`resolve_metiers`)
+            position_par_metier.setdefault(nom, position)
+            # Un même tag est un seul objet pour tous les métiers qui le portent
+            metier_tags = [sys.intern(tag) for tag in split_tags(tags_str)]
+            noms.append(nom)
+            secteurs.append(secteur_par_metier.get(nom, SECTEUR_PAR_DEFAUT))
+            descriptions.append(description)
+            tags_metiers.append(tuple(metier_tags))
+            textes.append(description if isinstance(description, str) and description != DESCRIPTION_PAR_DEFAUT
+                          else description_par_metier.get(nom))
+            for tag in set(metier_tags):
+                positions_par_tag.setdefault(tag, []).append(position)
+
+    postings = {tag: np.asarray(positions, dtype=np.int32) for tag, positions in positions_par_tag.items()}
+    index = {
+        'tags': sorted(positions_par_tag),
+        'postings': postings,
+        'poids': build_weights(postings, [len(set(tags)) for tags in tags_metiers]),
+        'postings_texte': build_text_postings(textes),
+        'metiers': noms,
+        'secteurs': secteurs,
+        'descriptions': descriptions,
+        'tags_metiers': tags_metiers,
+        'position_par_metier': position_par_metier,
+        'secteur_par_metier': secteur_par_metier,
+        'fallback': fallback,
+        'has_metiers': not df_metiers.empty
+    }
+    logger.info(f"Index des tags construit: {len(noms)} métiers, {len(index['tags'])} tags")
+    return index
+
+# ----- CALCUL DES CORRESPONDANCES -----
+def _fallback_refs(index, limite):
+    """Références de repli: les premières lignes de la table des salaires, score arbitraire."""
+    return [(nom, 1, None) for nom, _, _ in index['fallback'][:limite]]
+
+def rank_metiers(index, selected_tags, mode=CLASSEMENT_PAR_DEFAUT, limite=None, avec_description=False):
+    """
+    Classe les métiers correspondant aux tags sélectionnés.
+
+    En mode 'comptage', le score est le nombre de tags en commun. En modes
+    'tfidf' et 'bm25', chaque tag pèse selon sa rareté dans le catalogue (les
+    poids sont précalculés dans l'index), et les mots des tags peuvent aussi
+    être cherchés dans les descriptions. Avec `limite`, seuls les meilleurs
+    sont sélectionnés (sélection partielle, sans tri complet). À score égal,
+    l'ordre de la feuille métier est conservé.
+
+    Returns:
+        tuple: (positions des métiers classés, scores, nombre de tags en commun)
+    """
+    if mode not in MODES_CLASSEMENT:
+        raise ValueError(f"Classement inconnu: {mode} (attendu: {', '.join(MODES_CLASSEMENT)})")
+    tags = [tag for tag in dict.fromkeys(selected_tags) if tag in index['postings']]
+    nb_metiers = len(index['metiers'])
+    postings = [index['postings'][tag] for tag in tags]
+    if mode == 'comptage':
+        if not postings:
+            vide = np.empty(0, dtype=np.intp)
+            return vide, vide, vide
+        scores = np.bincount(np.concatenate(postings), minlength=nb_metiers)
+        communs = scores
+    else:
+        positions = list(postings)
+        poids = [index['poids'][mode][tag] for tag in tags]
+        if avec_description:
+            for mot in dict.fromkeys(mot for tag in selected_tags for mot in tokenize(tag)):
+                if mot in index['postings_texte']:
+                    positions_mot, poids_mot = index['postings_texte'][mot]
+                    positions.append(positions_mot)
+                    poids.append(poids_mot * POIDS_DESCRIPTION)
+        if not positions:
+            vide = np.empty(0, dtype=np.intp)
+            return vide, np.empty(0, dtype=np.float32), vide
+        scores = np.bincount(np.concatenate(positions), weights=np.concatenate(poids), minlength=nb_metiers)
+        communs = (np.bincount(np.concatenate(postings), minlength=nb_metiers) if postings
+                   else np.zeros(nb_metiers, dtype=np.intp))
+
+    if limite is not None:
+        ordre = top_k_positions(scores, limite)
+    else:
+        candidats = np.flatnonzero(scores > 0)
+        ordre = candidats[np.lexsort((candidats, -scores[candidats]))]
+    return ordre, scores[ordre], communs[ordre]
+
+def match_metier_refs(index, selected_tags, mode=CLASSEMENT_PAR_DEFAUT, limite=None, avec_description=False):
+    """
+    Retourne les références des métiers correspondant aux tags sélectionnés, triées par score décroissant.
+
+    Une référence ne contient que le nom du métier (objet partagé avec l'index)
+    et ses scores: c'est ce qu'une session conserve. Les champs d'affichage sont
+    retrouvés dans l'index au moment du rendu par `resolve_metiers`.
+
+    Si aucun tag n'est sélectionné ou si aucun métier ne correspond, les premières
+    lignes de la table des salaires sont proposées en repli (pertinence None).
+
+    Args:
+        mode: Classement ('comptage', 'tfidf' ou 'bm25'), voir `rank_metiers`
+        limite: Nombre maximal de métiers retournés (tous si None)
+        avec_description: Chercher aussi les mots des tags dans les descriptions (modes pondérés)
+
+    Returns:
+        list: Tuples (métier, nombre de tags en commun, pertinence)
+    """
+    if not index['has_metiers'] or not selected_tags:
+        if index['fallback']:
+            logger.info("Utilisation des données de salaire comme fallback pour les métiers")
+        return _fallback_refs(index, NB_FALLBACK_SANS_TAGS)
+
+    ordre, scores, communs = rank_metiers(index, selected_tags, mode, limite, avec_description)
+    refs = [(index['metiers'][position], int(nb_communs), round(float(score), 4))
+            for position, score, nb_communs in zip(ordre.tolist(), scores.tolist(), communs.tolist())]
+
+    if not refs and index['fallback']:
+        logger.info("Aucun métier correspondant aux tags, utilisation de données de fallback")
+        return _fallback_refs(index, NB_FALLBACK_SANS_CORRESPONDANCE)
+
+    return refs
+
+def resolve_metiers(index, refs, selected_tags=()):
+    """
+    Retrouve les champs d'affichage (secteur, description, tags) de références de métiers.
+
+    Un métier absent de l'index (version du catalogue plus récente) garde son
+    nom et ses scores, avec le secteur et la description par défaut. Un nom
+    présent sur plusieurs lignes de la feuille métier est résolu vers sa
+    première ligne.
+
+    Args:
+        refs: Références retournées par `match_metier_refs`
+        selected_tags: Tags de la recherche (description et tags des métiers de repli)
+    """
+    secteurs = index['secteur_par_metier']
+    repli = {nom: (secteur, description) for nom, secteur, description in index['fallback']}
+    if index['has_metiers'] and selected_tags:
+        description_repli = f"Métier en rapport avec les thématiques: {', '.join(selected_tags)}"
+        tags_repli = list(selected_tags)
+    else:
+        description_repli, tags_repli = DESCRIPTION_PAR_DEFAUT, []
+
+    metiers = []
+    for nom, match_score, pertinence in refs:
+        if pertinence is None:
+            secteur, description = repli.get(nom, (secteurs.get(nom, SECTEUR_PAR_DEFAUT), None))
+            metiers.append({
+                'Metier': nom,
+                'Secteur': secteur,
+                'Description': description if description is not None else description_repli,
+                'Tags': list(tags_repli),
+                'match_score': match_score
+            })
+            continue
+        position = index['position_par_metier'].get(nom)
+        metiers.append({
+            'Metier': nom,
+            'Secteur': index['secteurs'][position] if position is not None else secteurs.get(nom, SECTEUR_PAR_DEFAUT),
+            'Description': index['descriptions'][position] if position is not None else DESCRIPTION_PAR_DEFAUT,
+            'Tags': list(index['tags_metiers'][position]) if position is not None else [],
+            'match_score': match_score,
+            'pertinence': pertinence
+        })
+    return metiers
+
+def match_metiers(index, selected_tags, mode=CLASSEMENT_PAR_DEFAUT, limite=None, avec_description=False):
+    """
+    Retourne les métiers correspondant aux tags sélectionnés, triés par score décroissant,
+    avec leurs champs d'affichage (voir `match_metier_refs` et `resolve_metiers`).
+    """
+    refs = match_metier_refs(index, selected_tags, mode, limite, avec_description)
+    return resolve_metiers(index, refs, selected_tags)
+
+def build_tag_matrix(index, mode=CLASSEMENT_PAR_DEFAUT):
+    """
+    Construit la matrice tags x métiers à partir de l'index.
+
+    En mode 'comptage', la matrice vaut 1 si le métier porte le tag; sinon
+    elle contient les poids précalculés du classement. Le score d'un profil
+    (vecteur binaire de ses tags) pour chaque métier est alors un simple
+    produit matriciel, identique au score de `rank_metiers` (sans les descriptions).
+
+    Returns:
+        dict: 'matrice' (float32, tags x métiers) et 'colonnes' (tag -> ligne de la matrice)
+    """
+    tags = index['tags']
+    matrice = np.zeros((len(tags), len(index['metiers'])), dtype=np.float32)
+    for ligne, tag in enumerate(tags):
+        matrice[ligne, index['postings'][tag]] = 1.0 if mode == 'comptage' else index['poids'][mode][tag]
+    return {'matrice': matrice, 'colonnes': {tag: ligne for ligne, tag in enumerate(tags)}}
+
+def encode_profiles(matrice_tags, profils):
+    """
+    Encode des listes de tags en vecteurs binaires (profils x tags).
+
+    Returns:
+        tuple: (matrice des profils en float32, nombre de tags inconnus du catalogue)
+    """
+    colonnes = matrice_tags['colonnes']
+    vecteurs = np.zeros((len(profils), len(colonnes)), dtype=np.float32)
+    inconnus = 0
+    for ligne, tags in enumerate(profils):
+        for tag in tags:
+            colonne = colonnes.get(tag)
+            if colonne is None:
+                inconnus += 1
+            else:
+                vecteurs[ligne, colonne] = 1.0
+    return vecteurs, inconnus
+
+def top_k_positions(scores, k):
+    """
+    Retourne les positions des k meilleurs scores strictement positifs, par score décroissant.
+
+    La sélection est partielle (np.partition) au lieu d'un tri complet; à score
+    égal, l'ordre de la feuille métier est conservé, comme dans `rank_metiers`.
+    """
+    n = len(scores)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        seuil = max(np.partition(scores, n - k)[n - k], 0)
+        superieurs = np.flatnonzero(scores > seuil)
+        if seuil > 0:
+            egaux = np.flatnonzero(scores == seuil)[:k - len(superieurs)]
+            superieurs = np.concatenate([superieurs, egaux])
+    else:
+        superieurs = np.flatnonzero(scores > 0)
+    # Tri des seuls candidats: score décroissant, puis position croissante
+    return superieurs[np.lexsort((superieurs, -scores[superieurs]))]
+
+def score_profiles(matrice_tags, vecteurs, k, memoire_max=64 * 1024 * 1024):
+    """
+    Calcule les k meilleurs métiers de chaque profil par produit matriciel.
+
+    Les profils sont traités par paquets pour que la matrice des scores
+    (profils x métiers) ne dépasse pas `memoire_max` octets.
+
+    Returns:
+        list: Pour chaque profil, tuple (positions des métiers, scores)
+    """
+    matrice = matrice_tags['matrice']
+    taille_paquet = max(1, memoire_max // max(1, matrice.shape[1] * matrice.itemsize))
+    resultats = []
+    for debut in range(0, len(vecteurs), taille_paquet):
+        scores = vecteurs[debut:debut + taille_paquet] @ matrice
+        for ligne in scores:
+            positions = top_k_positions(ligne, k)
+            resultats.append((positions, ligne[positions]))
+    return resultats
+
+# ----- RECHERCHE PLEIN TEXTE -----
+# Champs indexés: (libellé affiché, poids dans le score)
+CHAMPS_TEXTE = {
+    'metier': ('Métier', 3.0),
+    'tags': ('Tags', 2.0),
+    'competences': ('Compétences', 1.5),
+    'formations': ('Formations', 1.0)
+}
+COLONNES_FORMATIONS_TEXTE = ('Programme_Principal', 'Programme_Secondaire', 'Modules_Clés')
+# Un mot de la requête trouvé seulement comme début d'un mot indexé compte moitié moins
+POIDS_PREFIXE = 0.5
+NB_EXPANSIONS_PREFIXE = 64
+NB_RESULTATS_TEXTE = 10
+
+def _text_columns(df, colonnes):
+    return [colonne for colonne in colonnes if colonne in df.columns]
+
+def _sheet_texts(df, colonnes):
+    """Concatène, par métier, le texte des colonnes d'une feuille."""
+    if df.empty or 'Métier' not in df.columns or not colonnes:
+        return {}
+    textes = {}
+    for ligne in df[['Métier'] + colonnes].itertuples(index=False, name=None):
+        morceaux = [valeur for valeur in ligne[1:] if isinstance(valeur, str)]
+        if morceaux:
+            textes.setdefault(ligne[0], []).extend(morceaux)
+    return {metier: ' '.join(morceaux) for metier, morceaux in textes.items()}
+
+def build_text_index(data, competences):
+    """
+    Construit l'index plein texte des métiers (noms, tags, compétences et formations).
+
+    Les mots sont normalisés (minuscules, sans accents). Le vocabulaire est
+    trié pour la recherche par préfixe (bisect); chaque mot pointe vers les
+    positions des métiers qui le contiennent, avec un poids (champs où il
+    apparaît, rareté) et le masque de ces champs.
+
+    Args:
+        competences: Compétences au format long (colonnes 'Métier' et 'Compétence'),
+            table de `catalogue_esg.normalize_competences`
+
+    Returns:
+        dict: Index prêt pour `search_text`
+    """
+    df_metiers = data.get('metiers', pd.DataFrame())
+    noms = df_metiers['Métier'].tolist() if 'Métier' in df_metiers.columns else []
+    sources = {
+        'metier': dict(zip(noms, noms)),
+        'tags': _sheet_texts(df_metiers, _text_columns(df_metiers, ('Tags',))),
+        'competences': _sheet_texts(competences, ['Compétence']),
+        'formations': _sheet_texts(data.get('formations', pd.DataFrame()),
+                                   _text_columns(data.get('formations', pd.DataFrame()), COLONNES_FORMATIONS_TEXTE))
+    }
+    bits = {champ: 1 << rang for rang, champ in enumerate(CHAMPS_TEXTE)}
+
+    # mot -> {position: masque des champs}
+    occurrences = {}
+    for position, nom in enumerate(noms):
+        for champ, textes in sources.items():
+            texte = textes.get(nom)
+            if not isinstance(texte, str):
+                continue
+            for mot in set(tokenize(texte)):
+                par_metier = occurrences.setdefault(mot, {})
+                par_metier[position] = par_metier.get(position, 0) | bits[champ]
+
+    poids_par_masque = np.zeros(1 << len(CHAMPS_TEXTE), dtype=np.float32)
+    for masque in range(len(poids_par_masque)):
+        poids_par_masque[masque] = sum(poids for champ, (_, poids) in CHAMPS_TEXTE.items() if masque & bits[champ])
+
+    vocabulaire = sorted(occurrences)
+    postings, poids, masques = [], [], []
+    for mot in vocabulaire:
+        par_metier = occurrences[mot]
+        positions = np.fromiter(sorted(par_metier), dtype=np.int32, count=len(par_metier))
+        masque = np.fromiter((par_metier[position] for position in positions.tolist()), dtype=np.uint8,
+                             count=len(positions))
+        idf = math.log(1 + len(noms) / len(positions))
+        postings.append(positions)
+        masques.append(masque)
+        poids.append(poids_par_masque[masque] * np.float32(idf))
+
+    logger.info(f"Index plein texte construit: {len(noms)} métiers, {len(vocabulaire)} mots")
+    return {
+        'vocabulaire': vocabulaire,
+        'postings': postings,
+        'poids': poids,
+        'masques': masques,
+        'metiers': noms,
+        'champs': [libelle for libelle, _ in CHAMPS_TEXTE.values()]
+    }
+
+def expand_term(index_texte, mot):
+    """
+    Retourne les mots du vocabulaire correspondant à un mot de la requête.
+
+    Returns:
+        list: (rang du mot dans le vocabulaire, poids relatif), le mot exact d'abord
+    """
+    vocabulaire = index_texte['vocabulaire']
+    debut = bisect.bisect_left(vocabulaire, mot)
+    fin = bisect.bisect_left(vocabulaire, mot + '\uffff', lo=debut)
+    termes = []
+    for rang in range(debut, min(fin, debut + NB_EXPANSIONS_PREFIXE)):
+        termes.append((rang, 1.0 if vocabulaire[rang] == mot else POIDS_PREFIXE))
+    return termes
+
+def search_text(index_texte, requete, limite=NB_RESULTATS_TEXTE):
+    """
+    Cherche les métiers correspondant à une requête libre ('reporting CSRD', 'bilan carb').
+
+    Chaque mot de la requête est cherché tel quel et comme début de mot. Les
+    métiers qui contiennent le plus de mots de la requête passent en premier,
+    puis par score (champs et rareté des mots trouvés).
+
+    Returns:
+        list: Dictionnaires 'Metier', 'score', 'champs' (champs où la requête a été trouvée) et 'termes'
+    """
+    mots = list(dict.fromkeys(mot for mot in re.findall(r'\w+', normalize_text(requete)) if len(mot) >= 2))
+    nb_metiers = len(index_texte['metiers'])
+    if not mots or not nb_metiers:
+        return []
+
+    scores = np.zeros(nb_metiers, dtype=np.float64)
+    couverture = np.zeros(nb_metiers, dtype=np.int32)
+    termes_par_mot = []
+    for mot in mots:
+        termes = expand_term(index_texte, mot)
+        termes_par_mot.append(termes)
+        if not termes:
+            continue
+        positions = np.concatenate([index_texte['postings'][rang] for rang, _ in termes])
+        poids = np.concatenate([index_texte['poids'][rang] * facteur for rang, facteur in termes])
+        scores += np.bincount(positions, weights=poids, minlength=nb_metiers)
+        couverture += np.bincount(positions, minlength=nb_metiers) > 0
+
+    # Sélection partielle sur une clé combinée: nombre de mots trouvés, puis score
+    ordre = top_k_positions(couverture * (scores.max() + 1) + scores, limite)
+
+    resultats = []
+    for position in ordre.tolist():
+        masque, termes_trouves = 0, []
+        for termes in termes_par_mot:
+            for rang, _ in termes:
+                postings = index_texte['postings'][rang]
+                i = np.searchsorted(postings, position)
+                if i < len(postings) and postings[i] == position:
+                    masque |= int(index_texte['masques'][rang][i])
+                    termes_trouves.append(index_texte['vocabulaire'][rang])
+        resultats.append({
+            'Metier': index_texte['metiers'][position],
+            'score': round(float(scores[position]), 4),
+            'mots_trouves': int(couverture[position]),
+            'champs': [libelle for rang, libelle in enumerate(index_texte['champs']) if masque & (1 << rang)],
+            'termes': termes_trouves
+        })
+    return resultats
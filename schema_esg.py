@@ -0,0 +1,124 @@
+"""
+Schéma ESG - Institut d'Économie Durable
+Noms de colonnes et types canoniques des feuilles du catalogue, appliqués une seule fois au chargement
+"""
+
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger("calculateur_esg.schema")
+
+class SchemaError(ValueError):
+    """Feuille du catalogue à laquelle il manque une colonne obligatoire."""
+
+# Variantes d'écriture acceptées dans le classeur, par nom canonique
+ALIAS_COMMUNS = {
+    'Métier': ('Metier', 'métier', 'metier')
+}
+ALIAS_COLONNES = {
+    'metiers': {
+        'Types_entreprises': ('Types_Entreprises',)
+    },
+    'salaire': {
+        'Expérience': ('Experience', 'expérience', 'experience'),
+        'Salaire_Min': ('Salaire_min',),
+        'Salaire_Max': ('Salaire_max',),
+        'Salaire_Moyen': ('Salaire_moyen',)
+    },
+    'competences': {},
+    'formations': {
+        'Modules_Clés': ('Modules_Cles',),
+        'Durée_Formation': ('Duree_Formation',),
+        'Prérequis': ('Prerequis',)
+    },
+    'tendances': {
+        'Demande_Marché': ('Demande_Marche',)
+    }
+}
+
+# Colonnes sans lesquelles une feuille est inutilisable
+COLONNES_OBLIGATOIRES = {
+    'metiers': ('Métier', 'Tags'),
+    'salaire': ('Métier',),
+    'competences': ('Métier',),
+    'formations': ('Métier',),
+    'tendances': ('Métier',)
+}
+
+# Colonnes numériques (les valeurs non numériques deviennent NaN)
+COLONNES_NUMERIQUES = {
+    'salaire': ('Salaire_Min', 'Salaire_Max', 'Salaire_Moyen')
+}
+
+# Colonnes affichées sous un autre nom, ajoutées si absentes: nom affiché -> colonne source
+COLONNES_DERIVEES = {
+    'formations': {
+        'Formation': 'Programme_Principal',
+        'Description': 'Modules_Clés',
+        'Durée': 'Durée_Formation',
+        'Niveau': 'Prérequis'
+    }
+}
+
+def _column_renames(cle, colonnes):
+    """Renommages des variantes d'écriture présentes vers les noms canoniques."""
+    renommage = {}
+    for canonique, variantes in {**ALIAS_COMMUNS, **ALIAS_COLONNES.get(cle, {})}.items():
+        if canonique in colonnes:
+            continue
+        for variante in variantes:
+            if variante in colonnes:
+                renommage[variante] = canonique
+                break
+    return renommage
+
+def canonicalize_sheet(cle, df):
+    """
+    Applique le schéma canonique à une feuille du catalogue.
+
+    Les colonnes sont renommées vers leur nom canonique, les noms de métiers
+    débarrassés des espaces superflus, les colonnes numériques converties et
+    les colonnes d'affichage dérivées ajoutées. La feuille d'origine n'est pas
+    modifiée. Appliquer le schéma à une feuille déjà canonique la laisse
+    inchangée.
+
+    Raises:
+        SchemaError: Si une colonne obligatoire est absente
+    """
+    df = df.rename(columns=_column_renames(cle, df.columns))
+    manquantes = [colonne for colonne in COLONNES_OBLIGATOIRES.get(cle, ()) if colonne not in df.columns]
+    if manquantes:
+        raise SchemaError(f"Feuille '{cle}': colonne(s) obligatoire(s) absente(s): {', '.join(manquantes)} "
+                          f"(colonnes trouvées: {', '.join(map(str, df.columns))})")
+
+    if df['Métier'].dtype == object:
+        df['Métier'] = df['Métier'].map(lambda nom: nom.strip() if isinstance(nom, str) else nom)
+    for colonne in COLONNES_NUMERIQUES.get(cle, ()):
+        if colonne in df.columns and not pd.api.types.is_numeric_dtype(df[colonne]):
+            valeurs = pd.to_numeric(df[colonne], errors='coerce')
+            invalides = int((valeurs.isna() & df[colonne].notna()).sum())
+            if invalides:
+                logger.warning(f"Feuille '{cle}': {invalides} valeur(s) non numérique(s) ignorée(s) "
+                               f"dans la colonne '{colonne}'")
+            df[colonne] = valeurs
+    for colonne, source in COLONNES_DERIVEES.get(cle, {}).items():
+        if colonne not in df.columns and source in df.columns:
+            df[colonne] = df[source]
+    return df
+
+def apply_schema(data):
+    """
+    Applique le schéma canonique à toutes les feuilles du catalogue.
+
+    Returns:
+        dict: Les feuilles canoniques, par clé interne
+
+    Raises:
+        SchemaError: Si une feuille n'a pas toutes ses colonnes obligatoires
+    """
+    return {cle: canonicalize_sheet(cle, df) for cle, df in data.items()}
+
+def empty_sheet(cle):
+    """Feuille vide ne contenant que les colonnes obligatoires."""
+    return pd.DataFrame(columns=list(COLONNES_OBLIGATOIRES.get(cle, ('Métier',))))
@@ -0,0 +1,187 @@
+"""
+Test de charge de l'API ESG - Institut d'Économie Durable
+Mesure le débit soutenu (requêtes/s) et la latence de l'API JSON, serveur limité à un cœur
+
+Usage:
+    python scripts/charge_api.py --duree 30 --clients 8
+    python scripts/charge_api.py --url http://127.0.0.1:8080 --proportion-etag 0.5
+
+Sans --url, l'API est lancée dans un processus séparé, épinglé sur un seul
+cœur (--coeur), et arrêtée à la fin du test. Chaque client est un processus
+qui garde une connexion HTTP/1.1 persistante et enchaîne les requêtes:
+correspondances (tags tirés au hasard), fiches métier et liste des tags.
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+from urllib.parse import quote, urlsplit
+
+import numpy as np
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+logger = logging.getLogger("calculateur_esg.charge_api")
+
+# Répartition des requêtes: correspondances, fiches métier, tags
+REPARTITION = (0.6, 0.35, 0.05)
+
+def get_json(connexion, chemin):
+    connexion.request('GET', chemin)
+    reponse = connexion.getresponse()
+    return json.loads(reponse.read())
+
+def build_paths(hote, port, nb, seed):
+    """Prépare les chemins des requêtes à partir des tags et métiers servis par l'API."""
+    connexion = http.client.HTTPConnection(hote, port, timeout=30)
+    tags = get_json(connexion, '/api/tags')['tags']
+    rng = random.Random(seed)
+    metiers = set()
+    for _ in range(20):
+        selection = rng.sample(tags, min(len(tags), 3))
+        resultat = get_json(connexion, f"/api/correspondances?tags={quote(','.join(selection))}&limite=100")
+        metiers.update(metier['Metier'] for metier in resultat['metiers'])
+    connexion.close()
+    metiers = sorted(metiers)
+
+    chemins = []
+    for _ in range(nb):
+        tirage = rng.random()
+        if tirage < REPARTITION[0] or not metiers:
+            selection = rng.sample(tags, rng.randint(1, min(len(tags), 5)))
+            chemins.append(f"/api/correspondances?tags={quote(','.join(selection))}&limite=10")
+        elif tirage < REPARTITION[0] + REPARTITION[1]:
+            chemins.append(f"/api/metiers/{quote(rng.choice(metiers))}")
+        else:
+            chemins.append('/api/tags')
+    return chemins
+
+def run_client(hote, port, chemins, duree, proportion_etag, seed, file_resultats):
+    """Boucle d'un client: enchaîne les requêtes pendant `duree` secondes sur une connexion persistante."""
+    rng = random.Random(seed)
+    etags = {}
+    latences = []
+    statuts = {}
+    connexion = http.client.HTTPConnection(hote, port, timeout=30)
+    fin = time.perf_counter() + duree
+    position = 0
+    while time.perf_counter() < fin:
+        chemin = chemins[position % len(chemins)]
+        position += 1
+        entetes = {}
+        if chemin in etags and rng.random() < proportion_etag:
+            entetes['If-None-Match'] = etags[chemin]
+        debut = time.perf_counter()
+        try:
+            connexion.request('GET', chemin, headers=entetes)
+            reponse = connexion.getresponse()
+            reponse.read()
+        except (OSError, http.client.HTTPException):
+            connexion.close()
+            connexion = http.client.HTTPConnection(hote, port, timeout=30)
+            statuts['erreur'] = statuts.get('erreur', 0) + 1
+            continue
+        latences.append(time.perf_counter() - debut)
+        statuts[reponse.status] = statuts.get(reponse.status, 0) + 1
+        if reponse.getheader('ETag'):
+            etags[chemin] = reponse.getheader('ETag')
+    connexion.close()
+    file_resultats.put((latences, statuts))
+
+def start_api(port, coeur):
+    """Lance l'API dans un processus séparé épinglé sur un cœur, et attend qu'elle réponde."""
+    def epingler():
+        if coeur is not None and hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, {coeur})
+
+    processus = subprocess.Popen([sys.executable, os.path.join(RACINE, 'api_esg.py'), '--port', str(port)],
+                                 cwd=RACINE, preexec_fn=epingler)
+    limite = time.monotonic() + 300
+    while time.monotonic() < limite:
+        if processus.poll() is not None:
+            raise RuntimeError(f"L'API s'est arrêtée au démarrage (code {processus.returncode})")
+        try:
+            connexion = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connexion.request('GET', '/api/sante')
+            connexion.getresponse().read()
+            connexion.close()
+            return processus
+        except OSError:
+            time.sleep(0.5)
+    processus.terminate()
+    raise RuntimeError("L'API n'a pas démarré à temps")
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de l'API ESG")
+    parser.add_argument('--url', help="Adresse d'une API déjà lancée (sinon lancée sur un cœur par le script)")
+    parser.add_argument('--port', type=int, default=8181, help="Port de l'API lancée par le script")
+    parser.add_argument('--coeur', type=int, default=0, help="Cœur sur lequel épingler l'API lancée par le script")
+    parser.add_argument('--clients', type=int, default=8, help="Nombre de clients simultanés")
+    parser.add_argument('--duree', type=float, default=20.0, help="Durée de la mesure (secondes)")
+    parser.add_argument('--proportion-etag', type=float, default=0.0,
+                        help="Proportion des requêtes répétées envoyées avec If-None-Match (0 à 1)")
+    parser.add_argument('--requetes', type=int, default=2000, help="Nombre de requêtes distinctes du scénario")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--sortie', help="Fichier JSON des résultats")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    processus = None
+    if args.url:
+        adresse = urlsplit(args.url)
+        hote, port = adresse.hostname, adresse.port or 80
+    else:
+        hote, port = '127.0.0.1', args.port
+        processus = start_api(port, args.coeur)
+        logger.info(f"API lancée (pid {processus.pid}) sur le cœur {args.coeur}")
+
+    try:
+        chemins = build_paths(hote, port, args.requetes, args.seed)
+        file_resultats = multiprocessing.Queue()
+        clients = [multiprocessing.Process(target=run_client,
+                                           args=(hote, port, chemins[i::args.clients] or chemins, args.duree,
+                                                 args.proportion_etag, args.seed + i, file_resultats))
+                   for i in range(args.clients)]
+        debut = time.perf_counter()
+        for client in clients:
+            client.start()
+        resultats = [file_resultats.get() for _ in clients]
+        duree = time.perf_counter() - debut
+        for client in clients:
+            client.join()
+    finally:
+        if processus is not None:
+            processus.terminate()
+            processus.wait()
+
+    latences = np.asarray([latence for latences_client, _ in resultats for latence in latences_client]) * 1000
+    statuts = {}
+    for _, statuts_client in resultats:
+        for statut, nombre in statuts_client.items():
+            statuts[str(statut)] = statuts.get(str(statut), 0) + nombre
+    synthese = {
+        'clients': args.clients,
+        'duree_s': round(duree, 2),
+        'requetes': int(len(latences)),
+        'requetes_par_seconde': round(len(latences) / duree, 1),
+        'p50_ms': round(float(np.percentile(latences, 50)), 3) if len(latences) else None,
+        'p90_ms': round(float(np.percentile(latences, 90)), 3) if len(latences) else None,
+        'p99_ms': round(float(np.percentile(latences, 99)), 3) if len(latences) else None,
+        'statuts': statuts,
+        'proportion_etag': args.proportion_etag,
+        'coeur': None if args.url else args.coeur
+    }
+    print(json.dumps(synthese, indent=2, ensure_ascii=False))
+    if args.sortie:
+        with open(args.sortie, 'w', encoding='utf-8') as f:
+            json.dump(synthese, f, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Hubspot factice - Institut d'Économie Durable
+Serveur HTTP local imitant l'API contacts de Hubspot (recherche, création, mise à jour et upsert), pour tester la synchronisation des leads
+
+Usage:
+    python scripts/hubspot_factice.py --port 8765 --taux-erreur 0.3
+
+Puis dans .streamlit/secrets.toml:
+    [hubspot]
+    api_key = "factice"
+    host = "http://127.0.0.1:8765"
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger("calculateur_esg.hubspot_factice")
+
+CHEMIN_CONTACTS = '/crm/v3/objects/contacts'
+
+class HubSpotFactice:
+    """Contacts en mémoire et paramètres d'injection de pannes."""
+
+    def __init__(self, taux_erreur=0.0, latence=0.0, statut_erreur=503):
+        self.taux_erreur = taux_erreur
+        self.latence = latence
+        self.statut_erreur = statut_erreur
+        self.contacts = {}  # id -> propriétés
+        self.appels = {}    # route -> nombre d'appels
+        self._ids = itertools.count(1)
+        self._verrou = threading.Lock()
+
+    def count(self, route):
+        with self._verrou:
+            self.appels[route] = self.appels.get(route, 0) + 1
+
+    def find_by_email(self, email):
+        with self._verrou:
+            for contact_id, proprietes in self.contacts.items():
+                if proprietes.get('email') == email:
+                    return contact_id
+        return None
+
+    def create(self, proprietes):
+        with self._verrou:
+            contact_id = str(next(self._ids))
+            self.contacts[contact_id] = dict(proprietes)
+        return contact_id
+
+    def update(self, contact_id, proprietes):
+        with self._verrou:
+            if contact_id not in self.contacts:
+                return False
+            self.contacts[contact_id].update(proprietes)
+        return True
+
+def _contact_json(contact_id, proprietes):
+    maintenant = datetime.now(timezone.utc).isoformat()
+    return {'id': contact_id, 'properties': proprietes, 'createdAt': maintenant,
+            'updatedAt': maintenant, 'archived': False}
+
+def make_handler(etat):
+    """Construit le gestionnaire HTTP lié à l'état du serveur factice."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+        def _send_json(self, statut, contenu):
+            corps = json.dumps(contenu).encode('utf-8')
+            self.send_response(statut)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(corps)))
+            self.end_headers()
+            self.wfile.write(corps)
+
+        def _read_json(self):
+            longueur = int(self.headers.get('Content-Length', 0))
+            return json.loads(self.rfile.read(longueur) or b'{}')
+
+        def _inject_failure(self):
+            """Simule la latence et les pannes du service."""
+            if etat.latence:
+                time.sleep(etat.latence)
+            if random.random() < etat.taux_erreur:
+                self._send_json(etat.statut_erreur, {'status': 'error', 'message': 'Panne simulée'})
+                return True
+            return False
+
+        def do_POST(self):
+            corps = self._read_json()
+            if self.path.startswith(CHEMIN_CONTACTS + '/search'):
+                etat.count('search')
+                if self._inject_failure():
+                    return
+                filtres = corps.get('filterGroups', [{}])[0].get('filters', [])
+                email = next((f.get('value') for f in filtres if f.get('propertyName') == 'email'), None)
+                contact_id = etat.find_by_email(email)
+                resultats = [_contact_json(contact_id, etat.contacts[contact_id])] if contact_id else []
+                self._send_json(200, {'total': len(resultats), 'results': resultats})
+            elif self.path.startswith(CHEMIN_CONTACTS + '/batch/upsert'):
+                etat.count('upsert')
+                if self._inject_failure():
+                    return
+                self._send_upsert(corps.get('inputs', []))
+            elif self.path.split('?')[0] == CHEMIN_CONTACTS:
+                etat.count('create')
+                if self._inject_failure():
+                    return
+                proprietes = corps.get('properties', {})
+                if etat.find_by_email(proprietes.get('email')):
+                    self._send_json(409, {'status': 'error', 'message': 'Contact already exists'})
+                    return
+                contact_id = etat.create(proprietes)
+                self._send_json(201, _contact_json(contact_id, proprietes))
+            else:
+                self._send_json(404, {'status': 'error', 'message': 'Not found'})
+
+        def _send_upsert(self, entrees):
+            """Crée ou met à jour chaque contact identifié par son email (réponse 207 si erreurs)."""
+            maintenant = datetime.now(timezone.utc).isoformat()
+            resultats, erreurs = [], []
+            for entree in entrees:
+                proprietes = entree.get('properties', {})
+                email = entree.get('id') or proprietes.get('email')
+                if entree.get('idProperty') != 'email' or not email or '@' not in email:
+                    erreurs.append({'status': 'error', 'category': 'VALIDATION_ERROR',
+                                    'message': f"Email invalide: {email}", 'context': {}})
+                    continue
+                contact_id = etat.find_by_email(email)
+                nouveau = contact_id is None
+                if nouveau:
+                    contact_id = etat.create(proprietes)
+                else:
+                    etat.update(contact_id, proprietes)
+                resultat = _contact_json(contact_id, etat.contacts[contact_id])
+                resultat['new'] = nouveau
+                resultats.append(resultat)
+            contenu = {'status': 'COMPLETE', 'results': resultats, 'startedAt': maintenant, 'completedAt': maintenant}
+            if erreurs:
+                contenu.update({'errors': erreurs, 'numErrors': len(erreurs)})
+            self._send_json(207 if erreurs else 200, contenu)
+
+        def do_PATCH(self):
+            correspondance = re.fullmatch(CHEMIN_CONTACTS + r'/(\w+)', self.path.split('?')[0])
+            if not correspondance:
+                self._send_json(404, {'status': 'error', 'message': 'Not found'})
+                return
+            etat.count('update')
+            if self._inject_failure():
+                return
+            contact_id = correspondance.group(1)
+            proprietes = self._read_json().get('properties', {})
+            if not etat.update(contact_id, proprietes):
+                self._send_json(404, {'status': 'error', 'message': 'Contact not found'})
+                return
+            self._send_json(200, _contact_json(contact_id, etat.contacts[contact_id]))
+
+    return Handler
+
+def start_server(port=0, **options):
+    """
+    Démarre le serveur factice dans un thread de fond.
+
+    Returns:
+        tuple: (serveur, état), l'adresse étant `http://127.0.0.1:<serveur.server_port>`
+    """
+    etat = HubSpotFactice(**options)
+    serveur = ThreadingHTTPServer(('127.0.0.1', port), make_handler(etat))
+    threading.Thread(target=serveur.serve_forever, name="hubspot-factice", daemon=True).start()
+    return serveur, etat
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur Hubspot factice pour tester la synchronisation des leads")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--taux-erreur', type=float, default=0.0, help="Proportion de requêtes en erreur (0 à 1)")
+    parser.add_argument('--statut-erreur', type=int, default=503, help="Code HTTP renvoyé lors d'une panne simulée")
+    parser.add_argument('--latence', type=float, default=0.0, help="Latence ajoutée à chaque requête (secondes)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    serveur, etat = start_server(args.port, taux_erreur=args.taux_erreur,
+                                 latence=args.latence, statut_erreur=args.statut_erreur)
+    logger.info(f"Hubspot factice à l'écoute sur http://127.0.0.1:{serveur.server_port}")
+    try:
+        while True:
+            time.sleep(10)
+            logger.info(f"Appels: {etat.appels} - contacts: {len(etat.contacts)}")
+    except KeyboardInterrupt:
+        serveur.shutdown()
@@ -0,0 +1,136 @@
+"""
+Rapport mémoire du catalogue ESG - Institut d'Économie Durable
+Occupation mémoire (octets par feuille, par structure et par métier) en mode normal et compact,
+et par session (métiers retenus stockés en entier ou en références), pour dimensionner les conteneurs
+
+Usage:
+    python scripts/rapport_memoire.py
+    python scripts/rapport_memoire.py --metiers 100000 --sortie memoire.json
+    python scripts/rapport_memoire.py --sessions 1000
+
+Sans --metiers, le catalogue mesuré est celui du classeur (--classeur);
+sinon un catalogue synthétique de la taille demandée est généré.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import time
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+import catalogue_esg
+import generateur_esg
+import memoire_esg
+import recherche_esg
+import schema_esg
+
+logger = logging.getLogger("calculateur_esg.rapport_memoire")
+
+MODES = ('normal', 'compact')
+# Tags sélectionnés par une session simulée
+NB_TAGS_SESSION = (1, 5)
+
+def measure_mode(data, compact, sessions=None):
+    """
+    Construit une version du catalogue et mesure son occupation mémoire
+    (et celle de sessions simulées si `sessions` = (nombre, métiers retenus, graine)).
+    """
+    gc.collect()
+    debut = time.perf_counter()
+    catalogue = catalogue_esg.Catalogue(data, compact=compact)
+    duree = time.perf_counter() - debut
+    rapport = catalogue.memory_report()
+    rapport['construction_s'] = round(duree, 2)
+    if sessions:
+        rapport['sessions'] = measure_sessions(catalogue, *sessions)
+    return rapport
+
+def measure_sessions(catalogue, nb_sessions, limite, seed):
+    """
+    Mesure les données utilisateur de sessions simulées (tags tirés au hasard),
+    les métiers retenus étant stockés en dictionnaires complets ou en références.
+    """
+    index = catalogue.index
+    tirage = random.Random(seed)
+    # Les objets de l'index (noms, secteurs, descriptions...) sont partagés par toutes les sessions
+    partages = set()
+    memoire_esg.deep_size(index, partages)
+    # Les objets d'une session ne sont jamais repris par une autre: un seul ensemble par variante.
+    # Les sessions restent en mémoire (comme des sessions simultanées) pour que leurs identifiants restent uniques
+    vus = {'complet': set(partages), 'references': set(partages)}
+    totaux = {'complet': 0, 'references': 0}
+    etats = []
+    for _ in range(nb_sessions):
+        tags = tirage.sample(index['tags'], min(len(index['tags']), tirage.randint(*NB_TAGS_SESSION)))
+        refs = tuple(recherche_esg.match_metier_refs(index, tags, mode=recherche_esg.CLASSEMENT_PAR_DEFAUT,
+                                                     limite=limite))
+        variantes = {'complet': recherche_esg.resolve_metiers(index, refs, tags), 'references': refs}
+        for variante, metiers_matches in variantes.items():
+            user_data = {'tags': tags, 'metiers_matches': metiers_matches}
+            etats.append(user_data)
+            totaux[variante] += memoire_esg.deep_size(user_data, vus[variante])
+    return {variante: {'octets': total, 'octets_par_session': round(total / max(1, nb_sessions), 1)}
+            for variante, total in totaux.items()}
+
+def format_octets(octets):
+    for unite in ('o', 'Ko', 'Mo', 'Go'):
+        if abs(octets) < 1024 or unite == 'Go':
+            return f"{octets:.0f} {unite}" if unite == 'o' else f"{octets:.1f} {unite}"
+        octets /= 1024
+
+def print_report(rapports):
+    """Affiche les rapports côte à côte: octets au total et par métier, pour chaque mode."""
+    lignes = [('feuilles', cle) for cle in rapports[0]['feuilles']] + \
+             [('structures', nom) for nom in rapports[0]['structures']] + [(None, 'total')]
+    entete = f"{'':<20}" + ''.join(f"{r['mode'] + ' (total)':>18}{'par métier':>14}" for r in rapports)
+    print(entete)
+    for section, nom in lignes:
+        mesures = [r[section][nom] if section else r[nom] for r in rapports]
+        print(f"{nom:<20}" + ''.join(f"{format_octets(m['octets']):>18}{format_octets(m['octets_par_metier']):>14}"
+                                     for m in mesures))
+
+def main():
+    parser = argparse.ArgumentParser(description="Rapport mémoire du catalogue ESG (modes normal et compact)")
+    parser.add_argument('--metiers', type=int, help="Taille du catalogue synthétique (classeur réel sinon)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--classeur', default=os.path.join(RACINE, catalogue_esg.FICHIER_CLASSEUR))
+    parser.add_argument('--instantanes', default=os.path.join(RACINE, catalogue_esg.DOSSIER_INSTANTANES))
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--sessions', type=int, default=0, help="Nombre de sessions simulées (0: aucune)")
+    parser.add_argument('--limite', type=int, default=3, help="Métiers retenus par session")
+    parser.add_argument('--sortie', help="Fichier JSON des rapports")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.metiers:
+        data = schema_esg.apply_schema(generateur_esg.generate_catalogue(args.metiers, seed=args.seed))
+    else:
+        data = catalogue_esg.load_catalogue(args.classeur, args.instantanes)
+
+    sessions = (args.sessions, args.limite, args.seed) if args.sessions else None
+    rapports = [measure_mode(data, mode == 'compact', sessions) for mode in args.modes]
+    print_report(rapports)
+    if sessions:
+        print(f"\nDonnées utilisateur de {args.sessions} sessions ({args.limite} métiers retenus), "
+              f"hors objets partagés avec le catalogue:")
+        for rapport in rapports:
+            for variante, mesure in rapport['sessions'].items():
+                print(f"{rapport['mode'] + ' / ' + variante:<24}{format_octets(mesure['octets']):>14}"
+                      f"{format_octets(mesure['octets_par_session']):>14} par session")
+    # Pic de mémoire résidente du processus (toutes les versions construites), en Ko sous Linux
+    pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"\nPic de mémoire résidente du processus: {format_octets(pic * 1024)}")
+    if args.sortie:
+        with open(args.sortie, 'w', encoding='utf-8') as f:
+            json.dump({'metiers': rapports[0]['metiers'], 'rapports': rapports, 'pic_rss_octets': pic * 1024},
+                      f, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
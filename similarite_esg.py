@@ -0,0 +1,215 @@
+"""
+Similarité ESG - Institut d'Économie Durable
+Métiers proches: similarité cosinus sur les tags et les compétences, voisins précalculés au chargement
+"""
+
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+import recherche_esg
+
+logger = logging.getLogger("calculateur_esg.similarite")
+
+NB_VOISINS = 10
+# Octets maximum de la matrice des similarités calculée d'un coup (un bloc de métiers x tous les métiers)
+MEMOIRE_BLOC = 64 * 1024 * 1024
+# Caractéristiques partagées par au moins ce nombre de métiers (les tags): traitées en colonnes
+# denses par produit matriciel, plutôt qu'en parcourant leurs longues listes de métiers
+FREQUENCE_DENSE = 64
+
+def _features_by_metier(data, noms, competences):
+    """
+    Caractéristiques de chaque métier: ses tags et ses compétences (préfixées pour les distinguer).
+
+    Les compétences sont lues dans la table longue (`catalogue_esg.normalize_competences`),
+    seule source des colonnes de compétences du classeur.
+    """
+    positions = {nom: position for position, nom in enumerate(noms)}
+    caracteristiques = [set() for _ in noms]
+
+    df_metiers = data.get('metiers', pd.DataFrame())
+    if 'Tags' in df_metiers.columns:
+        for nom, tags_str in zip(df_metiers['Métier'], df_metiers['Tags']):
+            if nom in positions and isinstance(tags_str, str):
+                caracteristiques[positions[nom]].update(f"tag:{tag}" for tag in recherche_esg.split_tags(tags_str) if tag)
+
+    for nom, valeur in zip(competences['Métier'], competences['Compétence']):
+        if nom in positions and isinstance(valeur, str) and valeur.strip():
+            caracteristiques[positions[nom]].add(f"competence:{recherche_esg.normalize_text(valeur).strip()}")
+    return caracteristiques
+
+def build_feature_matrix(data, noms, competences):
+    """
+    Construit la matrice creuse métiers x caractéristiques, pondérée par rareté et normalisée (L2).
+
+    La matrice est stockée ligne par ligne (format CSR: pour le métier i, ses
+    caractéristiques sont `indices[indptr[i]:indptr[i + 1]]` et leurs poids
+    `valeurs[...]`): sa taille dépend du nombre de caractéristiques de chaque
+    métier, pas de la taille du vocabulaire, qui grandit avec le catalogue
+    (les compétences sont du texte libre). Le produit scalaire de deux lignes
+    est leur similarité cosinus.
+
+    Returns:
+        dict: 'indptr' (int64), 'indices' (int32), 'valeurs' (float64) et 'nb_caracteristiques'
+    """
+    caracteristiques = _features_by_metier(data, noms, competences)
+    vocabulaire = {}
+    indices = []
+    indptr = np.zeros(len(noms) + 1, dtype=np.int64)
+    for position, ensemble in enumerate(caracteristiques):
+        # Ordre fixe des caractéristiques: les similarités sont sommées dans le même ordre à chaque construction
+        indices.extend(vocabulaire.setdefault(caracteristique, len(vocabulaire)) for caracteristique in sorted(ensemble))
+        indptr[position + 1] = len(indices)
+    indices = np.asarray(indices, dtype=np.int32)
+
+    frequences = np.bincount(indices, minlength=len(vocabulaire))
+    valeurs = np.log1p(len(noms) / np.maximum(frequences, 1))[indices]
+    lignes = np.repeat(np.arange(len(noms)), np.diff(indptr))
+    normes = np.sqrt(np.bincount(lignes, weights=valeurs ** 2, minlength=len(noms)))
+    valeurs /= normes[lignes]
+    return {'indptr': indptr, 'indices': indices, 'valeurs': valeurs, 'nb_caracteristiques': len(vocabulaire)}
+
+def _postings(matrice, nb_metiers):
+    """Transposée de la matrice (listes des métiers de chaque caractéristique, même format)."""
+    lignes = np.repeat(np.arange(nb_metiers, dtype=np.int32), np.diff(matrice['indptr']))
+    ordre = np.argsort(matrice['indices'], kind='stable')
+    indptr = np.zeros(matrice['nb_caracteristiques'] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(matrice['indices'], minlength=matrice['nb_caracteristiques']), out=indptr[1:])
+    return {'indptr': indptr, 'metiers': lignes[ordre], 'valeurs': matrice['valeurs'][ordre]}
+
+def _similarity_block(matrice, postings, debut, fin, nb_metiers):
+    """
+    Similarités des métiers `debut` à `fin` avec tous les métiers (tableau dense du bloc).
+
+    Chaque caractéristique d'un métier du bloc contribue à tous les métiers de
+    sa liste: seules les paires qui partagent au moins une caractéristique
+    sont parcourues.
+    """
+    a, b = matrice['indptr'][debut], matrice['indptr'][fin]
+    caracteristiques = matrice['indices'][a:b]
+    lignes_bloc = np.repeat(np.arange(fin - debut), np.diff(matrice['indptr'][debut:fin + 1]))
+    departs = postings['indptr'][caracteristiques]
+    longueurs = postings['indptr'][caracteristiques + 1] - departs
+    # Positions de toutes les entrées des listes parcourues, sans boucle Python
+    decalages = np.repeat(departs - (np.cumsum(longueurs) - longueurs), longueurs)
+    positions = decalages + np.arange(decalages.size)
+    contributions = np.repeat(matrice['valeurs'][a:b], longueurs) * postings['valeurs'][positions]
+    cases = np.repeat(lignes_bloc, longueurs) * nb_metiers + postings['metiers'][positions]
+    similarites = np.bincount(cases, weights=contributions, minlength=(fin - debut) * nb_metiers)
+    # Sans aucune entrée, bincount retourne des entiers
+    return similarites.astype(np.float64, copy=False).reshape(fin - debut, nb_metiers)
+
+def _split_frequent(matrice, nb_metiers, memoire_bloc):
+    """
+    Sépare les caractéristiques fréquentes (colonnes d'une matrice dense) des autres (matrice creuse).
+
+    Les colonnes denses sont les plus fréquentes, dans la limite de `memoire_bloc` octets.
+    """
+    frequences = np.bincount(matrice['indices'], minlength=matrice['nb_caracteristiques'])
+    frequentes = np.flatnonzero(frequences >= FREQUENCE_DENSE)
+    frequentes = frequentes[np.argsort(-frequences[frequentes], kind='stable')]
+    frequentes = frequentes[:memoire_bloc // (8 * max(1, nb_metiers))]
+    colonnes = np.full(matrice['nb_caracteristiques'], -1, dtype=np.int64)
+    colonnes[frequentes] = np.arange(len(frequentes))
+
+    lignes = np.repeat(np.arange(nb_metiers), np.diff(matrice['indptr']))
+    denses = colonnes[matrice['indices']] >= 0
+    dense = np.zeros((nb_metiers, len(frequentes)))
+    dense[lignes[denses], colonnes[matrice['indices'][denses]]] = matrice['valeurs'][denses]
+    indptr = np.zeros(nb_metiers + 1, dtype=np.int64)
+    np.cumsum(np.bincount(lignes[~denses], minlength=nb_metiers), out=indptr[1:])
+    creuse = {'indptr': indptr, 'indices': matrice['indices'][~denses], 'valeurs': matrice['valeurs'][~denses],
+              'nb_caracteristiques': matrice['nb_caracteristiques']}
+    return dense, creuse
+
+def _block_bounds(matrice, postings, nb_metiers, memoire_bloc):
+    """Découpe les métiers en blocs dont le calcul tient dans `memoire_bloc` octets."""
+    longueurs = np.diff(postings['indptr'])[matrice['indices']]
+    lignes = np.repeat(np.arange(nb_metiers), np.diff(matrice['indptr']))
+    # Par métier: ses lignes de similarités (parties dense et creuse, float64)
+    # et les entrées parcourues dans les listes (~5 tableaux de 8 octets)
+    couts = nb_metiers * 16 + np.bincount(lignes, weights=longueurs, minlength=nb_metiers) * 40
+    cumul = np.cumsum(couts)
+    bornes = [0]
+    while bornes[-1] < nb_metiers:
+        limite = (cumul[bornes[-1] - 1] if bornes[-1] else 0) + memoire_bloc
+        bornes.append(max(bornes[-1] + 1, int(np.searchsorted(cumul, limite, side='right'))))
+    bornes[-1] = min(bornes[-1], nb_metiers)
+    return bornes
+
+def build_similarity_index(data, noms, competences, nb_voisins=NB_VOISINS, memoire_bloc=MEMOIRE_BLOC):
+    """
+    Précalcule les `nb_voisins` métiers les plus proches de chaque métier.
+
+    Les similarités sont calculées par blocs de métiers, de sorte que ni la
+    matrice métiers x vocabulaire ni la matrice complète métiers x métiers
+    n'est jamais en mémoire: les caractéristiques fréquentes (tags) par
+    produit matriciel sur quelques colonnes denses, les autres (compétences,
+    texte libre) en parcourant les listes de métiers de la matrice creuse
+    transposée. Seuls les meilleurs voisins de chaque bloc sont conservés,
+    par sélection partielle.
+
+    Args:
+        competences: Compétences au format long (colonnes 'Métier' et 'Compétence'),
+            table de `catalogue_esg.normalize_competences`
+        memoire_bloc: Octets maximum utilisés pour le calcul d'un bloc
+
+    Returns:
+        dict: 'metiers', 'positions' (nom -> ligne), 'voisins' (int32, -1 si absent) et 'scores' (float32)
+    """
+    debut = time.perf_counter()
+    nb_metiers = len(noms)
+    matrice = build_feature_matrix(data, noms, competences)
+    dense, creuse = _split_frequent(matrice, nb_metiers, memoire_bloc)
+    postings = _postings(creuse, nb_metiers)
+    k = min(nb_voisins, max(nb_metiers - 1, 0))
+    voisins = np.full((nb_metiers, nb_voisins), -1, dtype=np.int32)
+    scores = np.zeros((nb_metiers, nb_voisins), dtype=np.float32)
+
+    bornes = _block_bounds(creuse, postings, nb_metiers, memoire_bloc) if k else [0]
+    for bloc, fin in zip(bornes, bornes[1:]):
+        similarites = _similarity_block(creuse, postings, bloc, fin, nb_metiers)
+        if dense.shape[1]:
+            similarites += dense[bloc:fin] @ dense.T
+        lignes = np.arange(similarites.shape[0])
+        # Un métier n'est pas son propre voisin
+        similarites[lignes, lignes + bloc] = -1.0
+        candidats = np.argpartition(similarites, nb_metiers - k, axis=1)[:, nb_metiers - k:]
+        valeurs = np.take_along_axis(similarites, candidats, axis=1)
+        # Tri des seuls candidats: similarité décroissante, puis ordre du classeur
+        ordre = np.lexsort((candidats, -valeurs), axis=1)
+        candidats = np.take_along_axis(candidats, ordre, axis=1)
+        valeurs = np.take_along_axis(valeurs, ordre, axis=1)
+        candidats[valeurs <= 0] = -1
+        voisins[bloc:fin, :k] = candidats
+        scores[bloc:fin, :k] = np.maximum(valeurs, 0)
+
+    logger.info(f"Métiers proches précalculés: {nb_metiers} métiers, {matrice['nb_caracteristiques']} caractéristiques "
+                f"({len(matrice['indices'])} non nulles, {dense.shape[1]} denses), {nb_voisins} voisins "
+                f"en {len(bornes) - 1} blocs "
+                f"en {(time.perf_counter() - debut) * 1000:.0f} ms")
+    return {
+        'metiers': list(noms),
+        'positions': {nom: position for position, nom in enumerate(noms)},
+        'voisins': voisins,
+        'scores': scores
+    }
+
+def get_similar_metiers(index_similarite, metier_nom, limite=NB_VOISINS):
+    """
+    Retourne les métiers les plus proches d'un métier (lecture directe des voisins précalculés).
+
+    Returns:
+        list: (nom du métier, similarité entre 0 et 1), du plus proche au moins proche
+    """
+    position = index_similarite['positions'].get(metier_nom)
+    if position is None:
+        return []
+    noms = index_similarite['metiers']
+    return [(noms[voisin], round(float(score), 3))
+            for voisin, score in zip(index_similarite['voisins'][position, :limite].tolist(),
+                                     index_similarite['scores'][position, :limite].tolist())
+            if voisin >= 0]
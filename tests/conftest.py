@@ -0,0 +1,10 @@
+"""
+Configuration des tests - Institut d'Économie Durable
+Les modules de l'application sont importés depuis la racine du dépôt
+"""
+
+import os
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
@@ -0,0 +1,74 @@
+"""Tests de l'API JSON: validation, forme canonique et réponses 304."""
+
+import http.client
+import json
+import os
+import shutil
+from urllib.parse import quote
+
+import pytest
+
+import api_esg
+import catalogue_esg
+
+CLASSEUR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), catalogue_esg.FICHIER_CLASSEUR)
+
+@pytest.fixture(scope='module')
+def serveur(tmp_path_factory):
+    dossier = tmp_path_factory.mktemp('api')
+    classeur = str(dossier / 'classeur.xlsx')
+    shutil.copy(CLASSEUR, classeur)
+    watcher = catalogue_esg.CatalogueWatcher(classeur, str(dossier / 'instantanes'))
+    serveur = api_esg.start_server(port=0, watcher=watcher)
+    yield serveur
+    serveur.shutdown()
+    serveur.server_close()
+
+def get(serveur, chemin, etag=None):
+    connexion = http.client.HTTPConnection('127.0.0.1', serveur.server_port, timeout=10)
+    try:
+        connexion.request('GET', chemin, headers={'If-None-Match': etag} if etag else {})
+        reponse = connexion.getresponse()
+        return reponse.status, reponse.getheader('ETag'), reponse.read()
+    finally:
+        connexion.close()
+
+def test_valid_etag_returns_304(serveur):
+    statut, etag, corps = get(serveur, '/api/correspondances?tags=ESG,Reporting&limite=5')
+    assert statut == 200 and etag and json.loads(corps)['metiers']
+    statut, etag_304, corps = get(serveur, '/api/correspondances?tags=ESG,Reporting&limite=5', etag=etag)
+    assert (statut, etag_304, corps) == (304, etag, b'')
+
+def test_equivalent_requests_share_cache_key_and_etag(serveur):
+    _, etag, corps = get(serveur, '/api/correspondances?tags=ESG&limite=3')
+    _, etag_zero, corps_zero = get(serveur, '/api/correspondances?tags=ESG&limite=03')
+    _, etag_defaut, _ = get(serveur, '/api/correspondances?tags=ESG&limite=3'
+                                     f"&classement={api_esg.recherche_esg.CLASSEMENT_PAR_DEFAUT}")
+    assert etag == etag_zero == etag_defaut
+    assert corps == corps_zero
+    assert get(serveur, '/api/correspondances?tags=ESG&limite=03', etag=etag)[0] == 304
+
+@pytest.mark.parametrize('chemin, statut', [
+    ('/api/correspondances?tags=ESG&limite=0', 400),
+    ('/api/correspondances?tags=ESG&limite=abc', 400),
+    ('/api/correspondances?tags=ESG&classement=inconnu', 400),
+    ('/api/metiers/' + quote('Métier inexistant'), 404),
+    ('/api/inconnue', 404),
+])
+def test_invalid_request_never_gets_304(serveur, chemin, statut):
+    # L'ETag qu'aurait la requête sans validation préalable
+    etag = api_esg.make_etag(serveur.watcher.courant.empreinte, chemin.split('?')[0])
+    assert get(serveur, chemin, etag=etag)[0] == statut
+    assert get(serveur, chemin, etag='*')[0] == statut
+
+def test_canonical_request_normalises_parameters():
+    assert api_esg.parse_correspondances({'tags': ['ESG', 'Reporting,ESG'], 'limite': ['007']}) == \
+        (('ESG', 'Reporting'), 7, api_esg.recherche_esg.CLASSEMENT_PAR_DEFAUT)
+    cle = api_esg.canonical_request('correspondances', (('ESG',), 7, 'bm25'))
+    assert cle == '/api/correspondances?tags=ESG&limite=7&classement=bm25'
+
+def test_metier_route_round_trip(serveur):
+    nom = next(iter(serveur.watcher.courant.bundles))
+    statut, etag, corps = get(serveur, '/api/metiers/' + quote(nom))
+    assert statut == 200 and json.loads(corps)
+    assert get(serveur, '/api/metiers/' + quote(nom), etag=etag)[0] == 304
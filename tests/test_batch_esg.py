@@ -0,0 +1,113 @@
+"""Tests des correspondances en lot: CLI, processus de calcul et cohérence avec le classement de l'application."""
+
+import csv
+import json
+import random
+import sys
+
+import pytest
+
+import batch_esg
+import catalogue_esg
+import generateur_esg
+import recherche_esg
+
+NB_PROFILS = 40
+
+@pytest.fixture(scope='module')
+def catalogue(tmp_path_factory):
+    dossier = tmp_path_factory.mktemp('batch')
+    classeur = str(dossier / 'classeur.xlsx')
+    # Peu de tags distincts: beaucoup d'égalités de score à départager
+    generateur_esg.write_workbook(generateur_esg.generate_catalogue(200, nb_tags=12, seed=3), classeur)
+    instantanes = str(dossier / 'instantanes')
+    data = catalogue_esg.load_catalogue(classeur, instantanes)
+    index = recherche_esg.build_tag_index(data['metiers'], data['salaire'])
+    return classeur, instantanes, index
+
+@pytest.fixture(scope='module')
+def profils(catalogue):
+    _, _, index = catalogue
+    tirage = random.Random(5)
+    # Un profil sur sept porte un tag absent du catalogue
+    return [(f"p{numero}", tirage.sample(index['tags'], tirage.randint(1, 4))
+             + (['tag inconnu'] if numero % 7 == 0 else []))
+            for numero in range(NB_PROFILS)]
+
+def expected_matches(index, tags, k, mode):
+    """Meilleurs métiers d'un profil selon `rank_metiers` (tags inconnus ignorés, sans repli)."""
+    ordre, scores, communs = recherche_esg.rank_metiers(index, tags, mode, limite=k)
+    valeurs = communs if mode == 'comptage' else scores
+    return [(index['metiers'][position], valeur) for position, valeur in zip(ordre.tolist(), valeurs.tolist())]
+
+@pytest.mark.parametrize('mode', recherche_esg.MODES_CLASSEMENT)
+def test_score_profiles_matches_rank_metiers(catalogue, profils, mode):
+    _, _, index = catalogue
+    matrice = recherche_esg.build_tag_matrix(index, mode)
+    vecteurs, inconnus = recherche_esg.encode_profiles(matrice, [tags for _, tags in profils])
+    assert inconnus == sum('tag inconnu' in tags for _, tags in profils)
+    # Petite mémoire: plusieurs paquets de profils
+    for k in (1, 5, len(index['metiers']) + 1):
+        resultats = recherche_esg.score_profiles(matrice, vecteurs, k, memoire_max=4 * len(index['metiers']) * 3)
+        for (_, tags), (positions, valeurs) in zip(profils, resultats):
+            attendu = expected_matches(index, tags, k, mode)
+            assert [index['metiers'][position] for position in positions.tolist()] == [nom for nom, _ in attendu]
+            assert valeurs.tolist() == pytest.approx([valeur for _, valeur in attendu], rel=1e-5)
+
+def test_process_pool_returns_batches_in_reading_order(catalogue, profils):
+    _, _, index = catalogue
+    matrice = recherche_esg.build_tag_matrix(index)
+    initargs = (matrice, index['metiers'], index['secteurs'], 3, batch_esg.MEMOIRE_SCORES, 'comptage')
+    serie = list(batch_esg.run_batches(batch_esg.batched(profils, 6), 1, initargs))
+    paralleles = list(batch_esg.run_batches(batch_esg.batched(profils, 6), 2, initargs))
+    assert paralleles == serie
+    assert [identifiant for resultats, _ in paralleles for identifiant, _ in resultats] == \
+        [identifiant for identifiant, _ in profils]
+
+def run_cli(monkeypatch, catalogue, entree, sortie, *options):
+    classeur, instantanes, _ = catalogue
+    monkeypatch.setattr(sys, 'argv', ['batch_esg.py', str(entree), '--sortie', str(sortie), '--top', '3',
+                                      '--taille-lot', '7', '--classeur', classeur, '--instantanes', instantanes,
+                                      *options])
+    batch_esg.main()
+
+@pytest.mark.parametrize('processus', [1, 2])
+def test_cli_csv(monkeypatch, tmp_path, catalogue, profils, processus):
+    _, _, index = catalogue
+    entree = tmp_path / 'profils.csv'
+    with open(entree, 'w', encoding='utf-8', newline='') as f:
+        ecrivain = csv.writer(f)
+        ecrivain.writerow(['id', 'tags'])
+        ecrivain.writerows((identifiant, ', '.join(tags)) for identifiant, tags in profils)
+    run_cli(monkeypatch, catalogue, entree, tmp_path / 'resultats.csv', '--processus', str(processus))
+
+    with open(tmp_path / 'resultats.csv', encoding='utf-8', newline='') as f:
+        lignes = list(csv.DictReader(f))
+    attendu = [(identifiant, str(rang), nom, str(score))
+               for identifiant, tags in profils
+               for rang, (nom, score) in enumerate(expected_matches(index, tags, 3, 'comptage'), 1)]
+    assert [(ligne['profil'], ligne['rang'], ligne['metier'], ligne['score']) for ligne in lignes] == attendu
+
+def test_cli_jsonl(monkeypatch, tmp_path, catalogue, profils):
+    _, _, index = catalogue
+    entree = tmp_path / 'profils.jsonl'
+    with open(entree, 'w', encoding='utf-8') as f:
+        for identifiant, tags in profils:
+            f.write(json.dumps({'id': identifiant, 'tags': tags}, ensure_ascii=False) + '\n')
+        f.write('\n')
+    run_cli(monkeypatch, catalogue, entree, tmp_path / 'resultats.jsonl', '--classement', 'bm25')
+
+    with open(tmp_path / 'resultats.jsonl', encoding='utf-8') as f:
+        sorties = [json.loads(ligne) for ligne in f]
+    assert [sortie['profil'] for sortie in sorties] == [identifiant for identifiant, _ in profils]
+    for sortie, (_, tags) in zip(sorties, profils):
+        attendu = expected_matches(index, tags, 3, 'bm25')
+        assert [metier['metier'] for metier in sortie['metiers']] == [nom for nom, _ in attendu]
+        assert [metier['score'] for metier in sortie['metiers']] == pytest.approx([score for _, score in attendu],
+                                                                                abs=1e-4)
+
+def test_cli_rejects_missing_tags_column(monkeypatch, tmp_path, catalogue):
+    entree = tmp_path / 'profils.csv'
+    entree.write_text('id,competences\np1,ESG\n', encoding='utf-8')
+    with pytest.raises(ValueError):
+        run_cli(monkeypatch, catalogue, entree, tmp_path / 'resultats.csv')
@@ -0,0 +1,195 @@
+"""Tests de la compilation du classeur en instantané."""
+
+import io
+import json
+import math
+import os
+import shutil
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import catalogue_esg
+import generateur_esg
+import memoire_esg
+import schema_esg
+
+CLASSEUR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), catalogue_esg.FICHIER_CLASSEUR)
+
+@pytest.fixture
+def classeur(tmp_path):
+    chemin = tmp_path / 'classeur.xlsx'
+    shutil.copy(CLASSEUR, chemin)
+    return str(chemin)
+
+def test_snapshot_contains_only_parquet_files(classeur, tmp_path):
+    dossier = str(tmp_path / 'instantanes')
+    data = catalogue_esg.compile_catalogue(classeur, dossier)
+    empreinte = catalogue_esg.hash_workbook(classeur)
+    fichiers = sorted(os.listdir(os.path.join(dossier, empreinte)))
+    assert fichiers == sorted([f"{cle}.parquet" for cle in catalogue_esg.FEUILLES] + ['manifeste.json'])
+    relu = catalogue_esg.load_snapshot(empreinte, dossier)
+    for cle in catalogue_esg.FEUILLES:
+        pd.testing.assert_frame_equal(relu[cle], data[cle])
+
+def test_sheets_parsed_in_worker_processes_match_serial_parsing():
+    serie, _ = catalogue_esg.read_workbook(CLASSEUR, nb_processus=1)
+    paralleles, _ = catalogue_esg.read_workbook(CLASSEUR, seuil_processus=0, nb_processus=2)
+    for cle in catalogue_esg.FEUILLES:
+        pd.testing.assert_frame_equal(paralleles[cle], serie[cle])
+
+def test_sheet_payload_keeps_only_the_shared_strings_it_uses():
+    with open(CLASSEUR, 'rb') as f:
+        contenu = f.read()
+    feuille = catalogue_esg.FEUILLES['metiers']
+    charge = catalogue_esg._sheet_payloads(contenu, [feuille])[feuille]
+    with zipfile.ZipFile(io.BytesIO(charge)) as archive, zipfile.ZipFile(CLASSEUR) as original:
+        assert len(archive.read('xl/sharedStrings.xml')) < len(original.read('xl/sharedStrings.xml'))
+        assert archive.namelist().count('xl/worksheets/sheet1.xml') == 1
+        assert not any(nom.startswith('xl/worksheets/sheet2') for nom in archive.namelist())
+
+def test_sheet_not_representable_in_parquet_raises(tmp_path):
+    df = pd.DataFrame({'Métier': ['A', 'B'], 'Valeur': [1, 'texte']})
+    with pytest.raises(catalogue_esg.SnapshotError):
+        catalogue_esg._write_sheet(df, str(tmp_path), 'metiers')
+
+def test_compilation_without_snapshot_when_a_sheet_cannot_be_written(classeur, tmp_path, monkeypatch):
+    def echec(df, dossier, cle):
+        raise catalogue_esg.SnapshotError("colonne mixte")
+
+    monkeypatch.setattr(catalogue_esg, '_write_sheet', echec)
+    dossier = str(tmp_path / 'instantanes')
+    data = catalogue_esg.compile_catalogue(classeur, dossier)
+    assert set(data) == set(catalogue_esg.FEUILLES)
+    assert catalogue_esg.load_snapshot(catalogue_esg.hash_workbook(classeur), dossier) is None
+    assert os.listdir(dossier) == []
+
+def test_pickle_snapshot_is_never_loaded(classeur, tmp_path):
+    dossier = str(tmp_path / 'instantanes')
+    catalogue_esg.compile_catalogue(classeur, dossier)
+    empreinte = catalogue_esg.hash_workbook(classeur)
+    chemin = os.path.join(dossier, empreinte, 'manifeste.json')
+    with open(chemin, encoding='utf-8') as f:
+        manifeste = json.load(f)
+    manifeste['formats']['metiers'] = 'pickle'
+    with open(chemin, 'w', encoding='utf-8') as f:
+        json.dump(manifeste, f)
+    assert catalogue_esg.load_snapshot(empreinte, dossier) is None
+
+@pytest.mark.parametrize('valeur, direction, couleur, expansion', [
+    (0.25, 'inconnue', 'negative', 'inconnue'),
+    (-0.1, 'baisse', 'negative', 'inconnue'),
+    ("Forte hausse", 'hausse', 'positive', 'hausse'),
+    ("Forte demande", 'hausse', 'negative', 'hausse'),
+    ("+5%", 'hausse', 'positive', 'inconnue'),
+    ("Croissance positive", 'croissance', 'positive', 'croissance'),
+    ("Stable", 'stable', 'stable', 'inconnue'),
+    ("En déclin", 'baisse', 'negative', 'inconnue'),
+    (None, 'inconnue', 'negative', 'inconnue'),
+])
+def test_classify_tendance_matches_detail_page_rules(valeur, direction, couleur, expansion):
+    assert catalogue_esg.classify_tendance(valeur) == {'direction': direction, 'couleur': couleur,
+                                                       'expansion': expansion}
+
+def comparable(lignes):
+    """Lignes figées en dictionnaires, NaN remplacés par None (NaN != NaN)."""
+    return [{cle: None if isinstance(val, float) and math.isnan(val) else val for cle, val in ligne.items()}
+            for ligne in lignes]
+
+def test_bundles_match_per_metier_filtering():
+    data = schema_esg.apply_schema(generateur_esg.generate_catalogue(40, seed=7))
+    # Lignes entrelacées, sans métier, et métier absent de la feuille métiers
+    data['salaire'] = pd.concat([data['salaire'].sample(frac=1, random_state=0),
+                                 pd.DataFrame({'Métier': [None, 'Seulement salaire'], 'Secteur': ['X', 'Y'],
+                                               'Expérience': ['0-2 ans'] * 2, 'Salaire_Min': [1.0, float('nan')],
+                                               'Description': ['', 'Texte']})],
+                                ignore_index=True)
+    competences = catalogue_esg.normalize_competences(data['competences'])
+    bundles = catalogue_esg.build_metier_bundles(data, competences)
+
+    assert list(bundles)[-1] == 'Seulement salaire'
+    assert bundles['Seulement salaire']['Description'] == 'Texte'
+    for nom, fiche in bundles.items():
+        for section in ('salaire', 'formations', 'tendances'):
+            attendu = catalogue_esg._freeze_records(data[section][data[section]['Métier'] == nom])
+            assert comparable(fiche.get(section, ())) == comparable(attendu), (nom, section)
+        assert comparable(fiche.get('competences', ())) == comparable(
+            catalogue_esg._freeze_records(competences.get(nom)))
+
+def native(valeur):
+    """Valeur avec son type exact; NaN représenté à part (NaN != NaN)."""
+    if isinstance(valeur, float) and math.isnan(valeur):
+        return ('NaN',)
+    if isinstance(valeur, tuple):
+        return tuple(native(element) for element in valeur)
+    return (type(valeur), valeur)
+
+def test_compact_bundles_hold_the_same_values_as_dict_bundles():
+    data = schema_esg.apply_schema(generateur_esg.generate_catalogue(40, seed=11))
+    salaire = data['salaire'].copy()
+    # Cellules texte vides: None (instantané Parquet) ou NaN (classeur compilé), et salaire manquant
+    salaire.loc[0, 'Description'] = None
+    salaire.loc[1, 'Description'] = float('nan')
+    salaire.loc[2, 'Secteur'] = None
+    salaire['Salaire_Min'] = salaire['Salaire_Min'].astype(float)
+    salaire.loc[3, 'Salaire_Min'] = float('nan')
+    data['salaire'] = salaire
+    data['tendances'].loc[0, 'Croissance_Annuelle'] = float('nan')
+
+    dictionnaires = catalogue_esg.Catalogue(data)
+    compact = catalogue_esg.Catalogue(data, compact=True)
+    # Le mode compact convertit bien les feuilles (catégories, entiers 32 bits)
+    assert isinstance(compact.data['salaire']['Secteur'].dtype, pd.CategoricalDtype)
+    assert compact.data['salaire']['Salaire_Max'].dtype == np.int32
+
+    assert list(compact.bundles) == list(dictionnaires.bundles)
+    for nom, fiche in dictionnaires.bundles.items():
+        fiche_compacte = compact.bundles[nom]
+        assert list(fiche_compacte) == list(fiche), nom
+        for champ, valeur in fiche.items():
+            valeur_compacte = fiche_compacte[champ]
+            if champ in catalogue_esg.SECTIONS_FICHE:
+                assert all(isinstance(ligne, memoire_esg.FrozenRecord) for ligne in valeur_compacte)
+                assert [{cle: native(v) for cle, v in ligne.items()} for ligne in valeur_compacte] == \
+                    [{cle: native(v) for cle, v in ligne.items()} for ligne in valeur], (nom, champ)
+            else:
+                assert native(valeur_compacte) == native(valeur), (nom, champ)
+
+    # Textes vides: None dans les deux modes; nombres manquants: NaN
+    salaires = [ligne for fiche in dictionnaires.bundles.values() for ligne in fiche.get('salaire', ())]
+    descriptions = [ligne['Description'] for ligne in salaires]
+    assert None in descriptions and not any(isinstance(description, float) for description in descriptions)
+    assert any(math.isnan(ligne['Salaire_Min']) for ligne in salaires)
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_reload_rebuilds_only_what_depends_on_the_changed_sheet(tmp_path, compact):
+    classeur = str(tmp_path / 'classeur.xlsx')
+    data = generateur_esg.generate_catalogue(30, seed=5)
+    generateur_esg.write_workbook(data, classeur)
+    watcher = catalogue_esg.CatalogueWatcher(classeur, str(tmp_path / 'instantanes'), compact=compact)
+    ancien = watcher.courant
+
+    # Une seule cellule modifiée dans la feuille des tendances
+    data['tendances'].loc[0, 'Demande_Marché'] = "Modifiée"
+    generateur_esg.write_workbook(data, classeur)
+    os.utime(classeur, ns=(int(ancien.charge_le + 1) * 10**9,) * 2)
+    assert watcher.check()
+    nouveau = watcher.courant
+    assert nouveau is not ancien
+    assert [cle for cle in catalogue_esg.FEUILLES if not nouveau.unchanged(ancien, cle)] == ['tendances']
+
+    # Feuilles et structures dérivées des feuilles inchangées: mêmes objets
+    for cle in ('metiers', 'salaire', 'competences', 'formations'):
+        assert nouveau.data[cle] is ancien.data[cle]
+        assert nouveau.sections[cle] is ancien.sections[cle]
+    for structure in ('index', 'competences', 'texte', 'similarite'):
+        assert getattr(nouveau, structure) is getattr(ancien, structure)
+
+    # Seule la fiche du métier modifié est reconstruite
+    modifie = data['tendances'].loc[0, 'Métier']
+    assert nouveau.bundles[modifie]['tendances'][0]['Demande_Marché'] == "Modifiée"
+    assert nouveau.bundles[modifie] is not ancien.bundles[modifie]
+    assert all(nouveau.bundles[nom] is ancien.bundles[nom] for nom in ancien.bundles if nom != modifie)
+    assert list(nouveau.bundles) == list(ancien.bundles)
@@ -0,0 +1,25 @@
+"""Tests du générateur de classeurs synthétiques."""
+
+import sys
+
+import pytest
+
+import generateur_esg
+
+@pytest.mark.parametrize('nb_formations', [0, -1])
+def test_generate_catalogue_requires_a_formation(nb_formations):
+    with pytest.raises(ValueError):
+        generateur_esg.generate_catalogue(3, nb_formations=nb_formations)
+
+def test_single_formation_has_no_secondary_programme():
+    formations = generateur_esg.generate_catalogue(3, nb_formations=1)['formations']
+    assert formations['Programme_Principal'].nunique() == 1
+    assert formations['Programme_Secondaire'].isna().all()
+
+def test_cli_rejects_zero_formations(monkeypatch, tmp_path):
+    monkeypatch.setattr(sys, 'argv', ['generateur_esg.py', '--metiers', '3', '--formations', '0',
+                                      '--sortie', str(tmp_path / 'classeur.xlsx')])
+    with pytest.raises(SystemExit) as erreur:
+        generateur_esg.main()
+    assert erreur.value.code == 2
+    assert not (tmp_path / 'classeur.xlsx').exists()
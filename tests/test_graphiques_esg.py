@@ -0,0 +1,31 @@
+"""Tests du cache des graphiques rendus et de son préchauffage."""
+
+import pytest
+
+import graphiques_esg
+
+SALAIRE = ({'Experience': '0-2 ans', 'Salaire_Min': 35000, 'Salaire_Max': 45000, 'Salaire_Moyen': 40000},)
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = graphiques_esg.ChartCache(max_entries=6)
+    monkeypatch.setattr(graphiques_esg, '_CACHE_GRAPHIQUES', cache)
+    monkeypatch.setattr(graphiques_esg, 'render_salary_chart', lambda *args: b'png')
+    return cache
+
+def test_warm_up_stops_at_cache_capacity(cache):
+    bundles = {f"Métier {i}": {'salaire': SALAIRE} for i in range(10)}
+    assert graphiques_esg.warm_up_salary_charts(bundles, {'primary': '#000'}) == 6
+    stats = cache.stats()
+    assert (stats['entrees'], stats['evictions']) == (6, 0)
+
+def test_warm_up_skips_metiers_without_salary(cache):
+    bundles = {'Sans salaire': {'salaire': ()}, 'Avec salaire': {'salaire': SALAIRE}}
+    assert graphiques_esg.warm_up_salary_charts(bundles, {'primary': '#000'}) == 2
+
+def test_shrinking_the_cache_evicts_oldest_entries(cache):
+    for i in range(6):
+        cache.get_or_render(i, lambda: b'png')
+    graphiques_esg.configure_chart_cache(2)
+    assert cache.stats()['entrees'] == 2 and cache.stats()['evictions'] == 4
+    assert cache.get_or_render(5, lambda: pytest.fail("rendu inattendu")) == b'png'
@@ -0,0 +1,204 @@
+"""Tests de la file d'envoi des leads et de la synchronisation Hubspot."""
+
+import sqlite3
+
+import pytest
+
+import hubspot_esg
+
+@pytest.fixture
+def outbox(tmp_path):
+    return hubspot_esg.LeadOutbox(str(tmp_path / 'outbox' / 'leads.sqlite3'))
+
+def lead(email='jean@ex.fr', prenom='Jean'):
+    return {'email': email, 'firstname': prenom}
+
+class EnvoiInstable:
+    """Envoi qui échoue `nb_echecs` fois avant de réussir."""
+
+    def __init__(self, nb_echecs, erreur=None):
+        self.nb_echecs = nb_echecs
+        self.erreur = erreur or ConnectionError("Hubspot indisponible")
+        self.appels = []
+
+    def __call__(self, properties):
+        self.appels.append(properties)
+        if len(self.appels) <= self.nb_echecs:
+            raise self.erreur
+        return f"id-{len(self.appels)}"
+
+# ----- FILE D'ENVOI -----
+def test_enqueue_replaces_pending_lead_for_same_email(outbox):
+    assert outbox.enqueue(lead(prenom='Jean'))
+    assert outbox.enqueue(lead(email=' JEAN@ex.fr ', prenom='Jeanne'))
+    leads = outbox.claim_due()
+    assert len(leads) == 1
+    assert leads[0]['properties']['firstname'] == 'Jeanne'
+    assert leads[0]['version'] == 2
+
+def test_enqueue_skips_identical_lead_already_sent(outbox):
+    outbox.enqueue(lead())
+    envoye = outbox.claim_due()[0]
+    outbox.mark_sent(envoye['email'], envoye['version'], 'id-1')
+    assert not outbox.enqueue(lead())
+    assert outbox.enqueue(lead(prenom='Jeanne'))
+    assert outbox.stats() == {hubspot_esg.EN_ATTENTE: 1}
+
+def test_enqueue_requires_email(outbox):
+    with pytest.raises(ValueError):
+        outbox.enqueue({'firstname': 'Jean'})
+
+def test_claimed_lead_is_not_claimed_twice(outbox):
+    outbox.enqueue(lead())
+    assert len(outbox.claim_due()) == 1
+    assert outbox.claim_due() == []
+
+def test_mark_sent_ignores_superseded_version(outbox):
+    outbox.enqueue(lead())
+    ancien = outbox.claim_due()[0]
+    outbox.enqueue(lead(prenom='Jeanne'))
+    outbox.mark_sent(ancien['email'], ancien['version'], 'id-1')
+    assert outbox.stats() == {hubspot_esg.EN_ATTENTE: 1}
+
+def test_failed_lead_is_retried_after_backoff(outbox):
+    outbox.enqueue(lead())
+    reserve = outbox.claim_due()[0]
+    assert not outbox.mark_failed(reserve['email'], reserve['version'], "erreur 503")
+    # Le délai avant la nouvelle tentative n'est pas écoulé
+    assert outbox.claim_due() == []
+    with sqlite3.connect(outbox.path) as conn:
+        prochaine, tentatives = conn.execute("SELECT prochaine_tentative, tentatives FROM leads").fetchone()
+    assert tentatives == 1
+    assert prochaine > 0
+
+def test_lead_is_abandoned_after_max_attempts(outbox, monkeypatch):
+    monkeypatch.setattr(hubspot_esg, 'compute_backoff', lambda tentatives: 0.0)
+    outbox.enqueue(lead())
+    for _ in range(2):
+        reserve = outbox.claim_due()[0]
+        abandon = outbox.mark_failed(reserve['email'], reserve['version'], "erreur 503", max_tentatives=2)
+    assert abandon
+    assert outbox.claim_due() == []
+    assert outbox.stats() == {hubspot_esg.ECHEC: 1}
+
+def test_permanent_failure_is_abandoned_immediately(outbox):
+    outbox.enqueue(lead())
+    reserve = outbox.claim_due()[0]
+    assert outbox.mark_failed(reserve['email'], reserve['version'], "erreur 400", permanent=True)
+    assert outbox.stats() == {hubspot_esg.ECHEC: 1}
+
+def test_purge_removes_old_sent_and_abandoned_leads(outbox):
+    outbox.enqueue(lead('a@ex.fr'))
+    outbox.enqueue(lead('b@ex.fr'))
+    outbox.enqueue(lead('c@ex.fr'))
+    envoye, abandonne, _ = outbox.claim_due()
+    outbox.mark_sent(envoye['email'], envoye['version'])
+    outbox.mark_failed(abandonne['email'], abandonne['version'], "erreur 400", permanent=True)
+    assert outbox.purge_sent() == 0
+    assert outbox.purge_sent(retention=-1, retention_echecs=-1) == 2
+    assert outbox.stats() == {hubspot_esg.EN_COURS: 1}
+
+def test_operations_close_their_connection(outbox, monkeypatch):
+    ouvertes = []
+    connect = sqlite3.connect
+
+    def connect_suivi(*args, **kwargs):
+        ouvertes.append(connect(*args, **kwargs))
+        return ouvertes[-1]
+
+    monkeypatch.setattr(hubspot_esg.sqlite3, 'connect', connect_suivi)
+    outbox.enqueue(lead())
+    reserve = outbox.claim_due()[0]
+    outbox.mark_failed(reserve['email'], reserve['version'], "erreur 503")
+    outbox.release(reserve['email'], reserve['version'])
+    outbox.purge_sent()
+    outbox.stats()
+    assert len(ouvertes) == 6
+    for conn in ouvertes:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+def test_failed_transaction_is_rolled_back(outbox):
+    with pytest.raises(sqlite3.OperationalError):
+        with outbox._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT INTO leads (email, proprietes, statut, prochaine_tentative, cree_le, maj_le) "
+                         "VALUES ('x@ex.fr', '{}', 'en_attente', 0, 0, 0)")
+            conn.execute("SELECT * FROM table_absente")
+    assert outbox.stats() == {}
+    # La base n'est pas restée verrouillée
+    assert outbox.enqueue(lead())
+
+# ----- DÉLAIS ET ERREURS -----
+def test_backoff_grows_exponentially_up_to_cap():
+    for tentatives in range(1, 20):
+        attendu = min(hubspot_esg.DELAI_INITIAL * 2 ** (tentatives - 1), hubspot_esg.DELAI_MAX)
+        delai = hubspot_esg.compute_backoff(tentatives)
+        assert attendu * 0.5 <= delai <= attendu
+
+@pytest.mark.parametrize('statut, permanent', [(400, True), (404, True), (408, False), (409, False),
+                                               (429, False), (500, False), (None, False)])
+def test_permanent_errors_are_client_errors(statut, permanent):
+    erreur = Exception("erreur")
+    erreur.status = statut
+    assert hubspot_esg.is_permanent_error(erreur) is permanent
+
+# ----- SYNCHRONISATION -----
+def test_worker_retries_transient_failure_then_sends(outbox, monkeypatch):
+    monkeypatch.setattr(hubspot_esg, 'compute_backoff', lambda tentatives: 0.0)
+    envoi = EnvoiInstable(nb_echecs=2)
+    worker = hubspot_esg.HubSpotSyncWorker(outbox, envoi)
+    outbox.enqueue(lead())
+    for _ in range(3):
+        worker.drain_once()
+    assert len(envoi.appels) == 3
+    assert outbox.stats() == {hubspot_esg.ENVOYE: 1}
+
+def test_worker_abandons_lead_refused_by_hubspot(outbox):
+    erreur = hubspot_esg.UpsertError("Contact refusé")
+    envoi = EnvoiInstable(nb_echecs=1, erreur=erreur)
+    worker = hubspot_esg.HubSpotSyncWorker(outbox, envoi)
+    outbox.enqueue(lead())
+    worker.drain_once()
+    worker.drain_once()
+    assert len(envoi.appels) == 1
+    assert outbox.stats() == {hubspot_esg.ECHEC: 1}
+
+def test_contacts_client_is_created_on_first_send():
+    contacts = hubspot_esg.HubSpotContacts('jeton')
+    assert contacts._batch_api is None
+
+# ----- LIMITATION DES SOUMISSIONS -----
+class Horloge:
+    def __init__(self):
+        self.instant = 1000.0
+
+    def __call__(self):
+        return self.instant
+
+@pytest.fixture
+def horloge(monkeypatch):
+    horloge = Horloge()
+    monkeypatch.setattr(hubspot_esg.time, 'monotonic', horloge)
+    return horloge
+
+def test_throttle_refuses_submission_too_close_to_previous_one(horloge):
+    throttle = hubspot_esg.SubmissionThrottle(delai_session=30, delai_email=60)
+    throttle.check('session-1', 'jean@ex.fr')
+    throttle.record('session-1', 'jean@ex.fr')
+    horloge.instant += 10
+    with pytest.raises(hubspot_esg.SubmissionThrottled) as erreur:
+        throttle.check('session-1', 'autre@ex.fr')
+    assert erreur.value.attente == pytest.approx(20)
+    with pytest.raises(hubspot_esg.SubmissionThrottled):
+        throttle.check('session-2', ' JEAN@ex.fr')
+    horloge.instant += 60
+    throttle.check('session-2', 'jean@ex.fr')
+    assert throttle.stats() == {'acceptees': 1, 'limitees_session': 1, 'limitees_email': 1}
+
+def test_throttle_does_not_count_unrecorded_submission(horloge):
+    throttle = hubspot_esg.SubmissionThrottle()
+    throttle.check('session-1', 'jean@ex.fr')
+    # L'enregistrement du lead a échoué: record() n'est pas appelé, le nouvel essai passe
+    throttle.check('session-1', 'jean@ex.fr')
+    assert throttle.stats()['acceptees'] == 0
@@ -0,0 +1,98 @@
+"""Tests de l'instrumentation: histogrammes, export Prometheus et spans désactivés."""
+
+import pytest
+
+import instrumentation_esg
+
+NOM = instrumentation_esg.NOM_METRIQUE
+
+@pytest.fixture
+def histogrammes(monkeypatch):
+    """Instrumentation activée, avec des histogrammes vides propres au test."""
+    vides = {}
+    monkeypatch.setattr(instrumentation_esg, '_actif', True)
+    monkeypatch.setattr(instrumentation_esg, '_histogrammes', vides)
+    instrumentation_esg.set_context()
+    yield vides
+    instrumentation_esg.set_context()
+
+def samples(texte):
+    """Échantillons du texte Prometheus: {série avec étiquettes: valeur}."""
+    return {serie: float(valeur) for serie, valeur in
+            (ligne.rsplit(' ', 1) for ligne in texte.splitlines() if ligne and not ligne.startswith('#'))}
+
+def test_histogram_buckets_include_their_upper_bound():
+    histogramme = instrumentation_esg.Histogram()
+    for duree in (0.0005, 0.001, 0.0011, 0.3, 10.0, 12.0):
+        histogramme.observe(duree)
+    bornes = instrumentation_esg.BORNES
+    assert histogramme.compteurs[bornes.index(0.001)] == 2       # 0.0005 et 0.001 (le="0.001")
+    assert histogramme.compteurs[bornes.index(0.0025)] == 1
+    assert histogramme.compteurs[bornes.index(0.5)] == 1
+    assert histogramme.compteurs[bornes.index(10.0)] == 1
+    # Au-delà de la dernière borne: seulement dans le total (+Inf)
+    assert sum(histogramme.compteurs) == 5 and histogramme.total == 6
+    assert histogramme.somme == pytest.approx(22.3026)
+
+def test_prometheus_text_is_cumulative_and_labelled(histogrammes):
+    instrumentation_esg.observe('donnees', 'load_tag_index', 0.002)
+    instrumentation_esg.set_context(page='resultats', session='abc')
+    for duree in (0.002, 0.2, 20.0):
+        instrumentation_esg.observe('page', 'resultats', duree)
+
+    texte = instrumentation_esg.render_prometheus()
+    assert texte.startswith(f"# HELP {NOM} ")
+    assert f"# TYPE {NOM} histogram\n" in texte and texte.endswith('\n')
+    valeurs = samples(texte)
+    etiquettes = 'categorie="page",nom="resultats",page="resultats"'
+    cumuls = [valeurs[f'{NOM}_bucket{{{etiquettes},le="{borne}"}}'] for borne in instrumentation_esg.BORNES]
+    assert cumuls == sorted(cumuls)
+    assert valeurs[f'{NOM}_bucket{{{etiquettes},le="0.0025"}}'] == 1
+    assert valeurs[f'{NOM}_bucket{{{etiquettes},le="0.25"}}'] == 2
+    assert valeurs[f'{NOM}_bucket{{{etiquettes},le="10.0"}}'] == 2
+    assert valeurs[f'{NOM}_bucket{{{etiquettes},le="+Inf"}}'] == valeurs[f'{NOM}_count{{{etiquettes}}}'] == 3
+    assert valeurs[f'{NOM}_sum{{{etiquettes}}}'] == pytest.approx(20.202)
+    # Mesure hors d'un rerun: page 'arriere-plan'
+    assert valeurs[f'{NOM}_count{{categorie="donnees",nom="load_tag_index",page="arriere-plan"}}'] == 1
+
+def test_label_values_are_escaped(histogrammes):
+    instrumentation_esg.observe('hubspot', 'upsert "contact"\\\n', 0.01)
+    assert 'nom="upsert \\"contact\\"\\\\\\n"' in instrumentation_esg.render_prometheus()
+
+def test_timed_and_span_record_even_when_the_block_raises(histogrammes):
+    @instrumentation_esg.timed('donnees')
+    def echoue():
+        raise RuntimeError("erreur")
+
+    with pytest.raises(RuntimeError):
+        echoue()
+    with pytest.raises(KeyError):
+        with instrumentation_esg.span('graphique', 'salaire'):
+            raise KeyError('x')
+    assert {cle[:2]: h.total for cle, h in histogrammes.items()} == {('donnees', 'echoue'): 1,
+                                                                    ('graphique', 'salaire'): 1}
+
+def test_disabled_instrumentation_records_nothing(histogrammes, monkeypatch):
+    monkeypatch.setattr(instrumentation_esg, '_actif', False)
+
+    @instrumentation_esg.timed('donnees')
+    def double(x):
+        return 2 * x
+
+    assert double(21) == 42
+    span = instrumentation_esg.span('page', 'accueil')
+    # Un seul objet sans état, partagé par tous les appels
+    assert span is instrumentation_esg.span('page', 'resultats')
+    with span as contexte:
+        assert contexte is span
+    instrumentation_esg.observe('page', 'accueil', 0.1)
+    assert histogrammes == {}
+    assert not samples(instrumentation_esg.render_prometheus())
+
+def test_metrics_file_is_replaced_atomically(histogrammes, tmp_path):
+    instrumentation_esg.observe('page', 'accueil', 0.01)
+    chemin = tmp_path / 'metriques.prom'
+    chemin.write_text('ancien contenu', encoding='utf-8')
+    instrumentation_esg.write_metrics_file(str(chemin))
+    assert chemin.read_text(encoding='utf-8') == instrumentation_esg.render_prometheus()
+    assert [fichier.name for fichier in tmp_path.iterdir()] == ['metriques.prom']
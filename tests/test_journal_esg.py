@@ -0,0 +1,80 @@
+"""Tests de la journalisation: cycle de vie du thread d'écriture, format JSON et rotation."""
+
+import json
+import logging
+import threading
+
+import pytest
+
+import journal_esg
+
+@pytest.fixture
+def racine():
+    """Journalisation du processus rétablie après le test (setup_logging remplace les gestionnaires racine)."""
+    logger = logging.getLogger()
+    gestionnaires, niveau = list(logger.handlers), logger.level
+    journal_esg.stop_logging()
+    yield logger
+    journal_esg.stop_logging()
+    for gestionnaire in list(logger.handlers):
+        logger.removeHandler(gestionnaire)
+    for gestionnaire in gestionnaires:
+        logger.addHandler(gestionnaire)
+    logger.setLevel(niveau)
+
+def test_listener_starts_once_and_flushes_on_stop(racine, tmp_path):
+    fichier = tmp_path / 'logs' / 'journal.log'
+    journal_esg.setup_logging(fichier=str(fichier))
+    listener = journal_esg._listener
+    assert listener is not None
+    # Les reruns de Streamlit rappellent setup_logging: rien n'est reconfiguré
+    journal_esg.setup_logging(fichier=str(tmp_path / 'autre.log'))
+    assert journal_esg._listener is listener and not (tmp_path / 'autre.log').exists()
+    assert [type(gestionnaire) for gestionnaire in racine.handlers] == [journal_esg._QueueHandler]
+
+    # Les threads ne font que déposer dans la file: la ligne est écrite par le thread du listener
+    emetteur = threading.Thread(target=logging.getLogger('calculateur_esg.test').info, args=("depuis un thread",),
+                                name="session-1")
+    emetteur.start()
+    emetteur.join()
+    logging.getLogger('calculateur_esg.test').debug("sous le niveau")
+    journal_esg.stop_logging()
+
+    assert journal_esg._listener is None and racine.handlers == []
+    lignes = fichier.read_text(encoding='utf-8').splitlines()
+    assert len(lignes) == 1 and lignes[0].endswith(" - calculateur_esg.test - INFO - depuis un thread")
+    # Arrêter deux fois est sans effet; la journalisation peut être reconfigurée
+    journal_esg.stop_logging()
+    journal_esg.setup_logging(fichier=str(tmp_path / 'autre.log'))
+    assert journal_esg._listener is not None and journal_esg._listener is not listener
+
+def test_json_lines_format(racine, tmp_path):
+    fichier = tmp_path / 'journal.jsonl'
+    journal_esg.setup_logging(fichier=str(fichier), niveau='debug', json_lines=True)
+    logger = logging.getLogger('calculateur_esg.test')
+    logger.debug("Économie %s", "circulaire")
+    try:
+        raise ValueError("valeur invalide")
+    except ValueError:
+        logger.exception("Échec")
+    journal_esg.stop_logging()
+
+    texte = fichier.read_text(encoding='utf-8')
+    assert 'Économie' in texte  # accents écrits tels quels (ensure_ascii=False)
+    premier, second = [json.loads(ligne) for ligne in texte.splitlines()]
+    assert set(premier) == {'horodatage', 'niveau', 'logger', 'message', 'thread'}
+    assert (premier['niveau'], premier['logger'], premier['message'], premier['thread']) == \
+        ('DEBUG', 'calculateur_esg.test', 'Économie circulaire', 'MainThread')
+    assert premier['horodatage'].endswith('+00:00')
+    assert second['niveau'] == 'ERROR' and second['message'] == 'Échec'
+    assert second['exception'].startswith('Traceback') and 'ValueError: valeur invalide' in second['exception']
+
+def test_file_rotates_by_size(racine, tmp_path):
+    fichier = tmp_path / 'journal.log'
+    journal_esg.setup_logging(fichier=str(fichier), taille_max=500, nb_sauvegardes=2)
+    logger = logging.getLogger('calculateur_esg.test')
+    for numero in range(50):
+        logger.warning("message %d %s", numero, 'x' * 40)
+    journal_esg.stop_logging()
+    assert sorted(chemin.name for chemin in tmp_path.iterdir()) == ['journal.log', 'journal.log.1', 'journal.log.2']
+    assert all(chemin.stat().st_size <= 500 for chemin in tmp_path.iterdir())
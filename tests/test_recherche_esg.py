@@ -0,0 +1,186 @@
+"""Tests du classement des métiers par tags."""
+
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import generateur_esg
+import recherche_esg
+import schema_esg
+
+@pytest.fixture(scope='module')
+def catalogue():
+    return schema_esg.apply_schema(generateur_esg.generate_catalogue(300, seed=7))
+
+@pytest.fixture(scope='module')
+def index(catalogue):
+    return recherche_esg.build_tag_index(catalogue['metiers'], catalogue['salaire'])
+
+def reference_matches(df_metiers, selected_tags):
+    """Classement historique de l'application: parcours de la feuille, tri stable par tags en commun."""
+    resultats = []
+    for nom, tags_str in zip(df_metiers['Métier'], df_metiers['Tags']):
+        if not isinstance(tags_str, str):
+            continue
+        metier_tags = [tag.strip() for tag in tags_str.split(',')]
+        if any(tag in metier_tags for tag in selected_tags):
+            resultats.append((nom, sum(1 for tag in selected_tags if tag in metier_tags)))
+    return sorted(resultats, key=lambda resultat: resultat[1], reverse=True)
+
+def random_selections(index, nombre, seed=1):
+    tirage = random.Random(seed)
+    return [tirage.sample(index['tags'], tirage.randint(1, 5)) for _ in range(nombre)]
+
+def test_default_ranking_is_tag_count():
+    assert recherche_esg.CLASSEMENT_PAR_DEFAUT == 'comptage'
+
+def test_counting_ranking_matches_historical_ranking(catalogue, index):
+    for selection in random_selections(index, 100):
+        attendu = reference_matches(catalogue['metiers'], selection)
+        refs = recherche_esg.match_metier_refs(index, selection, mode='comptage')
+        assert [(nom, score) for nom, score, _ in refs] == attendu
+        limites = recherche_esg.match_metier_refs(index, selection, mode='comptage', limite=3)
+        assert [(nom, score) for nom, score, _ in limites] == attendu[:3]
+
+def test_entry_points_share_default_ranking(catalogue, index):
+    matrice = recherche_esg.build_tag_matrix(index)
+    for selection in random_selections(index, 20, seed=2):
+        refs = recherche_esg.match_metier_refs(index, selection, limite=3)
+        assert refs == recherche_esg.match_metier_refs(index, selection, mode=recherche_esg.CLASSEMENT_PAR_DEFAUT,
+                                                       limite=3)
+        assert [metier['Metier'] for metier in recherche_esg.match_metiers(index, selection, limite=3)] == \
+            [nom for nom, _, _ in refs]
+        ordre, _, _ = recherche_esg.rank_metiers(index, selection, limite=3)
+        assert [index['metiers'][position] for position in ordre] == [nom for nom, _, _ in refs]
+        vecteurs, _ = recherche_esg.encode_profiles(matrice, [selection])
+        scores = vecteurs @ matrice['matrice']
+        assert [index['metiers'][p] for p in recherche_esg.top_k_positions(scores[0], 3)] == [nom for nom, _, _ in refs]
+
+@pytest.mark.parametrize('mode', recherche_esg.MODES_CLASSEMENT)
+def test_top_k_is_prefix_of_full_ranking(index, mode):
+    for selection in random_selections(index, 30, seed=3):
+        complet = recherche_esg.match_metier_refs(index, selection, mode=mode)
+        for limite in (1, 3, 10):
+            assert recherche_esg.match_metier_refs(index, selection, mode=mode, limite=limite) == complet[:limite]
+
+def test_unknown_ranking_is_rejected(index):
+    with pytest.raises(ValueError):
+        recherche_esg.rank_metiers(index, index['tags'][:1], mode='inconnu')
+
+@pytest.mark.parametrize('k', [0, -1])
+def test_top_k_positions_with_no_room_is_empty(k):
+    assert len(recherche_esg.top_k_positions(np.array([3.0, 1.0, 2.0]), k)) == 0
+
+def test_top_k_positions_keeps_sheet_order_on_ties():
+    scores = np.array([1.0, 2.0, 2.0, 0.0, 2.0])
+    assert recherche_esg.top_k_positions(scores, 2).tolist() == [1, 2]
+    assert recherche_esg.top_k_positions(scores, 10).tolist() == [1, 2, 4, 0]
+
+def test_fallback_without_tags_or_matches(index):
+    sans_tags = recherche_esg.match_metiers(index, [])
+    assert len(sans_tags) == recherche_esg.NB_FALLBACK_SANS_TAGS
+    assert all(metier['match_score'] == 1 and metier['Tags'] == [] for metier in sans_tags)
+    sans_correspondance = recherche_esg.match_metiers(index, ['tag inconnu'])
+    assert len(sans_correspondance) == recherche_esg.NB_FALLBACK_SANS_CORRESPONDANCE
+    assert all(metier['Tags'] == ['tag inconnu'] for metier in sans_correspondance)
+
+def historical_display(index, selected_tags, mode, limite):
+    """Liste d'affichage telle que la session la conservait avant les références (dictionnaires complets)."""
+    def repli(limite_repli, description_defaut, tags):
+        return [{'Metier': nom, 'Secteur': secteur,
+                 'Description': description if description is not None else description_defaut,
+                 'Tags': list(tags), 'match_score': 1}
+                for nom, secteur, description in index['fallback'][:limite_repli]]
+
+    if not index['has_metiers'] or not selected_tags:
+        return repli(recherche_esg.NB_FALLBACK_SANS_TAGS, recherche_esg.DESCRIPTION_PAR_DEFAUT, [])
+    ordre, scores, communs = recherche_esg.rank_metiers(index, selected_tags, mode, limite)
+    metiers = [{'Metier': index['metiers'][position], 'Secteur': index['secteurs'][position],
+                'Description': index['descriptions'][position], 'Tags': list(index['tags_metiers'][position]),
+                'match_score': int(nb_communs), 'pertinence': round(float(score), 4)}
+               for position, score, nb_communs in zip(ordre.tolist(), scores.tolist(), communs.tolist())]
+    if not metiers and index['fallback']:
+        return repli(recherche_esg.NB_FALLBACK_SANS_CORRESPONDANCE,
+                     f"Métier en rapport avec les thématiques: {', '.join(selected_tags)}", selected_tags)
+    return metiers
+
+@pytest.mark.parametrize('mode', recherche_esg.MODES_CLASSEMENT)
+def test_session_refs_resolve_to_the_historical_display_list(index, mode):
+    selections = random_selections(index, 50, seed=4) + [[], ['tag inconnu']]
+    for selection in selections:
+        # Ce que la session conserve: un tuple de références (métier, tags en commun, pertinence)
+        refs = tuple(recherche_esg.match_metier_refs(index, selection, mode=mode, limite=3))
+        assert all(type(ref) is tuple and len(ref) == 3 for ref in refs)
+        # Le nom est l'objet de l'index partagé, pas une copie propre à la session
+        assert all(index['metiers'][index['position_par_metier'][nom]] is nom
+                   for nom, _, pertinence in refs if pertinence is not None)
+        affichage = recherche_esg.resolve_metiers(index, refs[:3], selection)
+        assert affichage == historical_display(index, selection, mode, 3)[:3], selection
+
+@pytest.fixture(scope='module')
+def index_texte():
+    data = {
+        'metiers': pd.DataFrame({
+            'Métier': ['Responsable Reporting', 'Analyste carbone', 'Chargé de bilans', 'Juriste RSE',
+                       'Économiste', 'Auditeur'],
+            'Tags': ['Reporting', 'Carbone, Climat', 'Énergie', 'Réglementation', 'Économie circulaire', 'Audit']
+        }),
+        'formations': pd.DataFrame({
+            'Métier': ['Auditeur', 'Chargé de bilans'],
+            'Programme_Principal': ['CSRD et reporting extra-financier', 'Bilan carbone']
+        })
+    }
+    competences = pd.DataFrame({'Métier': ['Juriste RSE'], 'Compétence': ['Droit des sociétés']})
+    return recherche_esg.build_text_index(data, competences)
+
+def found(resultats):
+    return [resultat['Metier'] for resultat in resultats]
+
+def test_search_ignores_accents_and_case(index_texte):
+    assert found(recherche_esg.search_text(index_texte, 'ECONOMIE')) == ['Économiste']
+    assert recherche_esg.search_text(index_texte, 'économie') == recherche_esg.search_text(index_texte, 'Economie')
+    assert recherche_esg.search_text(index_texte, 'économie')[0]['termes'] == ['economie']
+
+def test_prefix_matches_count_half_of_an_exact_match(index_texte):
+    termes = recherche_esg.expand_term(index_texte, 'bilan')
+    assert [(index_texte['vocabulaire'][rang], poids) for rang, poids in termes] == \
+        [('bilan', 1.0), ('bilans', recherche_esg.POIDS_PREFIXE)]
+    # Préfixe seulement: 'carb' ne correspond pas au milieu d'un mot
+    assert [index_texte['vocabulaire'][rang] for rang, _ in recherche_esg.expand_term(index_texte, 'carb')] == \
+        ['carbone']
+    assert recherche_esg.expand_term(index_texte, 'zzz') == []
+
+def test_query_words_shorter_than_indexed_words_match_as_prefixes(index_texte):
+    # Les mots indexés ont au moins 3 lettres, une requête de 2 lettres ne peut être qu'un début de mot
+    assert found(recherche_esg.search_text(index_texte, 'rs')) == ['Juriste RSE']
+    # Les mots vides ne sont pas indexés: 'des' ne trouve pas 'Droit des sociétés'
+    assert recherche_esg.search_text(index_texte, 'des') == []
+
+def test_metiers_with_more_query_words_rank_first(index_texte):
+    resultats = recherche_esg.search_text(index_texte, 'reporting csrd')
+    assert found(resultats) == ['Auditeur', 'Responsable Reporting']
+    auditeur, responsable = resultats
+    assert (auditeur['mots_trouves'], responsable['mots_trouves']) == (2, 1)
+    # Le nombre de mots trouvés l'emporte sur le score (nom et tags pèsent plus que les formations)
+    assert auditeur['score'] < responsable['score']
+    assert auditeur['champs'] == ['Formations'] and responsable['champs'] == ['Métier', 'Tags']
+
+def test_search_ranks_by_score_then_sheet_order(index_texte):
+    resultats = recherche_esg.search_text(index_texte, 'carbone')
+    assert found(resultats) == ['Analyste carbone', 'Chargé de bilans']
+    assert resultats[0]['score'] > resultats[1]['score']
+    assert found(recherche_esg.search_text(index_texte, 'carbone', limite=1)) == ['Analyste carbone']
+
+@pytest.mark.parametrize('requete', ['', '   ', 'a', 'é', '?!'])
+def test_empty_query_finds_nothing(index_texte, requete):
+    assert recherche_esg.search_text(index_texte, requete) == []
+
+def test_duplicated_metier_resolves_to_its_first_row():
+    df_metiers = pd.DataFrame({'Métier': ['Analyste ESG', 'Analyste ESG'], 'Tags': ['ESG', 'ESG, Climat'],
+                               'Description': ['Première ligne', 'Seconde ligne']})
+    index = recherche_esg.build_tag_index(df_metiers, pd.DataFrame())
+    assert index['position_par_metier'] == {'Analyste ESG': 0}
+    metiers = recherche_esg.match_metiers(index, ['Climat'])
+    assert [(metier['Description'], metier['Tags']) for metier in metiers] == [('Première ligne', ['ESG'])]
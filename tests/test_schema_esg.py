@@ -0,0 +1,68 @@
+"""Tests du schéma canonique des feuilles du catalogue."""
+
+import logging
+
+import pandas as pd
+import pytest
+
+import catalogue_esg
+import schema_esg
+
+def test_aliases_are_renamed_to_canonical_names():
+    df = pd.DataFrame({'metier': [' Analyste ESG '], 'Experience': ['0-2 ans'], 'Salaire_min': [35000]})
+    canonique = schema_esg.canonicalize_sheet('salaire', df)
+    assert list(canonique.columns) == ['Métier', 'Expérience', 'Salaire_Min']
+    assert canonique['Métier'].tolist() == ['Analyste ESG']
+
+def test_canonical_column_wins_over_its_variant():
+    df = pd.DataFrame({'Métier': ['A'], 'Expérience': ['canonique'], 'Experience': ['variante']})
+    canonique = schema_esg.canonicalize_sheet('salaire', df)
+    assert canonique['Expérience'].tolist() == ['canonique']
+    assert canonique['Experience'].tolist() == ['variante']
+
+@pytest.mark.parametrize('cle, colonnes, manquantes', [
+    ('metiers', ['Métier'], 'Tags'),
+    ('metiers', ['Nom', 'Intitulé'], 'Métier, Tags'),
+    ('salaire', ['Secteur'], 'Métier'),
+])
+def test_missing_required_columns_raise(cle, colonnes, manquantes):
+    with pytest.raises(schema_esg.SchemaError, match=f"absente\\(s\\): {manquantes} "):
+        schema_esg.canonicalize_sheet(cle, pd.DataFrame(columns=colonnes))
+
+def test_numeric_columns_are_coerced_and_invalid_values_reported(caplog):
+    df = pd.DataFrame({'Métier': ['A', 'B', 'C'], 'Salaire_Min': ['35000', 'n.c.', None]})
+    with caplog.at_level(logging.WARNING, logger='calculateur_esg.schema'):
+        canonique = schema_esg.canonicalize_sheet('salaire', df)
+    assert pd.api.types.is_numeric_dtype(canonique['Salaire_Min'])
+    assert canonique['Salaire_Min'].iloc[0] == 35000
+    assert canonique['Salaire_Min'].iloc[1:].isna().all()
+    assert "1 valeur(s) non numérique(s)" in caplog.text
+
+def test_derived_columns_added_without_overwriting():
+    df = pd.DataFrame({'Métier': ['A'], 'Programme_Principal': ['Master'], 'Modules_Cles': ['Climat'],
+                       'Durée': ['1 an']})
+    canonique = schema_esg.canonicalize_sheet('formations', df)
+    assert canonique['Formation'].tolist() == ['Master']
+    assert canonique['Description'].tolist() == ['Climat']
+    assert canonique['Durée'].tolist() == ['1 an']
+
+def test_canonicalisation_is_idempotent_and_leaves_input_untouched():
+    df = pd.DataFrame({'Metier': [' A '], 'Salaire_moyen': ['40000']})
+    avant = df.copy()
+    canonique = schema_esg.canonicalize_sheet('salaire', df)
+    pd.testing.assert_frame_equal(df, avant)
+    pd.testing.assert_frame_equal(schema_esg.canonicalize_sheet('salaire', canonique), canonique)
+
+def test_catalogue_shares_sheets_without_changing_pandas_options():
+    copie_a_l_ecriture = pd.get_option('mode.copy_on_write')
+    catalogue = catalogue_esg.Catalogue(schema_esg.apply_schema({
+        'metiers': pd.DataFrame({'Métier': ['A'], 'Tags': ['ESG']}),
+        'salaire': pd.DataFrame({'Métier': ['A'], 'Salaire_Min': [1]}),
+        'competences': pd.DataFrame({'Métier': ['A']}),
+        'formations': pd.DataFrame({'Métier': ['A']}),
+        'tendances': pd.DataFrame({'Métier': ['A']})
+    }))
+    assert catalogue.data['metiers'] is catalogue.data['metiers']
+    with pytest.raises(TypeError):
+        catalogue.data['metiers'] = pd.DataFrame()
+    assert pd.get_option('mode.copy_on_write') == copie_a_l_ecriture
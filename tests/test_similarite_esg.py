@@ -0,0 +1,73 @@
+"""Tests des métiers proches et de l'index plein texte construits sur la table longue des compétences."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import catalogue_esg
+import generateur_esg
+import recherche_esg
+import schema_esg
+import similarite_esg
+
+def sample_catalogue():
+    metiers = pd.DataFrame({
+        'Métier': ['Analyste ESG', 'Auditeur Carbone', 'Juriste RSE'],
+        'Tags': ['Finance', 'Climat', 'Droit']
+    })
+    # Une seule orthographe de colonnes reconnue par `competence_columns` (sans accent ici)
+    competences = pd.DataFrame({
+        'Métier': ['Analyste ESG', 'Auditeur Carbone', 'Juriste RSE'],
+        'Competence_1': ['Bilan carbone', 'Bilan carbone', 'Droit de l\'environnement'],
+        'Competence_2': ['Taxonomie', None, 'Veille réglementaire']
+    })
+    return {'metiers': metiers, 'competences': competences, 'formations': pd.DataFrame()}
+
+def test_similarity_uses_normalized_competences():
+    data = sample_catalogue()
+    table = catalogue_esg.normalize_competences(data['competences']).table
+    index = similarite_esg.build_similarity_index(data, data['metiers']['Métier'].tolist(), table)
+    proches = similarite_esg.get_similar_metiers(index, 'Analyste ESG')
+    assert [nom for nom, _ in proches] == ['Auditeur Carbone']
+
+def test_text_index_uses_normalized_competences():
+    data = sample_catalogue()
+    table = catalogue_esg.normalize_competences(data['competences']).table
+    index = recherche_esg.build_text_index(data, table)
+    resultats = recherche_esg.search_text(index, 'taxonomie')
+    assert [resultat['Metier'] for resultat in resultats] == ['Analyste ESG']
+    assert resultats[0]['champs'] == [recherche_esg.CHAMPS_TEXTE['competences'][0]]
+
+def synthetic_index(nb_metiers=400, **options):
+    data = schema_esg.apply_schema(generateur_esg.generate_catalogue(nb_metiers, seed=11))
+    table = catalogue_esg.normalize_competences(data['competences']).table
+    noms = data['metiers']['Métier'].tolist()
+    return data, noms, table, similarite_esg.build_similarity_index(data, noms, table, **options)
+
+def test_feature_matrix_is_sparse_and_normalised():
+    data, noms, table, _ = synthetic_index()
+    matrice = similarite_esg.build_feature_matrix(data, noms, table)
+    # Une entrée par caractéristique présente, quelle que soit la taille du vocabulaire
+    assert len(matrice['indices']) == matrice['indptr'][-1] < len(noms) * matrice['nb_caracteristiques'] // 50
+    lignes = np.repeat(np.arange(len(noms)), np.diff(matrice['indptr']))
+    np.testing.assert_allclose(np.bincount(lignes, weights=matrice['valeurs'] ** 2), 1.0)
+
+def test_neighbours_match_dense_cosine():
+    data, noms, table, index = synthetic_index()
+    matrice = similarite_esg.build_feature_matrix(data, noms, table)
+    dense = np.zeros((len(noms), matrice['nb_caracteristiques']))
+    dense[np.repeat(np.arange(len(noms)), np.diff(matrice['indptr'])), matrice['indices']] = matrice['valeurs']
+    similarites = dense @ dense.T
+    np.fill_diagonal(similarites, -1)
+    for position in range(0, len(noms), 37):
+        attendu = sorted(range(len(noms)), key=lambda autre: (-similarites[position, autre], autre))[:3]
+        attendu = [autre for autre in attendu if similarites[position, autre] > 0]
+        assert index['voisins'][position, :len(attendu)].tolist() == attendu
+
+@pytest.mark.parametrize('frequence_dense, memoire_bloc', [(1, similarite_esg.MEMOIRE_BLOC), (10**9, 64 * 1024)])
+def test_dense_columns_and_block_size_do_not_change_neighbours(monkeypatch, frequence_dense, memoire_bloc):
+    *_, reference = synthetic_index()
+    monkeypatch.setattr(similarite_esg, 'FREQUENCE_DENSE', frequence_dense)
+    *_, index = synthetic_index(memoire_bloc=memoire_bloc)
+    np.testing.assert_array_equal(index['voisins'], reference['voisins'])
+    np.testing.assert_allclose(index['scores'], reference['scores'], atol=1e-6)
@@ -0,0 +1,83 @@
+"""
+Thème ESG - Institut d'Économie Durable
+Compilation du thème (CSS et JavaScript) en un paquet identifié par son empreinte
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import string
+import time
+from types import MappingProxyType
+
+logger = logging.getLogger("calculateur_esg.theme")
+
+FICHIER_CSS = 'assets/theme.css'
+FICHIER_JS = 'assets/theme.js'
+
+# Identifiant de la balise <style> ajoutée à la page
+ID_STYLE = 'esg-theme'
+
+# Script d'injection exécuté dans l'iframe du composant: la feuille de style est
+# ajoutée (ou remplacée si l'empreinte a changé) dans le <head> de la page
+# Streamlit, où elle reste en place d'un rerun à l'autre
+_INJECTEUR = string.Template("""<script>
+(function() {
+    var doc = window.parent.document;
+    var style = doc.getElementById($id_style);
+    if (!style) {
+        style = doc.createElement('style');
+        style.id = $id_style;
+        doc.head.appendChild(style);
+    }
+    if (style.dataset.empreinte !== $empreinte) {
+        style.textContent = $css;
+        style.dataset.empreinte = $empreinte;
+    }
+})();
+$js
+</script>""")
+
+def _read_asset(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+def _to_js_string(texte):
+    """Encode un texte en chaîne JavaScript utilisable dans une balise <script>."""
+    return json.dumps(texte, ensure_ascii=False).replace('</', '<\\/')
+
+@functools.lru_cache(maxsize=8)
+def _build_theme_bundle(couleurs):
+    debut = time.perf_counter()
+    css = string.Template(_read_asset(FICHIER_CSS)).substitute(dict(couleurs))
+    js = _read_asset(FICHIER_JS)
+    empreinte = hashlib.sha256((css + js).encode('utf-8')).hexdigest()[:16]
+    html = _INJECTEUR.substitute(
+        id_style=_to_js_string(ID_STYLE),
+        empreinte=_to_js_string(empreinte),
+        css=_to_js_string(css),
+        js=js
+    )
+    bundle = MappingProxyType({
+        'empreinte': empreinte,
+        'css': css,
+        'js': js,
+        'html': html,
+        'taille': len(html.encode('utf-8')),
+        'duree_ms': (time.perf_counter() - debut) * 1000
+    })
+    logger.info(f"Thème compilé ({empreinte}): {bundle['taille'] / 1024:.1f} Ko en {bundle['duree_ms']:.1f} ms")
+    return bundle
+
+def build_theme_bundle(colors):
+    """
+    Compile le thème pour une palette de couleurs (une seule fois par palette et par processus).
+
+    Args:
+        colors: Dictionnaire des couleurs (primary, secondary, green, background)
+
+    Returns:
+        MappingProxyType: empreinte, css, js, html (à injecter), taille (octets), duree_ms
+    """
+    return _build_theme_bundle(tuple(sorted(colors.items())))